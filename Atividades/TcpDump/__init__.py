@@ -0,0 +1,77 @@
+# Pacote do analisador de capturas: a leitura, a decodificação, o filtro, os acumuladores dos relatórios
+# e a análise (api_pcap) como uma API para outros programas, sem nada de apresentação ou exportação.
+# Exemplo (com o diretório Atividades no sys.path):
+#     import TcpDump
+#     resultados, _ = TcpDump.analisar_captura("captura.pcap", filtro=TcpDump.compilar_filtro("udp"))
+# Os módulos se importam de forma relativa, dentro do pacote, e cada nome só é importado no primeiro acesso.
+# Os programas principais (tcpdump.py, tcpdump2.py, ...) também rodam diretamente: nesse caso eles entram
+# no pacote antes dos imports (execucao_pcap.entrar_no_pacote).
+import importlib
+
+# Nomes exportados pelo pacote -> módulo que os define
+EXPORTACOES = {
+    # Leitura
+    'FontePacotesPcap': "leitura_pcap",
+    'iterar_pacotes_pcap': "leitura_pcap",
+    'iterar_pacotes_pcap_mmap': "leitura_pcap",
+    'ler_cabecalho_global': "leitura_pcap",
+    'ler_tipo_link': "leitura_pcap",
+    'pacote_no_offset': "leitura_pcap",
+    'descrever_formato': "leitura_pcap",
+    'descrever_tipo_link': "leitura_pcap",
+    # Decodificação
+    'criar_decodificador': "decodificacao_pcap",
+    'criar_decodificador_pacotes': "decodificacao_pcap",
+    'decodificar_ipv4': "decodificacao_pcap",
+    'inteiro_para_ip': "analise_pcap",
+    # Filtro
+    'compilar_filtro': "filtro_pcap",
+    # Acumuladores e motor de uma passada
+    'AcumuladorHeadersIp': "analise_pcap",
+    'AcumuladorIntervaloCaptura': "analise_pcap",
+    'AcumuladorMaiorPacoteTcp': "analise_pcap",
+    'AcumuladorPacotesTruncados': "analise_pcap",
+    'AcumuladorTamanhoMedioUdp': "analise_pcap",
+    'AcumuladorTrafegoPorPar': "analise_pcap",
+    'AcumuladorInteracoesInterface': "analise_pcap",
+    'ACUMULADORES_PADRAO': "analise_pcap",
+    'ACUMULADORES_RESUMO': "analise_pcap",
+    'executar_analise': "analise_pcap",
+    'gerar_linhas_headers_ip': "analise_pcap",
+    'AcumuladorJanelas': "janelas_pcap",
+    'AcumuladorFluxos': "fluxos_pcap",
+    'RemontadorFragmentos': "fragmentos_pcap",
+    'ACUMULADORES_APROXIMADOS': "esbocos_pcap",
+    'versao_aproximada': "esbocos_pcap",
+    # Análise
+    'analisar_captura': "api_pcap",
+    'analisar_capturas': "api_pcap",
+    'analisar_completa': "api_pcap",
+    'analisar_com': "api_pcap",
+    'analisar_mesclada': "api_pcap",
+    'FonteMesclada': "mesclagem_pcap",
+    'gravar_pcap_mesclado': "mesclagem_pcap",
+    'gravar_pcap': "mesclagem_pcap",
+    'analisar_selecao': "api_pcap",
+    'FonteSelecao': "selecao_pcap",
+    'gravar_selecao': "selecao_pcap",
+    'executar_analise_paralela': "paralelo_pcap",
+    'executar_analise_indexada': "indice_pcap",
+    'obter_indice': "indice_pcap",
+    'acompanhar_analise': "seguir_pcap",
+    'expandir_entradas': "lote_pcap"
+}
+
+__all__ = sorted(EXPORTACOES)
+
+# Importa o módulo de um nome exportado no primeiro acesso (PEP 562) e guarda o nome no pacote
+def __getattr__(nome):
+    modulo = EXPORTACOES.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module("." + modulo, __name__), nome)
+    globals()[nome] = valor
+    return valor
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTACOES))
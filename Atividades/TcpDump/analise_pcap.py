@@ -0,0 +1,463 @@
+# Motor de análise de uma passada para arquivos PCAP.
+# Cada relatório é um acumulador com os ganchos atualizar(pacote, ip) e finalizar();
+# mesclar(outro) junta o estado parcial de outro acumulador do mesmo tipo (análise em paralelo).
+# o motor decodifica o cabeçalho IP de cada pacote uma única vez e alimenta todos os
+# acumuladores registrados, de modo que o custo total é O(pacotes), e não O(pacotes x relatórios).
+# O decodificador do cabeçalho IP é escolhido uma vez por arquivo, a partir do tipo de enlace.
+# Um filtro opcional (filtro_pcap.FiltroPacotes) descarta pacotes logo após a decodificação,
+# antes que qualquer acumulador os veja (com a remontagem, os datagramas são filtrados depois de remontados).
+# Com a remontagem ligada (fragmentos_pcap), os acumuladores marcados com por_datagrama = True recebem
+# os datagramas IPv4 remontados no lugar dos fragmentos; os demais continuam vendo cada quadro.
+from array import array
+from itertools import islice
+
+from .decodificacao_pcap import LINKTYPE_ETHERNET, criar_decodificador_pacotes
+from .fragmentos_pcap import RemontadorFragmentos, eh_fragmento
+
+# Função para converter um endereço IPv4 inteiro (32 bits) na notação com pontos
+# Usada apenas na hora de exibir: todo o estado interno usa os endereços como inteiros
+def inteiro_para_ip(endereco):
+    return ".".join(str(b) for b in int(endereco).to_bytes(4, 'big'))
+
+# Campos da tabela de cabeçalhos IP, na ordem das colunas, com o typecode do array que os guarda
+CAMPOS_HEADERS_IP = (
+    ('versao', 'B'),
+    ('ihl', 'B'),
+    ('tamanho_total', 'H'),
+    ('identificacao', 'H'),
+    ('flags', 'B'),
+    ('fragment_offset', 'H'),
+    ('ttl', 'B'),
+    ('protocolo', 'B'),
+    ('ip_origem', 'I'),
+    ('ip_destino', 'I')
+)
+
+# Linhas da tabela de cabeçalhos IP guardadas em colunas compactas (um array por campo, cerca de
+# 19 bytes por pacote em vez de uma lista com números e strings). As linhas são montadas sob demanda,
+# ao iterar ou indexar, com o número do pacote e os endereços já na notação com pontos
+class LinhasHeadersIp:
+    def __init__(self):
+        for campo, tipo in CAMPOS_HEADERS_IP:
+            setattr(self, campo, array(tipo))
+
+    def adicionar(self, ip):
+        self.versao.append(ip['versao'])
+        self.ihl.append(ip['ihl'])
+        self.tamanho_total.append(ip['tamanho_total'])
+        self.identificacao.append(ip['identificacao'])
+        self.flags.append(ip['flags'])
+        self.fragment_offset.append(ip['fragment_offset'])
+        self.ttl.append(ip['ttl'])
+        self.protocolo.append(ip['protocolo'])
+        self.ip_origem.append(ip['ip_origem'])
+        self.ip_destino.append(ip['ip_destino'])
+
+    def estender(self, outro):
+        for campo, _ in CAMPOS_HEADERS_IP:
+            getattr(self, campo).extend(getattr(outro, campo))
+
+    def linha(self, indice):
+        return [
+            indice + 1,
+            self.versao[indice],
+            self.ihl[indice],
+            self.tamanho_total[indice],
+            self.identificacao[indice],
+            self.flags[indice],
+            self.fragment_offset[indice],
+            self.ttl[indice],
+            self.protocolo[indice],
+            inteiro_para_ip(self.ip_origem[indice]),
+            inteiro_para_ip(self.ip_destino[indice])
+        ]
+
+    def __len__(self):
+        return len(self.versao)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self.linha(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("linha fora da tabela de cabeçalhos IP")
+        return self.linha(indice)
+
+    def __iter__(self):
+        return self.iterar()
+
+    # Gera as linhas de 'inicio' até 'fim' (exclusivo) sem montar as anteriores
+    def iterar(self, inicio=0, fim=None):
+        fim = len(self) if fim is None else min(fim, len(self))
+        for indice in range(inicio, fim):
+            yield self.linha(indice)
+
+    def __eq__(self, outro):
+        if not isinstance(outro, LinhasHeadersIp):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(outro, campo) for campo, _ in CAMPOS_HEADERS_IP)
+
+# Função que gera as linhas da tabela de cabeçalhos IP à medida que os pacotes são decodificados,
+# sem acumulá-las (a numeração é a mesma de LinhasHeadersIp: posição entre os pacotes IPv4)
+def gerar_linhas_headers_ip(pacotes, tipo_link=None, filtro=None):
+    if tipo_link is None:
+        tipo_link = tipo_link_da_fonte(pacotes)
+    decodificar = criar_decodificador_pacotes(tipo_link)
+    aceitar = filtro.predicado if filtro is not None else None
+    numero = 0
+    for pacote in pacotes:
+        ip = decodificar(pacote)
+        if ip is None or (aceitar is not None and not aceitar(pacote, ip)):
+            continue
+        numero += 1
+        yield [
+            numero,
+            ip['versao'],
+            ip['ihl'],
+            ip['tamanho_total'],
+            ip['identificacao'],
+            ip['flags'],
+            ip['fragment_offset'],
+            ip['ttl'],
+            ip['protocolo'],
+            inteiro_para_ip(ip['ip_origem']),
+            inteiro_para_ip(ip['ip_destino'])
+        ]
+
+# Função que percorre os pacotes entregando a tabela de cabeçalhos IP em blocos de até
+# 'tamanho_bloco' linhas (colunas compactas), para a exportação colunar em grupos de linhas
+def gerar_blocos_headers_ip(pacotes, tamanho_bloco, tipo_link=None, filtro=None):
+    if tipo_link is None:
+        tipo_link = tipo_link_da_fonte(pacotes)
+    decodificar = criar_decodificador_pacotes(tipo_link)
+    aceitar = filtro.predicado if filtro is not None else None
+    bloco = LinhasHeadersIp()
+    for pacote in pacotes:
+        ip = decodificar(pacote)
+        if ip is None or (aceitar is not None and not aceitar(pacote, ip)):
+            continue
+        bloco.adicionar(ip)
+        if len(bloco) == tamanho_bloco:
+            yield bloco
+            bloco = LinhasHeadersIp()
+    if len(bloco):
+        yield bloco
+
+# Cabeçalho da tabela de cabeçalhos IP (usado na exibição e na exportação)
+CABECALHO_TABELA_HEADERS_IP = [
+    "Pacote", "Versão", "IHL", "Tam. Total", "ID", "Flags", "Offset", "TTL", "Protocolo", "Origem", "Destino"
+]
+
+# Acumulador das linhas da tabela de cabeçalhos IP
+class AcumuladorHeadersIp:
+    nome = "headers_ip"
+
+    def __init__(self):
+        self.linhas = LinhasHeadersIp()
+
+    def atualizar(self, pacote, ip):
+        if ip is not None:
+            self.linhas.adicionar(ip)
+
+    def mesclar(self, outro):
+        # A numeração das linhas é a posição na tabela: basta concatenar as colunas
+        self.linhas.estender(outro.linhas)
+
+    def finalizar(self):
+        return {'linhas': self.linhas}
+
+# Acumulador do intervalo de captura (menor e maior timestamp)
+class AcumuladorIntervaloCaptura:
+    nome = "intervalo_captura"
+
+    def __init__(self):
+        self.inicio = None
+        self.fim = None
+
+    def atualizar(self, pacote, ip):
+        timestamp = pacote['timestamp']
+        if self.inicio is None or timestamp < self.inicio:
+            self.inicio = timestamp
+        if self.fim is None or timestamp > self.fim:
+            self.fim = timestamp
+
+    def mesclar(self, outro):
+        if outro.inicio is not None and (self.inicio is None or outro.inicio < self.inicio):
+            self.inicio = outro.inicio
+        if outro.fim is not None and (self.fim is None or outro.fim > self.fim):
+            self.fim = outro.fim
+
+    def finalizar(self):
+        return {'inicio': self.inicio, 'fim': self.fim}
+
+# Acumulador do maior pacote TCP capturado
+class AcumuladorMaiorPacoteTcp:
+    nome = "maior_pacote_tcp"
+    por_datagrama = True
+
+    def __init__(self):
+        self.tamanho = 0
+        self.ip_origem = None
+        self.ip_destino = None
+
+    def atualizar(self, pacote, ip):
+        if ip is None or ip['protocolo'] != 6:
+            return  # não é TCP
+        if pacote['origlen'] > self.tamanho:
+            self.tamanho = pacote['origlen']
+            self.ip_origem = ip['ip_origem']
+            self.ip_destino = ip['ip_destino']
+
+    def mesclar(self, outro):
+        # Maior estrito: em caso de empate vale o pacote que apareceu antes no arquivo
+        if outro.tamanho > self.tamanho:
+            self.tamanho = outro.tamanho
+            self.ip_origem = outro.ip_origem
+            self.ip_destino = outro.ip_destino
+
+    def finalizar(self):
+        if self.ip_origem is None:
+            return {'tamanho': 0, 'ip_origem': "", 'ip_destino': ""}
+        return {
+            'tamanho': self.tamanho,
+            'ip_origem': inteiro_para_ip(self.ip_origem),
+            'ip_destino': inteiro_para_ip(self.ip_destino)
+        }
+
+# Acumulador de pacotes truncados (caplen < origlen)
+class AcumuladorPacotesTruncados:
+    nome = "pacotes_truncados"
+
+    def __init__(self):
+        self.total = 0
+        self.truncados = 0
+
+    def atualizar(self, pacote, ip):
+        self.total += 1
+        if pacote['caplen'] < pacote['origlen']:
+            self.truncados += 1
+
+    def mesclar(self, outro):
+        self.total += outro.total
+        self.truncados += outro.truncados
+
+    def finalizar(self):
+        return {'total': self.total, 'truncados': self.truncados}
+
+# Acumulador do tamanho médio dos pacotes UDP
+class AcumuladorTamanhoMedioUdp:
+    nome = "tamanho_medio_udp"
+    por_datagrama = True  # Com a remontagem, a média é por datagrama UDP, não por fragmento
+
+    def __init__(self):
+        self.soma = 0
+        self.quantidade = 0
+
+    def atualizar(self, pacote, ip):
+        if ip is not None and ip['protocolo'] == 17:
+            self.soma += pacote['origlen']
+            self.quantidade += 1
+
+    def mesclar(self, outro):
+        self.soma += outro.soma
+        self.quantidade += outro.quantidade
+
+    def finalizar(self):
+        media = self.soma / self.quantidade if self.quantidade else None
+        return {'quantidade': self.quantidade, 'soma': self.soma, 'media': media}
+
+# Função para desempacotar uma chave de par nos endereços com pontos (para exibição)
+def par_da_chave(chave):
+    return (inteiro_para_ip(chave >> 32), inteiro_para_ip(chave & 0xFFFFFFFF))
+
+# Acumulador do tráfego (bytes originais) por par de IPs
+# O par (origem, destino) é empacotado numa única chave inteira de 64 bits
+class AcumuladorTrafegoPorPar:
+    nome = "trafego_por_par"
+    por_datagrama = True
+
+    def __init__(self):
+        self.trafego_por_par = {}
+
+    def atualizar(self, pacote, ip):
+        if ip is None:
+            return
+        par = (ip['ip_origem'] << 32) | ip['ip_destino']
+        self.trafego_por_par[par] = self.trafego_por_par.get(par, 0) + pacote['origlen']
+
+    def mesclar(self, outro):
+        for par, total in outro.trafego_por_par.items():
+            self.trafego_por_par[par] = self.trafego_por_par.get(par, 0) + total
+
+    def finalizar(self):
+        if not self.trafego_por_par:
+            return {'par': None, 'bytes': 0}
+        par = max(self.trafego_por_par, key=self.trafego_por_par.get)
+        return {'par': par_da_chave(par), 'bytes': self.trafego_por_par[par]}
+
+# Acumulador das interações da interface local (IP mais frequente como origem)
+# Guarda os pares distintos para resolver as interações numa única passada
+class AcumuladorInteracoesInterface:
+    nome = "interacoes_interface"
+    por_datagrama = True
+
+    def __init__(self):
+        self.contagem_origem = {}
+        self.pares = set()
+
+    def atualizar(self, pacote, ip):
+        if ip is None:
+            return
+        ip_origem = ip['ip_origem']
+        self.contagem_origem[ip_origem] = self.contagem_origem.get(ip_origem, 0) + 1
+        self.pares.add((ip_origem << 32) | ip['ip_destino'])
+
+    def mesclar(self, outro):
+        for ip_origem, quantidade in outro.contagem_origem.items():
+            self.contagem_origem[ip_origem] = self.contagem_origem.get(ip_origem, 0) + quantidade
+        self.pares.update(outro.pares)
+
+    def finalizar(self):
+        if not self.contagem_origem:
+            return {'ip_interface': None, 'total_interacoes': 0}
+
+        ip_interface = max(self.contagem_origem, key=self.contagem_origem.get)
+        interacoes = set()
+        for par in self.pares:
+            ip_origem = par >> 32
+            ip_destino = par & 0xFFFFFFFF
+            if ip_origem == ip_interface:
+                interacoes.add(ip_destino)
+            elif ip_destino == ip_interface:
+                interacoes.add(ip_origem)
+        return {'ip_interface': inteiro_para_ip(ip_interface), 'total_interacoes': len(interacoes)}
+
+# Acumuladores registrados por padrão, na ordem em que os relatórios são exibidos
+ACUMULADORES_PADRAO = [
+    AcumuladorHeadersIp,
+    AcumuladorIntervaloCaptura,
+    AcumuladorMaiorPacoteTcp,
+    AcumuladorPacotesTruncados,
+    AcumuladorTamanhoMedioUdp,
+    AcumuladorTrafegoPorPar,
+    AcumuladorInteracoesInterface
+]
+
+# Acumuladores de resumo: todos menos a tabela de cabeçalhos IP, que cresce com o número de pacotes
+ACUMULADORES_RESUMO = [classe for classe in ACUMULADORES_PADRAO if classe is not AcumuladorHeadersIp]
+
+# Função para descobrir o tipo de enlace de uma fonte de pacotes (Ethernet quando não informado)
+def tipo_link_da_fonte(pacotes):
+    cabecalho = getattr(pacotes, 'cabecalho', None)
+    return cabecalho['linktype'] if cabecalho is not None else LINKTYPE_ETHERNET
+
+# Função que percorre os pacotes uma única vez alimentando os acumuladores (sem finalizá-los)
+# Com 'filtro', só os pacotes aceitos pelo predicado chegam aos acumuladores
+def alimentar_acumuladores(pacotes, acumuladores, tipo_link=LINKTYPE_ETHERNET, filtro=None, remontar=False):
+    decodificar = criar_decodificador_pacotes(tipo_link)
+    if remontar:
+        return acumuladores + [alimentar_com_remontagem(pacotes, acumuladores, decodificar, filtro)]
+    atualizacoes = [acumulador.atualizar for acumulador in acumuladores]
+    if filtro is None:
+        for pacote in pacotes:
+            ip = decodificar(pacote)
+            for atualizar in atualizacoes:
+                atualizar(pacote, ip)
+        return acumuladores
+
+    aceitar = filtro.predicado
+    for pacote in pacotes:
+        ip = decodificar(pacote)
+        if aceitar(pacote, ip):
+            for atualizar in atualizacoes:
+                atualizar(pacote, ip)
+    return acumuladores
+
+# Laço do motor com a remontagem de fragmentos: cada quadro vai aos acumuladores por quadro e, quando não
+# é fragmento (ou completa um datagrama), aos acumuladores por datagrama. Retorna o remontador, que entra
+# na lista de acumuladores com os seus contadores ('remontador' continua uma remontagem já iniciada).
+# Com filtro, todos os fragmentos vão ao remontador e o predicado é aplicado ao datagrama remontado: os
+# fragmentos seguintes não trazem as portas, e um filtro como "tcp port 80" os descartaria antes de o
+# datagrama se completar. Os acumuladores por quadro continuam vendo só os quadros aceitos
+def alimentar_com_remontagem(pacotes, acumuladores, decodificar, filtro=None, remontador=None):
+    if remontador is None:
+        remontador = RemontadorFragmentos()
+    remontar = remontador.remontar
+    por_quadro, por_datagrama = [], []
+    for acumulador in acumuladores:
+        (por_datagrama if getattr(acumulador, 'por_datagrama', False) else por_quadro).append(acumulador.atualizar)
+    aceitar = filtro.predicado if filtro is not None else None
+    for pacote in pacotes:
+        ip = decodificar(pacote)
+        aceito = aceitar is None or aceitar(pacote, ip)
+        if aceito:
+            for atualizar in por_quadro:
+                atualizar(pacote, ip)
+        if eh_fragmento(ip):
+            pacote, ip = remontar(pacote, ip)
+            if pacote is None:
+                continue
+            aceito = aceitar is None or aceitar(pacote, ip)
+        if aceito:
+            for atualizar in por_datagrama:
+                atualizar(pacote, ip)
+    return remontador
+
+# Função que percorre os pacotes uma única vez alimentando todos os acumuladores
+# Retorna um dicionário {nome do acumulador: resultado}
+# 'tipo_link' vem do cabeçalho global; se omitido, é lido da fonte (FontePacotesPcap.cabecalho)
+# Com 'remontar', o resultado traz também os contadores da remontagem de fragmentos
+def executar_analise(pacotes, acumuladores=None, tipo_link=None, filtro=None, remontar=False):
+    if acumuladores is None:
+        acumuladores = [classe() for classe in ACUMULADORES_PADRAO]
+    if tipo_link is None:
+        tipo_link = tipo_link_da_fonte(pacotes)
+
+    acumuladores = alimentar_acumuladores(pacotes, acumuladores, tipo_link, filtro, remontar)
+    return {acumulador.nome: acumulador.finalizar() for acumulador in acumuladores}
+
+# Pacotes lidos por bloco na passada com a tabela de cabeçalhos IP (PassadaComLinhas)
+TAMANHO_BLOCO_PASSADA = 4096
+
+# Classe de uma passada única que entrega a tabela de cabeçalhos IP em fluxo e, na mesma leitura, alimenta os
+# acumuladores dos resumos. Os pacotes são lidos em blocos: as linhas de cada bloco são geradas por linhas()
+# antes da leitura do bloco seguinte, e resultados() lê o que faltar e finaliza os acumuladores.
+# A numeração das linhas é a mesma de LinhasHeadersIp (posição entre os pacotes IPv4 aceitos)
+class PassadaComLinhas:
+    def __init__(self, pacotes, acumuladores, tipo_link=None, filtro=None, remontar=False):
+        if tipo_link is None:
+            tipo_link = tipo_link_da_fonte(pacotes)
+        self.pacotes = iter(pacotes)
+        self.acumuladores = acumuladores
+        self.tipo_link = tipo_link
+        self.filtro = filtro
+        self.remontador = RemontadorFragmentos() if remontar else None
+        self.decodificar = criar_decodificador_pacotes(tipo_link)
+        self.coletor = AcumuladorHeadersIp()
+        self.numero = 0
+
+    # Lê o próximo bloco de pacotes ('com_linhas' falso dispensa as linhas da tabela); retorna falso quando os
+    # pacotes acabaram
+    def ler_bloco(self, com_linhas=True):
+        bloco = list(islice(self.pacotes, TAMANHO_BLOCO_PASSADA))
+        acumuladores = [self.coletor] + self.acumuladores if com_linhas else self.acumuladores
+        if self.remontador is not None:
+            alimentar_com_remontagem(bloco, acumuladores, self.decodificar, self.filtro, self.remontador)
+        else:
+            alimentar_acumuladores(bloco, acumuladores, self.tipo_link, self.filtro)
+        return bool(bloco)
+
+    def linhas(self):
+        while self.ler_bloco():
+            linhas, self.coletor.linhas = self.coletor.linhas, LinhasHeadersIp()
+            for linha in linhas:
+                linha[0] += self.numero
+                yield linha
+            self.numero += len(linhas)
+
+    def resultados(self):
+        while self.ler_bloco(com_linhas=False):
+            pass
+        acumuladores = self.acumuladores + ([self.remontador] if self.remontador is not None else [])
+        return {acumulador.nome: acumulador.finalizar() for acumulador in acumuladores}
@@ -0,0 +1,160 @@
+# Análise de capturas sem apresentação: escolhe o modo de análise e devolve os resultados como
+# {nome do acumulador: resultado}, sem imprimir nem exportar nada. É a parte comum aos dois programas
+# principais (tcpdump.py exibe os resultados no terminal, tcpdump2.py os exporta) e a que o pacote
+# (__init__.py) oferece a quem embute o analisador.
+# O NumPy (modo colunar) só é importado quando esse modo é de fato usado.
+from importlib.util import find_spec
+
+from .leitura_pcap import FontePacotesPcap
+from .paralelo_pcap import executar_analise_paralela, deve_analisar_em_paralelo
+from .lote_pcap import analisar_lote
+from .seguir_pcap import ACUMULADORES_ACOMPANHAMENTO
+from .janelas_pcap import AcumuladorJanelas
+from .fluxos_pcap import AcumuladorFluxos
+from .esbocos_pcap import executar_analise_aproximada, versao_aproximada
+from .indice_pcap import executar_analise_indexada
+from .fragmentos_pcap import RemontadorFragmentos
+from .mesclagem_pcap import NOME_MESCLAGEM
+from .selecao_pcap import NOME_SELECAO
+from .perfil_pcap import etapa, medir
+from .analise_pcap import (
+    AcumuladorHeadersIp, ACUMULADORES_PADRAO, ACUMULADORES_RESUMO, PassadaComLinhas, executar_analise
+)
+
+# A análise colunar depende do NumPy; sem ele, usa-se o motor de uma passada
+NUMPY_DISPONIVEL = find_spec("numpy") is not None
+
+# Função para escolher os acumuladores de uma análise, com ou sem a tabela de cabeçalhos IP
+def classes_analise(incluir_headers_ip):
+    return ACUMULADORES_PADRAO if incluir_headers_ip else ACUMULADORES_RESUMO
+
+# Função para escolher os acumuladores do modo de acompanhamento (--seguir)
+def classes_acompanhamento(com_janelas=False, aproximado=False, com_fluxos=False):
+    classes = ACUMULADORES_ACOMPANHAMENTO + ([AcumuladorJanelas] if com_janelas else [])
+    classes += [AcumuladorFluxos] if com_fluxos else []
+    return versao_aproximada(classes) if aproximado else classes
+
+# Função auxiliar: executa um único acumulador sobre os pacotes (aceitos pelo filtro) e devolve o seu resultado
+def analisar_com(lista_pacotes, classe_acumulador, filtro=None):
+    return executar_analise(lista_pacotes, [classe_acumulador()], filtro=filtro)[classe_acumulador.nome]
+
+# Função para executar todos os relatórios numa única passada pelo arquivo
+@medir
+def analisar_completa(lista_pacotes, incluir_headers_ip=True, filtro=None, remontar=False):
+    acumuladores = [classe() for classe in classes_analise(incluir_headers_ip)]
+    return executar_analise(lista_pacotes, acumuladores, filtro=filtro, remontar=remontar)
+
+# Função para executar relatórios opcionais (janelas de tempo, fluxos) numa passada extra, só com esses acumuladores
+# (com 'remontar', os contadores da remontagem já saíram na análise principal e não se repetem)
+@medir
+def analisar_extras(lista_pacotes, classes_acumuladores, filtro=None, remontar=False):
+    resultados = executar_analise(lista_pacotes, [classe() for classe in classes_acumuladores], filtro=filtro,
+                                  remontar=remontar)
+    resultados.pop(RemontadorFragmentos.nome, None)
+    return resultados
+
+# Função para executar todos os relatórios em vários processos (capturas grandes)
+@medir
+def analisar_paralela(caminho_arquivo, incluir_headers_ip=True, filtro=None, remontar=False):
+    return executar_analise_paralela(caminho_arquivo, classes_acumuladores=classes_analise(incluir_headers_ip),
+                                     filtro=filtro, remontar=remontar)
+
+# Função para obter os relatórios aproveitando o índice em disco da captura; retorna (resultados, situação)
+# (o índice sempre guarda a tabela de cabeçalhos IP; ela só deixa de ser devolvida)
+@medir
+def analisar_indexada(caminho_arquivo, incluir_headers_ip=True):
+    resultados, situacao = executar_analise_indexada(caminho_arquivo)
+    if not incluir_headers_ip:
+        del resultados[AcumuladorHeadersIp.nome]
+    return resultados, situacao
+
+# Função para executar todos os relatórios de forma vetorizada (NumPy)
+# (com filtro, a máscara é calculada sobre as colunas antes dos relatórios)
+@medir
+def analisar_colunar(caminho_arquivo, incluir_headers_ip=True, filtro=None):
+    from .colunar_pcap import aplicar_filtro_colunas, carregar_colunas_pcap, executar_analise_colunar
+
+    colunas = aplicar_filtro_colunas(carregar_colunas_pcap(caminho_arquivo), filtro)
+    return executar_analise_colunar(colunas, incluir_headers_ip)
+
+# Função para saber se a captura pode ser analisada no modo colunar (NumPy instalado e formato suportado)
+def pode_analisar_em_colunas(cabecalho):
+    if not NUMPY_DISPONIVEL:
+        return False
+    from .colunar_pcap import suporta_colunas
+
+    return suporta_colunas(cabecalho)
+
+# Função que diz se a análise de uma captura usa o índice em disco: o índice guarda os relatórios exatos da
+# captura inteira, sem filtro e sem remontagem
+def usa_indice(usar_indice, aproximado=False, filtro=None, remontar=False):
+    return usar_indice and not aproximado and filtro is None and not remontar
+
+# Função que diz se analisar_captura resolve a captura sem o motor de uma passada (índice em disco, em paralelo
+# ou colunar): nesses modos, a tabela de cabeçalhos IP sai pronta dos resultados, sem decodificar os pacotes
+# um a um; nos demais, a passada com as linhas (abrir_passada_com_linhas) faz a tabela e os resumos de uma vez
+def usa_modo_rapido(caminho_arquivo, cabecalho, usar_indice=True, aproximado=False, filtro=None, remontar=False):
+    if usa_indice(usar_indice, aproximado, filtro, remontar) or deve_analisar_em_paralelo(caminho_arquivo):
+        return True
+    return not aproximado and not remontar and pode_analisar_em_colunas(cabecalho)
+
+# Função para analisar uma captura, escolhendo o modo mais rápido disponível
+# Retorna (resultados, situação do índice); a situação é None quando o índice em disco não foi usado.
+# 'lista_pacotes' é a fonte já aberta da captura (o modo de uma passada a usa; sem ela, o arquivo é aberto aqui).
+# Com filtro, só os pacotes aceitos chegam aos relatórios; o índice em disco (da captura inteira) não é usado.
+# Com 'remontar', o índice e o modo colunar (que veem cada quadro isoladamente) também não são usados
+def analisar_captura(caminho_arquivo, usar_indice=True, aproximado=False, filtro=None, remontar=False,
+                     incluir_headers_ip=True, lista_pacotes=None):
+    if aproximado:
+        with etapa("analise_aproximada"):
+            classes = versao_aproximada(classes_analise(incluir_headers_ip))
+            return executar_analise_aproximada(caminho_arquivo, classes, filtro, remontar), None
+    if usa_indice(usar_indice, aproximado, filtro, remontar):
+        return analisar_indexada(caminho_arquivo, incluir_headers_ip)
+    if deve_analisar_em_paralelo(caminho_arquivo):
+        return analisar_paralela(caminho_arquivo, incluir_headers_ip, filtro, remontar), None
+    if lista_pacotes is None:
+        lista_pacotes = FontePacotesPcap(caminho_arquivo, usar_mmap=True)
+    if not remontar and pode_analisar_em_colunas(lista_pacotes.cabecalho):
+        return analisar_colunar(caminho_arquivo, incluir_headers_ip, filtro), None
+    return analisar_completa(lista_pacotes, incluir_headers_ip, filtro, remontar), None
+
+# Função para abrir a passada única que gera a tabela de cabeçalhos IP em fluxo e calcula os resumos (e os
+# relatórios opcionais de 'classes_extras') na mesma leitura (analise_pcap.PassadaComLinhas)
+def abrir_passada_com_linhas(lista_pacotes, aproximado=False, filtro=None, remontar=False, classes_extras=()):
+    classes = classes_analise(False) + list(classes_extras)
+    if aproximado:
+        classes = versao_aproximada(classes)
+    return PassadaComLinhas(lista_pacotes, [classe() for classe in classes], filtro=filtro, remontar=remontar)
+
+# Função para analisar vários arquivos em paralelo; retorna ({arquivo: resultados}, consolidado)
+# Os relatórios opcionais de 'classes_extras' (janelas de tempo, fluxos) são calculados nos mesmos processos
+def analisar_capturas(caminhos, processos=None, aproximado=False, filtro=None, remontar=False, classes_extras=()):
+    classes = ACUMULADORES_PADRAO + list(classes_extras)
+    if aproximado:
+        classes = versao_aproximada(classes)
+    return analisar_lote(caminhos, processos, classes, filtro, remontar)
+
+# Função para analisar uma fonte de pacotes já aberta (capturas mescladas, seleção de uma captura) numa única
+# passada, com todos os relatórios
+def analisar_fonte(fonte, incluir_headers_ip=True, aproximado=False, filtro=None, remontar=False):
+    classes = classes_analise(incluir_headers_ip)
+    if aproximado:
+        classes = versao_aproximada(classes)
+    return executar_analise(fonte, [classe() for classe in classes], filtro=filtro, remontar=remontar)
+
+# Função para analisar várias capturas mescladas numa única linha do tempo (mesclagem_pcap.FonteMesclada),
+# numa única passada; os contadores da mesclagem entram nos resultados
+@medir
+def analisar_mesclada(fonte_mesclada, incluir_headers_ip=True, aproximado=False, filtro=None, remontar=False):
+    resultados = analisar_fonte(fonte_mesclada, incluir_headers_ip, aproximado, filtro, remontar)
+    resultados[NOME_MESCLAGEM] = fonte_mesclada.estatisticas()
+    return resultados
+
+# Função para analisar uma faixa de pacotes ou um intervalo de tempo de uma captura (selecao_pcap.FonteSelecao),
+# lendo só os blocos localizados pelo índice esparso; os contadores da seleção entram nos resultados
+@medir
+def analisar_selecao(fonte_selecao, incluir_headers_ip=True, aproximado=False, filtro=None, remontar=False):
+    resultados = analisar_fonte(fonte_selecao, incluir_headers_ip, aproximado, filtro, remontar)
+    resultados[NOME_SELECAO] = fonte_selecao.estatisticas()
+    return resultados
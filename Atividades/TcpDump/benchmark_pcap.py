@@ -0,0 +1,353 @@
+# Medição de desempenho do analisador: gera uma captura sintética determinística e mede o tempo e o pico
+# de memória (RSS) da leitura, de cada relatório e de cada exportação.
+# Cada etapa roda num processo novo, de modo que o pico de RSS medido é só dela; com repetições, fica o
+# menor tempo e o maior pico. Os resultados são gravados em JSON e podem ser comparados com uma execução
+# anterior (--comparar): etapas mais lentas ou mais pesadas que a tolerância encerram com código 1.
+#
+# Exemplos:
+#   python benchmark_pcap.py --pacotes 200000 --saida base.json
+#   python benchmark_pcap.py --pacotes 200000 --comparar base.json
+#   python benchmark_pcap.py --gerar sintetica.pcap --pacotes 50000 --taxa-vlan 0.2
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import struct
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from tabulate import tabulate
+
+# Execução direta (python benchmark_pcap.py): o script entra no pacote antes dos imports relativos (ver execucao_pcap)
+if not __package__:
+    from execucao_pcap import entrar_no_pacote
+    __package__ = entrar_no_pacote(__file__)
+
+# Versão do formato do arquivo de resultados
+VERSAO_RESULTADOS = 1
+
+# Parâmetros padrão da captura sintética
+PARAMETROS_PADRAO = {
+    'pacotes': 100_000,
+    'semente': 1,
+    'tamanhos': "bimodal",
+    'mistura': "tcp=70,udp=25,icmp=5",
+    'hosts': 50,
+    'taxa_vlan': 0.1,
+    'taxa_truncados': 0.05,
+    'snaplen': 96
+}
+
+# Distribuições do tamanho da carga útil (bytes após o cabeçalho de transporte)
+# bimodal: confirmações pequenas e pacotes perto do MTU, como num tráfego TCP de transferência
+DISTRIBUICOES_TAMANHO = {
+    'fixo': lambda sorteio: 512,
+    'uniforme': lambda sorteio: sorteio.randint(0, 1400),
+    'bimodal': lambda sorteio: sorteio.randint(0, 64) if sorteio.random() < 0.5 else sorteio.randint(1200, 1400)
+}
+
+# Protocolos aceitos na mistura: nome -> número IANA
+PROTOCOLOS_MISTURA = {"tcp": 6, "udp": 17, "icmp": 1}
+
+# Tolerância padrão da comparação: 25% a mais de tempo ou de memória conta como regressão
+TOLERANCIA_PADRAO = 0.25
+
+CABECALHO_GLOBAL = struct.Struct('<IHHiIII')
+CABECALHO_REGISTRO = struct.Struct('<IIII')
+CABECALHO_IPV4 = struct.Struct('!BBHHHBBHII')
+CABECALHO_TCP = struct.Struct('!HHIIBBHHH')
+CABECALHO_UDP = struct.Struct('!HHHH')
+CABECALHO_ICMP = struct.Struct('!BBHHH')
+ETHERNET_IPV4 = b'\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00'
+ETHERNET_VLAN = b'\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x81\x00'
+
+# Função para interpretar a mistura de protocolos ("tcp=70,udp=25,icmp=5") em ([protocolos], [pesos])
+def ler_mistura(texto):
+    protocolos, pesos = [], []
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip().lower()
+        if nome not in PROTOCOLOS_MISTURA:
+            raise ValueError(f"protocolo desconhecido na mistura: {nome}")
+        protocolos.append(PROTOCOLOS_MISTURA[nome])
+        pesos.append(float(peso or 1))
+    if sum(pesos) <= 0:
+        raise ValueError("a mistura de protocolos precisa de algum peso positivo")
+    return protocolos, pesos
+
+# Função para gerar uma captura sintética (pcap clássico, Ethernet) sempre igual para os mesmos parâmetros
+# Os endereços saem de 10.0.0.1 até 10.0.0.<hosts> (o primeiro concentra metade do tráfego, como uma
+# interface local); uma fração dos quadros recebe uma tag 802.1Q e outra é cortada no snaplen
+# Retorna a quantidade de bytes gravados
+def gerar_captura_sintetica(caminho, pacotes, semente=1, tamanhos="bimodal", mistura="tcp=70,udp=25,icmp=5",
+                            hosts=50, taxa_vlan=0.1, taxa_truncados=0.05, snaplen=96):
+    sorteio = random.Random(semente)
+    sortear_tamanho = DISTRIBUICOES_TAMANHO[tamanhos]
+    protocolos, pesos = ler_mistura(mistura)
+    enderecos = [0x0A000000 + indice for indice in range(1, max(hosts, 2) + 1)]
+    carga = bytes(range(256)) * 6
+    instante = 1_700_000_000.0
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(CABECALHO_GLOBAL.pack(0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        total = CABECALHO_GLOBAL.size
+        for numero in range(pacotes):
+            protocolo = sorteio.choices(protocolos, pesos)[0]
+            tamanho_carga = sortear_tamanho(sorteio)
+            origem = enderecos[0] if sorteio.random() < 0.5 else sorteio.choice(enderecos)
+            destino = sorteio.choice(enderecos)
+            if protocolo == 6:
+                transporte = CABECALHO_TCP.pack(sorteio.randint(1024, 65535), sorteio.choice((80, 443, 22)),
+                                                numero, 0, 0x50, 0x02 if numero % 50 == 0 else 0x18, 65535, 0, 0)
+            elif protocolo == 17:
+                transporte = CABECALHO_UDP.pack(sorteio.randint(1024, 65535), sorteio.choice((53, 123, 5353)),
+                                                8 + tamanho_carga, 0)
+            else:
+                transporte = CABECALHO_ICMP.pack(8, 0, 0, numero & 0xFFFF, 1)
+            tamanho_total = 20 + len(transporte) + tamanho_carga
+            ip = CABECALHO_IPV4.pack(0x45, 0, tamanho_total, numero & 0xFFFF, 0x4000, sorteio.choice((64, 128, 255)),
+                                     protocolo, 0, origem, destino)
+            if sorteio.random() < taxa_vlan:
+                enlace = ETHERNET_VLAN + struct.pack('!HH', sorteio.randint(1, 4094), 0x0800)
+            else:
+                enlace = ETHERNET_IPV4
+            quadro = enlace + ip + transporte + carga[:tamanho_carga]
+            tamanho_original = len(quadro)
+            if sorteio.random() < taxa_truncados:
+                # Quadros menores que o snaplen também perdem o último byte: a taxa pedida é a taxa gravada
+                quadro = quadro[:min(snaplen, tamanho_original - 1)]
+
+            instante += sorteio.expovariate(1000.0)
+            segundos = int(instante)
+            arquivo.write(CABECALHO_REGISTRO.pack(segundos, int((instante - segundos) * 1_000_000),
+                                                  len(quadro), tamanho_original))
+            arquivo.write(quadro)
+            total += CABECALHO_REGISTRO.size + len(quadro)
+    return total
+
+# Função para consumir todos os pacotes de uma fonte (a "carga" do arquivo, sem análise)
+def consumir(pacotes):
+    quantidade = 0
+    for _ in pacotes:
+        quantidade += 1
+    return quantidade
+
+# Funções de cada etapa medida. Os relatórios leem a captura de novo a cada execução (a fonte é relida
+# sob demanda), então o tempo de um relatório inclui a leitura dos pacotes
+def etapa_carga_fluxo(caminho):
+    from .tcpdump import carregar_pacotes_pcap
+    consumir(carregar_pacotes_pcap(caminho))
+
+def etapa_carga_mmap(caminho):
+    from .tcpdump import carregar_pacotes_pcap
+    consumir(carregar_pacotes_pcap(caminho, usar_mmap=True))
+
+def etapa_relatorio(nome_funcao):
+    def executar(caminho):
+        from . import tcpdump
+        from .leitura_pcap import FontePacotesPcap
+        getattr(tcpdump, nome_funcao)(FontePacotesPcap(caminho, usar_mmap=True))
+    return executar
+
+def etapa_analise_colunar(caminho):
+    from .tcpdump import exibir_analise_colunar
+    exibir_analise_colunar(caminho)
+
+# Nas exportações, as tabelas são montadas antes de o tempo começar a contar (preparar): o tempo medido é só o
+# do exportador. O pico de RSS inclui as tabelas montadas (a tabela de cabeçalhos IP fica em colunas compactas)
+def etapa_exportacao(nome_funcao):
+    def preparar(caminho):
+        from . import tcpdump2
+        from .leitura_pcap import FontePacotesPcap
+        return tcpdump2.obter_analise_completa(FontePacotesPcap(caminho, usar_mmap=True))
+
+    def executar(tabelas):
+        from . import tcpdump2
+        getattr(tcpdump2, nome_funcao)(tabelas)
+    executar.preparar = preparar
+    return executar
+
+# Etapas medidas, na ordem de execução: nome -> função(caminho da captura); uma etapa com o atributo 'preparar'
+# recebe o que preparar(caminho) devolver, calculado fora da medição de tempo
+ETAPAS = {
+    'carga_fluxo': etapa_carga_fluxo,
+    'carga_mmap': etapa_carga_mmap,
+    'headers_ip': etapa_relatorio("exibir_headers_ip"),
+    'intervalo_captura': etapa_relatorio("exibir_intervalo_captura"),
+    'maior_pacote_tcp': etapa_relatorio("exibir_maior_pacote_tcp"),
+    'pacotes_truncados': etapa_relatorio("exibir_pacotes_truncados"),
+    'tamanho_medio_udp': etapa_relatorio("exibir_tamanho_medio_udp"),
+    'maior_trafego_por_par': etapa_relatorio("exibir_maior_trafego_por_par"),
+    'interacoes_da_interface': etapa_relatorio("exibir_interacoes_da_interface"),
+    'analise_completa': etapa_relatorio("exibir_analise_completa"),
+    'analise_colunar': etapa_analise_colunar,
+    'exportar_json': etapa_exportacao("exportar_para_json"),
+    'exportar_csv': etapa_exportacao("exportar_para_csv"),
+    'exportar_pdf': etapa_exportacao("exportar_para_pdf")
+}
+
+# Função para ler o pico de RSS do processo atual em KiB (o Linux informa em KiB, o macOS em bytes)
+def pico_rss_kib():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+# Função executada no processo da etapa: roda a etapa num diretório temporário (as exportações gravam
+# relatorio_pcap.* no diretório atual), com a saída descartada, e retorna (segundos, pico de RSS em KiB)
+def medir_etapa(nome, caminho):
+    caminho = os.path.abspath(caminho)
+    diretorio_atual = os.getcwd()
+    with tempfile.TemporaryDirectory() as diretorio, open(os.devnull, "w") as descarte:
+        os.chdir(diretorio)
+        try:
+            with contextlib.redirect_stdout(descarte):
+                etapa = ETAPAS[nome]
+                preparar = getattr(etapa, 'preparar', None)
+                argumento = preparar(caminho) if preparar is not None else caminho
+                inicio = time.perf_counter()
+                etapa(argumento)
+                segundos = time.perf_counter() - inicio
+        finally:
+            os.chdir(diretorio_atual)
+    return segundos, pico_rss_kib()
+
+# Função para medir uma etapa num processo novo (iniciado do zero, sem herdar a memória deste)
+def medir_em_processo(nome, caminho):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(medir_etapa, nome, caminho).result()
+
+# Função para medir as etapas escolhidas, 'repeticoes' vezes cada uma
+# Retorna {etapa: {'segundos': menor tempo, 'tempos': [...], 'rss_pico_kib': maior pico}}
+def executar_benchmark(caminho, etapas, repeticoes=1):
+    resultados = {}
+    for nome in etapas:
+        medicoes = [medir_em_processo(nome, caminho) for _ in range(repeticoes)]
+        tempos = [segundos for segundos, _ in medicoes]
+        resultados[nome] = {
+            'segundos': min(tempos),
+            'tempos': tempos,
+            'rss_pico_kib': max(rss for _, rss in medicoes)
+        }
+        print(f"[INFO] {nome}: {min(tempos):.3f} s, pico de RSS {resultados[nome]['rss_pico_kib'] / 1024:.1f} MiB")
+    return resultados
+
+# Função para comparar os resultados com os de uma execução anterior
+# Retorna as linhas da tabela de comparação e a lista de regressões (etapa, medida, razão)
+def comparar_resultados(atual, anterior, tolerancia=TOLERANCIA_PADRAO):
+    linhas, regressoes = [], []
+    for nome, medidas in atual['etapas'].items():
+        base = anterior['etapas'].get(nome)
+        if base is None:
+            continue
+        linha = [nome]
+        for medida in ('segundos', 'rss_pico_kib'):
+            razao = medidas[medida] / base[medida] if base[medida] else 1.0
+            if razao > 1 + tolerancia:
+                regressoes.append((nome, medida, razao))
+            linha += [base[medida], medidas[medida], f"{razao:.2f}x"]
+        linhas.append(linha)
+    return linhas, regressoes
+
+# Função para exibir a comparação e avisar quando as capturas das duas execuções não são as mesmas
+def exibir_comparacao(atual, anterior, tolerancia):
+    if atual['captura']['parametros'] != anterior['captura']['parametros']:
+        print("[AVISO] As execuções usaram capturas diferentes; a comparação pode não ser significativa.")
+    linhas, regressoes = comparar_resultados(atual, anterior, tolerancia)
+    cabecalho = ["Etapa", "Tempo base (s)", "Tempo atual (s)", "Razão", "RSS base (KiB)", "RSS atual (KiB)", "Razão"]
+    print(tabulate(linhas, headers=cabecalho, tablefmt="fancy_grid", floatfmt=".3f"))
+    for nome, medida, razao in regressoes:
+        print(f"[REGRESSÃO] {nome}: {medida} {razao:.2f}x a base (tolerância {tolerancia:.0%})")
+    return regressoes
+
+# Função para ler os argumentos da linha de comando
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Mede o desempenho do analisador PCAP numa captura sintética.")
+    parser.add_argument("--captura", default=None,
+                        help="mede uma captura existente em vez de gerar a sintética")
+    parser.add_argument("--gerar", default=None, metavar="ARQUIVO",
+                        help="apenas grava a captura sintética neste arquivo, sem medir")
+    parser.add_argument("--pacotes", type=int, default=PARAMETROS_PADRAO['pacotes'],
+                        help=f"pacotes da captura sintética (padrão: {PARAMETROS_PADRAO['pacotes']})")
+    parser.add_argument("--semente", type=int, default=PARAMETROS_PADRAO['semente'],
+                        help="semente do gerador: a mesma semente produz a mesma captura")
+    parser.add_argument("--tamanhos", choices=DISTRIBUICOES_TAMANHO, default=PARAMETROS_PADRAO['tamanhos'],
+                        help=f"distribuição do tamanho da carga útil (padrão: {PARAMETROS_PADRAO['tamanhos']})")
+    parser.add_argument("--mistura", default=PARAMETROS_PADRAO['mistura'],
+                        help=f"pesos dos protocolos (padrão: {PARAMETROS_PADRAO['mistura']})")
+    parser.add_argument("--hosts", type=int, default=PARAMETROS_PADRAO['hosts'],
+                        help=f"quantidade de endereços IP distintos (padrão: {PARAMETROS_PADRAO['hosts']})")
+    parser.add_argument("--taxa-vlan", type=float, default=PARAMETROS_PADRAO['taxa_vlan'],
+                        help=f"fração dos quadros com tag 802.1Q (padrão: {PARAMETROS_PADRAO['taxa_vlan']})")
+    parser.add_argument("--taxa-truncados", type=float, default=PARAMETROS_PADRAO['taxa_truncados'],
+                        help=f"fração dos pacotes cortados no snaplen (padrão: {PARAMETROS_PADRAO['taxa_truncados']})")
+    parser.add_argument("--snaplen", type=int, default=PARAMETROS_PADRAO['snaplen'],
+                        help=f"bytes mantidos dos pacotes truncados (padrão: {PARAMETROS_PADRAO['snaplen']})")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=None, metavar="ETAPA",
+                        help="etapas medidas (padrão: todas): " + ", ".join(ETAPAS))
+    parser.add_argument("--repeticoes", type=int, default=3,
+                        help="execuções de cada etapa; vale o menor tempo (padrão: 3)")
+    parser.add_argument("--saida", default="benchmark_pcap.json",
+                        help="arquivo JSON com os resultados (padrão: benchmark_pcap.json)")
+    parser.add_argument("--comparar", default=None, metavar="ARQUIVO",
+                        help="compara com os resultados de uma execução anterior; regressões encerram com código 1")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help=f"aumento aceito na comparação, em fração (padrão: {TOLERANCIA_PADRAO})")
+    argumentos = parser.parse_args()
+    try:
+        ler_mistura(argumentos.mistura)
+    except ValueError as erro:
+        parser.error(str(erro))
+    if argumentos.repeticoes < 1:
+        parser.error("--repeticoes deve ser pelo menos 1")
+    return argumentos
+
+# Bloco principal da execução do programa
+if __name__ == "__main__":
+    argumentos = ler_argumentos()
+    parametros = {nome: getattr(argumentos, nome) for nome in PARAMETROS_PADRAO}
+
+    if argumentos.gerar:
+        tamanho = gerar_captura_sintetica(argumentos.gerar, **parametros)
+        print(f"[OK] Captura sintética gravada em {argumentos.gerar} ({tamanho} bytes)")
+        sys.exit(0)
+
+    etapas = argumentos.etapas or list(ETAPAS)
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        etapas = [nome for nome in etapas if nome != 'analise_colunar']
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        if argumentos.captura:
+            caminho = argumentos.captura
+            parametros = {'captura': os.path.abspath(caminho)}
+        else:
+            caminho = os.path.join(diretorio, "sintetica.pcap")
+            inicio = time.perf_counter()
+            gerar_captura_sintetica(caminho, **parametros)
+            print(f"[INFO] Captura sintética gerada em {time.perf_counter() - inicio:.1f} s")
+        resultados = {
+            'versao': VERSAO_RESULTADOS,
+            'data': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'captura': {'parametros': parametros, 'bytes': os.path.getsize(caminho)},
+            'etapas': executar_benchmark(caminho, etapas, argumentos.repeticoes)
+        }
+
+    with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+    print(f"[OK] Resultados gravados em {argumentos.saida}")
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+        if exibir_comparacao(resultados, anterior, argumentos.tolerancia):
+            sys.exit(1)
@@ -0,0 +1,364 @@
+# Representação colunar (NumPy) de um arquivo PCAP.
+# Os offsets dos registros são localizados uma única vez; depois os cabeçalhos de registro e
+# os cabeçalhos IPv4 são copiados para arrays com dtype estruturado, e cada relatório vira uma
+# operação vetorizada (min/max, média com máscara, comparação) em vez de um laço por pacote.
+# Um filtro (filtro_pcap) vira uma máscara booleana sobre as colunas, aplicada antes dos relatórios.
+import copy
+import mmap
+import struct
+
+import numpy as np
+
+from .analise_pcap import CAMPOS_HEADERS_IP, LinhasHeadersIp, inteiro_para_ip, par_da_chave
+from .leitura_pcap import TAMANHO_CABECALHO_GLOBAL, decodificar_cabecalho_global
+from .decodificacao_pcap import (
+    AF_INET, ETHERTYPE_IPV4, ETHERTYPES_VLAN, LINKTYPE_ETHERNET, LINKTYPE_IPV4, LINKTYPE_LINUX_SLL,
+    LINKTYPE_LINUX_SLL2, LINKTYPE_NULL, LINKTYPE_RAW, LINKTYPE_RAW_DLT_12, LINKTYPE_RAW_DLT_14
+)
+
+# Cabeçalho de cada registro do PCAP clássico, na ordem de bytes do arquivo
+DTYPES_REGISTRO = {
+    ordem: np.dtype([
+        ('ts_sec', ordem + 'u4'),
+        ('ts_frac', ordem + 'u4'),
+        ('caplen', ordem + 'u4'),
+        ('origlen', ordem + 'u4')
+    ])
+    for ordem in '<>'
+}
+
+# Cabeçalho IPv4 sem opções (20 bytes, campos em ordem de rede)
+DTYPE_CABECALHO_IP = np.dtype([
+    ('versao_ihl', 'u1'),
+    ('tos', 'u1'),
+    ('tamanho_total', '>u2'),
+    ('identificacao', '>u2'),
+    ('flags_fragmento', '>u2'),
+    ('ttl', 'u1'),
+    ('protocolo', 'u1'),
+    ('checksum', '>u2'),
+    ('ip_origem', '>u4'),
+    ('ip_destino', '>u4')
+])
+
+# Tamanho do cabeçalho de cada registro: os dados do pacote começam logo depois dele
+TAMANHO_REGISTRO = 16
+
+# Tipos de enlace em que o quadro já começa no cabeçalho IP
+LINKTYPES_IP_BRUTO = (LINKTYPE_RAW, LINKTYPE_RAW_DLT_12, LINKTYPE_RAW_DLT_14, LINKTYPE_IPV4)
+
+# Função para localizar o offset de cada registro completo do arquivo mapeado.
+# Cada registro só é encontrado depois de lido o caplen do anterior, então, no caso geral, este é um laço em
+# Python por registro (a única parte não vetorizada da carga). Quando todos os registros têm caplen igual ao
+# snaplen (captura com snaplen pequeno, só cabeçalhos), os offsets formam uma progressão aritmética: ela é
+# calculada e conferida de forma vetorizada, e o laço só roda se a conferência falhar
+def localizar_offsets(mapa, ordem='<', snaplen=None):
+    if snaplen:
+        offsets = offsets_tamanho_fixo(mapa, ordem, snaplen)
+        if offsets is not None:
+            return offsets
+    desempacotar = struct.Struct(ordem + 'I').unpack_from
+    tamanho_arquivo = len(mapa)
+    offsets = []
+    posicao = TAMANHO_CABECALHO_GLOBAL
+    while posicao + 16 <= tamanho_arquivo:
+        caplen = desempacotar(mapa, posicao + 8)[0]
+        if posicao + 16 + caplen > tamanho_arquivo:
+            break  # Arquivo truncado
+        offsets.append(posicao)
+        posicao += 16 + caplen
+    return np.array(offsets, dtype=np.int64)
+
+# Função para os offsets dos registros quando todos têm 16 + snaplen bytes; retorna None se algum registro
+# tem outro caplen (basta conferir o caplen de cada candidato: o primeiro começa logo após o cabeçalho global)
+def offsets_tamanho_fixo(mapa, ordem, snaplen):
+    tamanho_registro = TAMANHO_REGISTRO + snaplen
+    quantidade = (len(mapa) - TAMANHO_CABECALHO_GLOBAL) // tamanho_registro
+    offsets = TAMANHO_CABECALHO_GLOBAL + np.arange(quantidade, dtype=np.int64) * tamanho_registro
+    caplen = reunir_campos(np.frombuffer(mapa, dtype=np.uint8), offsets + 8, 4, np.dtype(ordem + 'u4'))
+    if quantidade == 0 or not (caplen == snaplen).all():
+        return None
+    return offsets
+
+# Função para copiar 'largura' bytes a partir de cada offset e interpretá-los com o dtype dado.
+# A cópia é feita byte a byte da largura (um np.take por deslocamento), reaproveitando um único array de
+# posições: a memória temporária é de 8 bytes por pacote, e não de uma matriz de índices pacotes x largura
+def reunir_campos(buffer, offsets, largura, dtype):
+    saida = np.empty((len(offsets), largura), dtype=np.uint8)
+    posicoes = np.empty(len(offsets), dtype=np.int64)
+    for deslocamento in range(largura):
+        np.add(offsets, deslocamento, out=posicoes)
+        # mode='clip': um campo cortado no fim do arquivo repete o último byte em vez de sair do buffer
+        saida[:, deslocamento] = np.take(buffer, posicoes, mode='clip')
+    return saida.view(dtype).reshape(-1)
+
+# Função para ler um campo de 16 bits (ordem de rede) na posição 'posicao' dos dados de cada pacote
+def reunir_16bits(buffer, offsets, posicao):
+    return reunir_campos(buffer, offsets + TAMANHO_REGISTRO + posicao, 2, np.dtype('>u2')).astype(np.uint32)
+
+# Função que localiza, de forma vetorizada, o início do cabeçalho IPv4 nos dados de cada pacote.
+# Segue as mesmas regras de decodificacao_pcap; retorna (posição do IPv4, máscara de pacotes IPv4)
+def localizar_inicio_ip(buffer, offsets, caplen, tipo_link):
+    quantidade = len(offsets)
+    if tipo_link == LINKTYPE_ETHERNET:
+        posicao = np.full(quantidade, 12, dtype=np.int64)
+        valido = caplen >= 14
+        ethertype = reunir_16bits(buffer, offsets, posicao)
+        # Pula as tags VLAN (802.1Q, QinQ) até que nenhum pacote tenha outra tag
+        while True:
+            com_tag = valido & np.isin(ethertype, ETHERTYPES_VLAN)
+            if not com_tag.any():
+                break
+            posicao[com_tag] += 4
+            valido &= ~com_tag | (caplen >= posicao + 2)
+            com_tag &= valido
+            ethertype[com_tag] = reunir_16bits(buffer, offsets[com_tag], posicao[com_tag])
+        return posicao + 2, valido & (ethertype == ETHERTYPE_IPV4)
+
+    if tipo_link == LINKTYPE_LINUX_SLL:
+        valido = (caplen >= 16) & (reunir_16bits(buffer, offsets, 14) == ETHERTYPE_IPV4)
+        return np.full(quantidade, 16, dtype=np.int64), valido
+    if tipo_link == LINKTYPE_LINUX_SLL2:
+        valido = (caplen >= 20) & (reunir_16bits(buffer, offsets, 0) == ETHERTYPE_IPV4)
+        return np.full(quantidade, 20, dtype=np.int64), valido
+    if tipo_link in LINKTYPES_IP_BRUTO:
+        return np.zeros(quantidade, dtype=np.int64), np.ones(quantidade, dtype=bool)
+    if tipo_link == LINKTYPE_NULL:
+        familia = reunir_campos(buffer, offsets + TAMANHO_REGISTRO, 4, np.dtype('<u4'))
+        valido = (caplen >= 4) & ((familia == AF_INET) | (familia.byteswap() == AF_INET))
+        return np.full(quantidade, 4, dtype=np.int64), valido
+
+    # Tipo de enlace não suportado: nenhum pacote tem IPv4 reconhecido
+    return np.zeros(quantidade, dtype=np.int64), np.zeros(quantidade, dtype=bool)
+
+# Função que lê as portas TCP/UDP dos pacotes IPv4 (mesmas regras de filtro_pcap.portas_transporte:
+# só TCP/UDP, sem fragmentos seguintes e com as portas dentro do que foi capturado; senão -1)
+# Retorna um array (2, pacotes IPv4) com as portas de origem e de destino
+def localizar_portas(buffer, offsets, caplen, inicio_ip, cabecalhos_ip):
+    inicio_transporte = inicio_ip + (cabecalhos_ip['versao_ihl'] & 0x0F).astype(np.int64) * 4
+    com_portas = np.isin(cabecalhos_ip['protocolo'], (6, 17)) & ((cabecalhos_ip['flags_fragmento'] & 0x1FFF) == 0)
+    com_portas &= caplen >= inicio_transporte + 4
+    portas = np.full((2, len(offsets)), -1, dtype=np.int32)
+    if com_portas.any():
+        lidas = reunir_campos(buffer, offsets[com_portas] + TAMANHO_REGISTRO + inicio_transporte[com_portas], 4,
+                              np.dtype('>u2')).reshape(-1, 2)
+        portas[:, com_portas] = lidas.T
+    return portas
+
+# Colunas decodificadas de uma captura inteira
+class ColunasPcap:
+    # Colunas com um valor por pacote e colunas só dos pacotes IPv4 (alinhadas com tem_ip)
+    COLUNAS_POR_PACOTE = ('offsets', 'ts_sec', 'ts_frac', 'caplen', 'origlen', 'timestamp', 'tem_ip')
+    COLUNAS_POR_IP = ('cabecalho_ip', 'protocolo', 'ip_origem', 'ip_destino', 'origlen_ip',
+                      'porta_origem', 'porta_destino')
+
+    def __init__(self, offsets, registros, cabecalhos_ip, tem_ip, divisor=1_000_000, portas=None):
+        self.offsets = offsets
+        self.ts_sec = registros['ts_sec'].astype(np.uint32)
+        # Fração do segundo em microssegundos ou nanossegundos, conforme o magic do arquivo
+        self.ts_frac = registros['ts_frac'].astype(np.uint32)
+        self.caplen = registros['caplen'].astype(np.uint32)
+        self.origlen = registros['origlen'].astype(np.uint32)
+        self.timestamp = self.ts_sec + self.ts_frac / divisor
+
+        # Pacotes IPv4 com o cabeçalho (20 bytes) inteiro capturado
+        self.tem_ip = tem_ip
+        self.cabecalho_ip = cabecalhos_ip[self.tem_ip]
+        self.protocolo = self.cabecalho_ip['protocolo'].astype(np.uint32)
+        self.ip_origem = self.cabecalho_ip['ip_origem'].astype(np.uint32)
+        self.ip_destino = self.cabecalho_ip['ip_destino'].astype(np.uint32)
+        self.origlen_ip = self.origlen[self.tem_ip]
+
+        # Portas TCP/UDP dos pacotes IPv4 (-1 quando não há portas, como em filtro_pcap.portas_transporte)
+        if portas is None:
+            portas = np.full((2, len(self.ip_origem)), -1, dtype=np.int32)
+        self.porta_origem, self.porta_destino = portas
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Devolve uma cópia só com os pacotes em que 'mascara' (um booleano por pacote) é verdadeira
+    def filtrar(self, mascara):
+        filtradas = copy.copy(self)
+        mascara_ip = mascara[self.tem_ip]
+        for nome in self.COLUNAS_POR_PACOTE:
+            setattr(filtradas, nome, getattr(self, nome)[mascara])
+        for nome in self.COLUNAS_POR_IP:
+            setattr(filtradas, nome, getattr(self, nome)[mascara_ip])
+        return filtradas
+
+# Função para saber se a captura pode ser carregada em colunas (registros de tamanho fixo do pcap
+# clássico; o pcapng, com blocos e interfaces variáveis, usa o motor de uma passada)
+def suporta_colunas(cabecalho):
+    return cabecalho['formato'] == "pcap"
+
+# Função para carregar as colunas de um arquivo PCAP
+def carregar_colunas_pcap(caminho_arquivo):
+    with open(caminho_arquivo, 'rb') as arquivo:
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        cabecalho = decodificar_cabecalho_global(mapa[0:TAMANHO_CABECALHO_GLOBAL])
+        if not suporta_colunas(cabecalho):
+            raise Exception("A análise colunar só aceita o formato pcap clássico.")
+        buffer = np.frombuffer(mapa, dtype=np.uint8)
+        offsets = localizar_offsets(mapa, cabecalho['ordem'], cabecalho['snaplen'])
+        registros = reunir_campos(buffer, offsets, 16, DTYPES_REGISTRO[cabecalho['ordem']])
+        caplen = registros['caplen'].astype(np.int64)
+        inicio_ip, tem_ip = localizar_inicio_ip(buffer, offsets, caplen, cabecalho['linktype'])
+        cabecalhos_ip = reunir_campos(buffer, offsets + TAMANHO_REGISTRO + inicio_ip, 20, DTYPE_CABECALHO_IP)
+        # Versão 4, IHL válido e cabeçalho inteiro dentro do que foi capturado
+        tem_ip &= caplen >= inicio_ip + 20
+        tem_ip &= (cabecalhos_ip['versao_ihl'] >> 4 == 4) & ((cabecalhos_ip['versao_ihl'] & 0x0F) >= 5)
+        portas = localizar_portas(buffer, offsets[tem_ip], caplen[tem_ip], inicio_ip[tem_ip], cabecalhos_ip[tem_ip])
+        del buffer
+    finally:
+        mapa.close()
+    return ColunasPcap(offsets, registros, cabecalhos_ip, tem_ip, cabecalho['divisor'], portas)
+
+# Função para marcar todos os pacotes a partir de uma máscara calculada só sobre os pacotes IPv4
+def expandir_mascara_ip(colunas, mascara_ip):
+    mascara = np.zeros(len(colunas), dtype=bool)
+    mascara[colunas.tem_ip] = mascara_ip
+    return mascara
+
+# Função que avalia a árvore de um filtro (filtro_pcap) sobre as colunas: um booleano por pacote
+def mascara_filtro(colunas, no):
+    tipo = no[0]
+    if tipo == 'e':
+        return mascara_filtro(colunas, no[1]) & mascara_filtro(colunas, no[2])
+    if tipo == 'ou':
+        return mascara_filtro(colunas, no[1]) | mascara_filtro(colunas, no[2])
+    if tipo == 'nao':
+        return ~mascara_filtro(colunas, no[1])
+    if tipo == 'ip':
+        return colunas.tem_ip.copy()
+    if tipo == 'protocolo':
+        return expandir_mascara_ip(colunas, colunas.protocolo == no[1])
+    if tipo in ('host', 'net'):
+        campos = {"src": [colunas.ip_origem], "dst": [colunas.ip_destino]}.get(no[1], [colunas.ip_origem, colunas.ip_destino])
+        mascara_ip = np.zeros(len(colunas.ip_origem), dtype=bool)
+        for campo in campos:
+            mascara_ip |= (campo == no[2]) if tipo == 'host' else ((campo & np.uint32(no[3])) == no[2])
+        return expandir_mascara_ip(colunas, mascara_ip)
+    if tipo == 'porta':
+        campos = {"src": [colunas.porta_origem], "dst": [colunas.porta_destino]}.get(
+            no[1], [colunas.porta_origem, colunas.porta_destino])
+        mascara_ip = np.zeros(len(colunas.ip_origem), dtype=bool)
+        for campo in campos:
+            mascara_ip |= campo == no[2]
+        return expandir_mascara_ip(colunas, mascara_ip)
+    if tipo == 'comparacao':
+        _, campo, operador, valor = no
+        if campo == "len":
+            return comparar(colunas.origlen.astype(np.int64), operador, valor)
+        return expandir_mascara_ip(colunas, comparar(colunas.cabecalho_ip[campo].astype(np.int64), operador, valor))
+    raise ValueError(f"nó de filtro desconhecido: {tipo}")
+
+# Função para aplicar um operador de comparação do filtro a um array
+def comparar(valores, operador, valor):
+    return {
+        "==": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal
+    }[operador](valores, valor)
+
+# Função para aplicar um filtro às colunas (sem filtro, devolve as próprias colunas)
+def aplicar_filtro_colunas(colunas, filtro=None):
+    if filtro is None:
+        return colunas
+    return colunas.filtrar(mascara_filtro(colunas, filtro.arvore))
+
+# Função auxiliar: entre as chaves com maior peso, devolve a que apareceu primeiro
+# (mesmo desempate do max() sobre um dicionário preenchido na ordem dos pacotes)
+def chave_mais_pesada(chaves, pesos=None):
+    unicas, primeira_ocorrencia, inverso = np.unique(chaves, return_index=True, return_inverse=True)
+    totais = np.bincount(inverso, weights=pesos, minlength=len(unicas))
+    candidatos = np.flatnonzero(totais == totais.max())
+    escolhido = candidatos[np.argmin(primeira_ocorrencia[candidatos])]
+    return unicas[escolhido], totais[escolhido]
+
+# Função para montar as linhas da tabela de cabeçalhos IP a partir das colunas
+# (os arrays NumPy são copiados direto para as colunas compactas de LinhasHeadersIp)
+def linhas_headers_ip(colunas):
+    ip = colunas.cabecalho_ip
+    valores = {
+        'versao': ip['versao_ihl'] >> 4,
+        'ihl': (ip['versao_ihl'] & 0x0F) * 4,
+        'tamanho_total': ip['tamanho_total'],
+        'identificacao': ip['identificacao'],
+        'flags': ip['flags_fragmento'] >> 13,
+        'fragment_offset': ip['flags_fragmento'] & 0x1FFF,
+        'ttl': ip['ttl'],
+        'protocolo': ip['protocolo'],
+        'ip_origem': colunas.ip_origem,
+        'ip_destino': colunas.ip_destino
+    }
+    linhas = LinhasHeadersIp()
+    for campo, tipo in CAMPOS_HEADERS_IP:
+        getattr(linhas, campo).frombytes(valores[campo].astype(np.dtype(tipo)).tobytes())
+    return linhas
+
+# Função que calcula os mesmos resultados de analise_pcap.executar_analise de forma vetorizada
+def executar_analise_colunar(colunas, incluir_headers_ip=True):
+    resultados = {}
+
+    if incluir_headers_ip:
+        resultados['headers_ip'] = {'linhas': linhas_headers_ip(colunas)}
+
+    if len(colunas):
+        resultados['intervalo_captura'] = {
+            'inicio': float(colunas.timestamp.min()),
+            'fim': float(colunas.timestamp.max())
+        }
+    else:
+        resultados['intervalo_captura'] = {'inicio': None, 'fim': None}
+
+    # Maior pacote TCP: argmax devolve a primeira ocorrência do maior origlen
+    mascara_tcp = colunas.protocolo == 6
+    maior_tcp = {'tamanho': 0, 'ip_origem': "", 'ip_destino': ""}
+    if mascara_tcp.any():
+        indices_tcp = np.flatnonzero(mascara_tcp)
+        indice = indices_tcp[np.argmax(colunas.origlen_ip[indices_tcp])]
+        if colunas.origlen_ip[indice] > 0:
+            maior_tcp = {
+                'tamanho': int(colunas.origlen_ip[indice]),
+                'ip_origem': inteiro_para_ip(colunas.ip_origem[indice]),
+                'ip_destino': inteiro_para_ip(colunas.ip_destino[indice])
+            }
+    resultados['maior_pacote_tcp'] = maior_tcp
+
+    resultados['pacotes_truncados'] = {
+        'total': len(colunas),
+        'truncados': int(np.count_nonzero(colunas.caplen < colunas.origlen))
+    }
+
+    mascara_udp = colunas.protocolo == 17
+    quantidade_udp = int(np.count_nonzero(mascara_udp))
+    soma_udp = int(colunas.origlen_ip[mascara_udp].sum(dtype=np.uint64))
+    resultados['tamanho_medio_udp'] = {
+        'quantidade': quantidade_udp,
+        'soma': soma_udp,
+        'media': soma_udp / quantidade_udp if quantidade_udp else None
+    }
+
+    if len(colunas.ip_origem):
+        # Par (origem, destino) empacotado numa única chave de 64 bits
+        pares = (colunas.ip_origem.astype(np.uint64) << np.uint64(32)) | colunas.ip_destino.astype(np.uint64)
+        par, total_bytes = chave_mais_pesada(pares, colunas.origlen_ip.astype(np.float64))
+        resultados['trafego_por_par'] = {
+            'par': par_da_chave(int(par)),
+            'bytes': int(total_bytes)
+        }
+
+        ip_interface, _ = chave_mais_pesada(colunas.ip_origem)
+        interacoes = np.union1d(
+            colunas.ip_destino[colunas.ip_origem == ip_interface],
+            colunas.ip_origem[colunas.ip_destino == ip_interface]
+        )
+        resultados['interacoes_interface'] = {
+            'ip_interface': inteiro_para_ip(ip_interface),
+            'total_interacoes': len(interacoes)
+        }
+    else:
+        resultados['trafego_por_par'] = {'par': None, 'bytes': 0}
+        resultados['interacoes_interface'] = {'ip_interface': None, 'total_interacoes': 0}
+
+    return resultados
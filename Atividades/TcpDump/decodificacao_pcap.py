@@ -0,0 +1,141 @@
+# Decodificação do cabeçalho IPv4 de acordo com o tipo de enlace (LinkType) do arquivo PCAP.
+# Para cada tipo de enlace é criado, uma única vez, um decodificador que localiza o início do IPv4
+# (Ethernet com ou sem 802.1Q/QinQ, Linux SLL/SLL2, IP bruto, loopback BSD) e descarta de forma
+# barata os quadros que não são IPv4 (ARP, IPv6, ...). Os campos são lidos com struct.Struct
+# pré-compilados, e o tamanho do cabeçalho vem do IHL (opções IP são respeitadas).
+import struct
+
+# Tipos de enlace suportados (https://www.tcpdump.org/linktypes.html)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_RAW_DLT_12 = 12  # DLT_RAW em alguns BSDs
+LINKTYPE_RAW_DLT_14 = 14  # DLT_RAW no OpenBSD
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_LINUX_SLL2 = 276
+
+# Valor usado quando o tipo de enlace não é único no arquivo (pcapng com várias interfaces):
+# cada pacote traz então o tipo de enlace da sua interface em pacote['linktype']
+LINKTYPE_POR_INTERFACE = -1
+
+# EtherTypes relevantes
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPES_VLAN = (0x8100, 0x88A8, 0x9100)  # 802.1Q, 802.1ad (QinQ) e o QinQ legado
+
+# Família AF_INET no cabeçalho de 4 bytes do loopback BSD (gravado na ordem do host)
+AF_INET = 2
+
+# Unpackers pré-compilados
+ETHERTYPE = struct.Struct('!H')
+FAMILIA_NULL_LITTLE = struct.Struct('<I')
+FAMILIA_NULL_BIG = struct.Struct('>I')
+CABECALHO_IPV4 = struct.Struct('!BBHHHBBHII')
+
+# Função para decodificar um cabeçalho IPv4 que começa em 'inicio'
+# Retorna None se não houver 20 bytes capturados, se a versão não for 4 ou se o IHL for inválido
+def decodificar_ipv4(dados, inicio):
+    if len(dados) < inicio + 20:
+        return None
+
+    (versao_ihl, _, tamanho_total, identificacao, flags_fragmento,
+     ttl, protocolo, _, ip_origem, ip_destino) = CABECALHO_IPV4.unpack_from(dados, inicio)
+    ihl = (versao_ihl & 0x0F) * 4
+    if versao_ihl >> 4 != 4 or ihl < 20:
+        return None
+
+    return {
+        'versao': 4,
+        'ihl': ihl,
+        'tamanho_total': tamanho_total,
+        'identificacao': identificacao,
+        'flags': flags_fragmento >> 13,
+        'fragment_offset': flags_fragmento & 0x1FFF,
+        'ttl': ttl,
+        # Protocolo da camada de transporte segundo a IANA: TCP = 6, UDP = 17, ICMP = 1
+        'protocolo': protocolo,
+        # Endereços como inteiros de 32 bits: comparações e chaves de dicionário baratas
+        'ip_origem': ip_origem,
+        'ip_destino': ip_destino,
+        # Posição do cabeçalho de transporte dentro do quadro (após as opções IP)
+        'inicio_transporte': inicio + ihl
+    }
+
+# Ethernet II, pulando quantas tags VLAN houver (802.1Q, QinQ)
+def decodificar_ethernet(dados):
+    if len(dados) < 14:
+        return None
+    posicao = 12
+    ethertype = ETHERTYPE.unpack_from(dados, posicao)[0]
+    while ethertype in ETHERTYPES_VLAN:
+        posicao += 4
+        if len(dados) < posicao + 2:
+            return None
+        ethertype = ETHERTYPE.unpack_from(dados, posicao)[0]
+    if ethertype != ETHERTYPE_IPV4:
+        return None
+    return decodificar_ipv4(dados, posicao + 2)
+
+# Linux "cooked" capture v1: cabeçalho de 16 bytes, protocolo nos bytes 14-15
+def decodificar_linux_sll(dados):
+    if len(dados) < 16 or ETHERTYPE.unpack_from(dados, 14)[0] != ETHERTYPE_IPV4:
+        return None
+    return decodificar_ipv4(dados, 16)
+
+# Linux "cooked" capture v2: cabeçalho de 20 bytes, protocolo nos bytes 0-1
+def decodificar_linux_sll2(dados):
+    if len(dados) < 20 or ETHERTYPE.unpack_from(dados, 0)[0] != ETHERTYPE_IPV4:
+        return None
+    return decodificar_ipv4(dados, 20)
+
+# IP bruto: o quadro já começa no cabeçalho IP (a versão é conferida em decodificar_ipv4)
+def decodificar_ip_bruto(dados):
+    return decodificar_ipv4(dados, 0)
+
+# Loopback BSD: família de endereços em 4 bytes na ordem do host que gravou a captura
+def decodificar_null(dados):
+    if len(dados) < 4:
+        return None
+    if AF_INET not in (FAMILIA_NULL_LITTLE.unpack_from(dados, 0)[0], FAMILIA_NULL_BIG.unpack_from(dados, 0)[0]):
+        return None
+    return decodificar_ipv4(dados, 4)
+
+# Decodificador de cada tipo de enlace
+DECODIFICADORES = {
+    LINKTYPE_NULL: decodificar_null,
+    LINKTYPE_ETHERNET: decodificar_ethernet,
+    LINKTYPE_RAW: decodificar_ip_bruto,
+    LINKTYPE_RAW_DLT_12: decodificar_ip_bruto,
+    LINKTYPE_RAW_DLT_14: decodificar_ip_bruto,
+    LINKTYPE_IPV4: decodificar_ip_bruto,
+    LINKTYPE_LINUX_SLL: decodificar_linux_sll,
+    LINKTYPE_LINUX_SLL2: decodificar_linux_sll2
+}
+
+# Decodificador usado para tipos de enlace não suportados: nenhum pacote tem IPv4 reconhecido
+def decodificar_nada(dados):
+    return None
+
+# Função para obter o decodificador de um tipo de enlace (escolhido uma vez por arquivo)
+def criar_decodificador(tipo_link):
+    return DECODIFICADORES.get(tipo_link, decodificar_nada)
+
+# Função que devolve o decodificador de pacotes (dicionários) de um arquivo: um decodificador fixo
+# quando o tipo de enlace é único, ou um que escolhe pelo tipo de enlace da interface de cada pacote
+def criar_decodificador_pacotes(tipo_link):
+    if tipo_link != LINKTYPE_POR_INTERFACE:
+        decodificar = criar_decodificador(tipo_link)
+
+        def decodificar_pacote(pacote):
+            return decodificar(pacote['dados'])
+        return decodificar_pacote
+
+    decodificadores = {}
+
+    def decodificar_pacote_por_interface(pacote):
+        tipo_link_pacote = pacote['linktype']
+        decodificar = decodificadores.get(tipo_link_pacote)
+        if decodificar is None:
+            decodificar = decodificadores[tipo_link_pacote] = criar_decodificador(tipo_link_pacote)
+        return decodificar(pacote['dados'])
+    return decodificar_pacote_por_interface
@@ -0,0 +1,242 @@
+# Modo aproximado com memória fixa para capturas enormes (ex.: tráfego de varredura).
+# - Space-Saving (Metwally et al.) com k contadores para os pares de IPs com mais bytes e para os
+#   IPs de origem mais frequentes. Cada contagem estimada superestima a real em no máximo N/k,
+#   onde N é o total somado (bytes ou pacotes); qualquer item com contagem real > N/k está no resumo.
+# - HyperLogLog com 2^p registradores para a quantidade de IPs distintos que interagiram com a
+#   interface. Erro padrão relativo de aproximadamente 1,04 / sqrt(2^p) (p = 12: cerca de 1,6%).
+# O modo exato (analise_pcap) continua sendo o padrão.
+import heapq
+import math
+
+from .leitura_pcap import iterar_pacotes_pcap_mmap, ler_tipo_link
+from .analise_pcap import (
+    ACUMULADORES_PADRAO, AcumuladorTrafegoPorPar, AcumuladorInteracoesInterface,
+    executar_analise, inteiro_para_ip, par_da_chave
+)
+from .paralelo_pcap import executar_analise_paralela, deve_analisar_em_paralelo
+
+# Quantidade de contadores do Space-Saving
+CONTADORES_PADRAO = 1024
+
+# Precisão do HyperLogLog (2^p registradores de 1 byte)
+PRECISAO_HLL = 12
+
+# Quantidade de IPs de origem candidatos a interface, acompanhados com um HyperLogLog cada
+CANDIDATOS_INTERFACE = 64
+
+MASCARA_64 = (1 << 64) - 1
+
+# Função de espalhamento de 64 bits (splitmix64) para inteiros (endereços IPv4)
+def espalhar_64(valor):
+    valor = (valor + 0x9E3779B97F4A7C15) & MASCARA_64
+    valor = ((valor ^ (valor >> 30)) * 0xBF58476D1CE4E5B9) & MASCARA_64
+    valor = ((valor ^ (valor >> 27)) * 0x94D049BB133111EB) & MASCARA_64
+    return valor ^ (valor >> 31)
+
+# Resumo Space-Saving com k contadores (suporta pesos, ex.: bytes por pacote)
+class SpaceSaving:
+    def __init__(self, contadores=CONTADORES_PADRAO):
+        self.contadores = contadores
+        self.contagens = {}
+        self.erros = {}
+        # Heap de mínimo com (contagem, chave); entradas podem estar desatualizadas (contagem menor)
+        self.heap = []
+        self.total = 0
+
+    # Soma 'peso' à chave; retorna a chave que saiu do resumo para dar lugar a ela (ou None)
+    def adicionar(self, chave, peso=1):
+        self.total += peso
+        contagens = self.contagens
+        if chave in contagens:
+            contagens[chave] += peso
+            return None
+        if len(contagens) < self.contadores:
+            contagens[chave] = peso
+            self.erros[chave] = 0
+            heapq.heappush(self.heap, (peso, chave))
+            return None
+
+        # Resumo cheio: substitui a chave de menor contagem
+        minimo, chave_minima = self.remover_minimo()
+        del contagens[chave_minima]
+        del self.erros[chave_minima]
+        contagens[chave] = minimo + peso
+        self.erros[chave] = minimo
+        heapq.heappush(self.heap, (minimo + peso, chave))
+        return chave_minima
+
+    # Remove do heap a chave de menor contagem, corrigindo as entradas desatualizadas pelo caminho
+    def remover_minimo(self):
+        while True:
+            contagem, chave = heapq.heappop(self.heap)
+            atual = self.contagens[chave]
+            if atual == contagem:
+                return contagem, chave
+            heapq.heappush(self.heap, (atual, chave))
+
+    # Erro máximo de qualquer contagem estimada (limite N/k)
+    def erro_maximo(self):
+        return self.total // self.contadores
+
+    def mais_frequentes(self, quantidade):
+        # Empate: vale a chave que entrou primeiro no resumo (ordem do dicionário)
+        return sorted(self.contagens.items(), key=lambda item: item[1], reverse=True)[:quantidade]
+
+    # Menor contagem do resumo cheio (limite da contagem real de uma chave que ele não acompanha); 0 se há
+    # contadores livres, pois então toda chave vista está no resumo
+    def minimo(self):
+        return min(self.contagens.values()) if len(self.contagens) >= self.contadores else 0
+
+    # Mesclagem de resumos Space-Saving (Agarwal et al., "Mergeable Summaries"): uma chave ausente de um dos
+    # resumos recebe a menor contagem dele, como contagem e como erro. Os erros somam no máximo
+    # N1/k + N2/k = N/k, de modo que as garantias do resumo valem para o resumo mesclado
+    def mesclar(self, outro):
+        minimo, minimo_outro = self.minimo(), outro.minimo()
+        self.total += outro.total
+        for chave in self.contagens.keys() - outro.contagens.keys():
+            self.contagens[chave] += minimo_outro
+            self.erros[chave] += minimo_outro
+        for chave, contagem in outro.contagens.items():
+            self.contagens[chave] = self.contagens.get(chave, minimo) + contagem
+            self.erros[chave] = self.erros.get(chave, minimo) + outro.erros[chave]
+        if len(self.contagens) > self.contadores:
+            mantidas = sorted(self.contagens.items(), key=lambda item: item[1], reverse=True)[:self.contadores]
+            self.contagens = dict(mantidas)
+            self.erros = {chave: self.erros[chave] for chave in self.contagens}
+        self.heap = [(contagem, chave) for chave, contagem in self.contagens.items()]
+        heapq.heapify(self.heap)
+
+# Contador de elementos distintos HyperLogLog
+class HyperLogLog:
+    def __init__(self, precisao=PRECISAO_HLL):
+        self.precisao = precisao
+        self.registradores = bytearray(1 << precisao)
+
+    def adicionar(self, valor):
+        espalhado = espalhar_64(valor)
+        indice = espalhado >> (64 - self.precisao)
+        restante = (espalhado << self.precisao) & MASCARA_64
+        posicao = 64 - restante.bit_length() + 1 if restante else 64 - self.precisao + 1
+        if posicao > self.registradores[indice]:
+            self.registradores[indice] = posicao
+
+    def estimar(self):
+        m = len(self.registradores)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimativa = alfa * m * m / sum(2.0 ** -registrador for registrador in self.registradores)
+        zerados = self.registradores.count(0)
+        if estimativa <= 2.5 * m and zerados:
+            estimativa = m * math.log(m / zerados)  # Correção para cardinalidades pequenas
+        return round(estimativa)
+
+    def erro_relativo(self):
+        return 1.04 / math.sqrt(len(self.registradores))
+
+    def mesclar(self, outro):
+        self.registradores = bytearray(map(max, self.registradores, outro.registradores))
+
+# Acumulador aproximado do par de IPs com mais tráfego (mesmo nome e resultado do exato)
+class AcumuladorTrafegoPorParAproximado:
+    nome = AcumuladorTrafegoPorPar.nome
+    por_datagrama = True
+
+    def __init__(self, contadores=CONTADORES_PADRAO):
+        self.resumo = SpaceSaving(contadores)
+
+    def atualizar(self, pacote, ip):
+        if ip is not None:
+            self.resumo.adicionar((ip['ip_origem'] << 32) | ip['ip_destino'], pacote['origlen'])
+
+    def mesclar(self, outro):
+        self.resumo.mesclar(outro.resumo)
+
+    def finalizar(self):
+        mais_frequentes = self.resumo.mais_frequentes(1)
+        if not mais_frequentes:
+            return {'par': None, 'bytes': 0}
+        par, total = mais_frequentes[0]
+        return {
+            'par': par_da_chave(par),
+            'bytes': total,
+            'aproximado': True,
+            'erro_maximo': self.resumo.erro_maximo()
+        }
+
+# Acumulador aproximado das interações da interface local (mesmo nome e resultado do exato).
+# Os IPs de origem mais frequentes vêm de um Space-Saving com CANDIDATOS_INTERFACE contadores, e
+# cada origem monitorada tem um HyperLogLog com os IPs distintos com que interagiu. Quando uma
+# origem sai do resumo, o seu HyperLogLog é descartado (memória fixa: candidatos x 2^p bytes).
+class AcumuladorInteracoesInterfaceAproximado:
+    nome = AcumuladorInteracoesInterface.nome
+    por_datagrama = True
+
+    def __init__(self, candidatos=CANDIDATOS_INTERFACE, precisao=PRECISAO_HLL):
+        self.origens = SpaceSaving(candidatos)
+        self.precisao = precisao
+        self.interacoes = {}
+
+    def atualizar(self, pacote, ip):
+        if ip is None:
+            return
+        ip_origem = ip['ip_origem']
+        ip_destino = ip['ip_destino']
+        interacoes = self.interacoes
+
+        removida = self.origens.adicionar(ip_origem)
+        if removida is not None:
+            del interacoes[removida]
+        if ip_origem not in interacoes:
+            interacoes[ip_origem] = HyperLogLog(self.precisao)
+
+        interacoes[ip_origem].adicionar(ip_destino)
+        if ip_destino != ip_origem and ip_destino in interacoes:
+            interacoes[ip_destino].adicionar(ip_origem)
+
+    def mesclar(self, outro):
+        self.origens.mesclar(outro.origens)
+        for candidato, hll in outro.interacoes.items():
+            if candidato in self.interacoes:
+                self.interacoes[candidato].mesclar(hll)
+            else:
+                self.interacoes[candidato] = hll
+        self.interacoes = {
+            candidato: self.interacoes.get(candidato) or HyperLogLog(self.precisao)
+            for candidato in self.origens.contagens
+        }
+
+    def finalizar(self):
+        mais_frequentes = self.origens.mais_frequentes(1)
+        if not mais_frequentes:
+            return {'ip_interface': None, 'total_interacoes': 0}
+        ip_interface = mais_frequentes[0][0]
+        hll = self.interacoes[ip_interface]
+        return {
+            'ip_interface': inteiro_para_ip(ip_interface),
+            'total_interacoes': hll.estimar(),
+            'aproximado': True,
+            'erro_relativo': hll.erro_relativo()
+        }
+
+# Relatórios de estado ilimitado e os seus substitutos aproximados
+SUBSTITUTOS_APROXIMADOS = {
+    AcumuladorTrafegoPorPar: AcumuladorTrafegoPorParAproximado,
+    AcumuladorInteracoesInterface: AcumuladorInteracoesInterfaceAproximado
+}
+
+# Função para trocar, numa lista de classes de acumuladores, os exatos pelos aproximados
+def versao_aproximada(classes_acumuladores):
+    return [SUBSTITUTOS_APROXIMADOS.get(classe, classe) for classe in classes_acumuladores]
+
+# Acumuladores do modo aproximado: os padrão com os dois relatórios de estado ilimitado substituídos
+ACUMULADORES_APROXIMADOS = versao_aproximada(ACUMULADORES_PADRAO)
+
+# Função que analisa um arquivo no modo aproximado (em paralelo quando a captura é grande)
+def executar_analise_aproximada(caminho_arquivo, classes_acumuladores=None, filtro=None, remontar=False):
+    if classes_acumuladores is None:
+        classes_acumuladores = ACUMULADORES_APROXIMADOS
+    if deve_analisar_em_paralelo(caminho_arquivo):
+        return executar_analise_paralela(caminho_arquivo, classes_acumuladores=classes_acumuladores, filtro=filtro,
+                                         remontar=remontar)
+    acumuladores = [classe() for classe in classes_acumuladores]
+    return executar_analise(iterar_pacotes_pcap_mmap(caminho_arquivo), acumuladores, ler_tipo_link(caminho_arquivo),
+                            filtro, remontar)
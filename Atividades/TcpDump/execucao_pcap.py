@@ -0,0 +1,18 @@
+# Execução direta dos programas do pacote (python tcpdump.py, python selecao_pcap.py, ...).
+# Os módulos do pacote se importam de forma relativa; rodando um deles como script, ele ainda não faz parte
+# do pacote. Antes dos seus imports, o script chama entrar_no_pacote: o diretório acima do pacote entra no
+# sys.path, o pacote é importado e o nome devolvido vira o __package__ do script (PEP 366). Com
+# "python -m TcpDump.tcpdump" ou importado pelo pacote, o script já tem __package__ e nada disso acontece.
+import importlib
+import os
+import sys
+
+# Função para colocar o script 'arquivo' (o __file__ dele) dentro do seu pacote; retorna o nome do pacote
+def entrar_no_pacote(arquivo):
+    diretorio = os.path.dirname(os.path.abspath(arquivo))
+    raiz = os.path.dirname(diretorio)
+    if raiz not in sys.path:
+        sys.path.insert(0, raiz)
+    pacote = os.path.basename(diretorio)
+    importlib.import_module(pacote)
+    return pacote
@@ -0,0 +1,206 @@
+# Escrita incremental dos relatórios exportados (NDJSON, CSV e PDF).
+# As tabelas chegam como (título, linhas), em que 'linhas' é um iterável cuja primeira linha é o
+# cabeçalho; as demais são consumidas sob demanda e gravadas à medida que chegam, de modo que o pico
+# de memória da exportação não depende do tamanho da tabela. A saída pode ser comprimida em fluxo
+# (gzip da biblioteca padrão ou zstd, quando o pacote zstandard está instalado).
+# A tabela de cabeçalhos IP também pode ser exportada em formato colunar (Parquet ou Arrow IPC),
+# em grupos de linhas gravados à medida que os pacotes são decodificados.
+# Os pacotes opcionais (zstandard, pyarrow) só são importados quando a exportação os usa: o pyarrow
+# sozinho leva mais tempo para carregar do que o restante do analisador.
+import gzip
+import io
+import zlib
+from array import array
+from importlib.util import find_spec
+
+from .analise_pcap import CAMPOS_HEADERS_IP
+
+# Extensão acrescentada ao nome do arquivo para cada compressão
+EXTENSOES_COMPRESSAO = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# Linhas gravadas de uma vez pelo csv.writer (writerows) na exportação em blocos
+TAMANHO_BLOCO_CSV = 10_000
+
+# Linhas por grupo (row group do Parquet, record batch do Arrow) na exportação colunar:
+# cerca de 5 MiB de colunas em memória por vez
+TAMANHO_GRUPO_LINHAS = 262_144
+
+# Extensão do arquivo de cada formato colunar
+EXTENSOES_COLUNARES = {"parquet": "parquet", "arrow": "arrow"}
+
+# Função para saber se uma compressão pode ser usada neste ambiente
+# (o zstd é opcional: sem o pacote zstandard, só a compressão gzip fica disponível)
+def compressao_disponivel(compressao):
+    return compressao != "zstd" or find_spec("zstandard") is not None
+
+# Função para saber se a exportação colunar (Parquet, Arrow IPC) pode ser usada: depende do pacote pyarrow
+def colunar_disponivel():
+    return find_spec("pyarrow") is not None
+
+# Função para abrir o arquivo de saída em modo binário, comprimido em fluxo quando pedido
+def abrir_saida_binaria(nome_arquivo, compressao=None):
+    if compressao == "gzip":
+        return gzip.open(nome_arquivo, "wb")
+    if compressao == "zstd":
+        if not compressao_disponivel(compressao):
+            raise RuntimeError("a compressão zstd requer o pacote zstandard")
+        import zstandard
+
+        return zstandard.ZstdCompressor().stream_writer(open(nome_arquivo, "wb"), closefd=True)
+    return open(nome_arquivo, "wb")
+
+# Função para abrir o arquivo de saída em modo texto (UTF-8), comprimido em fluxo quando pedido
+def abrir_saida_texto(nome_arquivo, compressao=None, newline=None):
+    return io.TextIOWrapper(abrir_saida_binaria(nome_arquivo, compressao), encoding="utf-8", newline=newline)
+
+# Medidas da página (A4, em pontos) e do layout, as mesmas do FPDF: margens de 1 cm,
+# quebra automática de página a 2 cm da borda inferior e recuo de 1 mm do texto na célula
+MM = 72 / 25.4
+LARGURA_PAGINA = 210 * MM
+ALTURA_PAGINA = 297 * MM
+MARGEM = 10 * MM
+MARGEM_INFERIOR = 20 * MM
+RECUO_CELULA = 1 * MM
+
+# Fontes padrão do PDF (não embutidas), com a codificação WinAnsi (cp1252, cobre a acentuação)
+FONTES_PDF = {"F1": "Helvetica", "F2": "Helvetica-Bold"}
+
+# Classe que grava um PDF simples de texto página a página: cada página é comprimida e escrita
+# assim que fica cheia, e só os deslocamentos dos objetos (para a tabela xref) ficam em memória.
+# O FPDF guarda todas as páginas até output(), o que faria a memória crescer com a tabela
+class EscritorPdf:
+    def __init__(self, saida):
+        self.saida = saida
+        self.posicao = 0  # Contada aqui: a saída pode ser um fluxo comprimido, sem tell()
+        self.deslocamentos = {}
+        self.proximo_objeto = 3 + len(FONTES_PDF)  # 1: catálogo, 2: árvore de páginas, depois as fontes
+        self.paginas = []
+        self.conteudo = None
+        self.y = MARGEM
+        self.gravar(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for numero, fonte in enumerate(FONTES_PDF.values(), start=3):
+            self.gravar_objeto(numero, f"<< /Type /Font /Subtype /Type1 /BaseFont /{fonte} "
+                                       f"/Encoding /WinAnsiEncoding >>".encode("ascii"))
+
+    def gravar(self, dados):
+        self.saida.write(dados)
+        self.posicao += len(dados)
+
+    def gravar_objeto(self, numero, corpo):
+        self.deslocamentos[numero] = self.posicao
+        self.gravar(f"{numero} 0 obj\n".encode("ascii") + corpo + b"\nendobj\n")
+
+    def novo_objeto(self):
+        numero = self.proximo_objeto
+        self.proximo_objeto += 1
+        return numero
+
+    def fechar_pagina(self):
+        if self.conteudo is None:
+            return
+        dados = zlib.compress("\n".join(self.conteudo).encode("cp1252", "replace"))
+        numero_conteudo = self.novo_objeto()
+        self.gravar_objeto(numero_conteudo, f"<< /Length {len(dados)} /Filter /FlateDecode >>\nstream\n"
+                                            .encode("ascii") + dados + b"\nendstream")
+        numero_pagina = self.novo_objeto()
+        fontes = " ".join(f"/{nome} {numero} 0 R" for numero, nome in enumerate(FONTES_PDF, start=3))
+        self.gravar_objeto(numero_pagina, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {LARGURA_PAGINA:.2f} {ALTURA_PAGINA:.2f}] "
+            f"/Resources << /Font << {fontes} >> >> /Contents {numero_conteudo} 0 R >>"
+        ).encode("ascii"))
+        self.paginas.append(numero_pagina)
+        self.conteudo = None
+
+    # Escreve uma linha de texto numa célula de 'altura' milímetros, quebrando a página quando não cabe
+    def celula(self, texto, negrito=False, tamanho=10, altura=10):
+        altura *= MM
+        if self.conteudo is None or self.y + altura > ALTURA_PAGINA - MARGEM_INFERIOR:
+            self.fechar_pagina()
+            self.conteudo = []
+            self.y = MARGEM
+        texto = texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        base = ALTURA_PAGINA - (self.y + 0.5 * altura + 0.3 * tamanho)
+        fonte = "F2" if negrito else "F1"
+        self.conteudo.append(f"BT /{fonte} {tamanho:.2f} Tf {MARGEM + RECUO_CELULA:.2f} {base:.2f} Td ({texto}) Tj ET")
+        self.y += altura
+
+    # Espaço vertical em branco (como FPDF.ln)
+    def espaco(self, altura):
+        self.y += altura * MM
+
+    # Grava a árvore de páginas, o catálogo, a tabela xref e o trailer
+    def fechar(self):
+        if self.conteudo is None and not self.paginas:
+            self.conteudo = []  # Um PDF sem nenhuma tabela ainda tem uma página (em branco)
+        self.fechar_pagina()
+        filhos = " ".join(f"{numero} 0 R" for numero in self.paginas)
+        self.gravar_objeto(2, f"<< /Type /Pages /Kids [{filhos}] /Count {len(self.paginas)} >>".encode("ascii"))
+        self.gravar_objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        inicio_xref = self.posicao
+        total = self.proximo_objeto
+        self.gravar(f"xref\n0 {total}\n0000000000 65535 f \n".encode("ascii"))
+        for numero in range(1, total):
+            self.gravar(f"{self.deslocamentos[numero]:010d} 00000 n \n".encode("ascii"))
+        self.gravar(f"trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode("ascii"))
+
+# Função para montar o esquema Arrow da tabela de cabeçalhos IP: a captura de origem (dicionário),
+# o número do pacote e os campos com o mesmo tipo sem sinal dos arrays de LinhasHeadersIp
+# (os endereços ficam como inteiros de 32 bits, como no restante do código)
+def esquema_headers_ip():
+    import pyarrow
+
+    tipos = {'B': pyarrow.uint8(), 'H': pyarrow.uint16(), 'I': pyarrow.uint32()}
+    return pyarrow.schema(
+        [('arquivo', pyarrow.dictionary(pyarrow.int32(), pyarrow.string())), ('pacote', pyarrow.uint64())]
+        + [(campo, tipos[tipo]) for campo, tipo in CAMPOS_HEADERS_IP]
+    )
+
+# Função para converter um bloco de LinhasHeadersIp num record batch, sem copiar as colunas
+# 'arquivos' é a lista das capturas vistas até aqui: o dicionário só cresce (deltas, aceitos no Arrow IPC)
+def lote_headers_ip(esquema, arquivos, primeiro, linhas):
+    import pyarrow
+
+    quantidade = len(linhas)
+    indices = array('i', [len(arquivos) - 1]) * quantidade
+    colunas = [
+        pyarrow.DictionaryArray.from_arrays(
+            pyarrow.Array.from_buffers(pyarrow.int32(), quantidade, [None, pyarrow.py_buffer(indices)]),
+            pyarrow.array(arquivos, pyarrow.string())
+        ),
+        pyarrow.array(range(primeiro, primeiro + quantidade), pyarrow.uint64())
+    ]
+    for campo, _ in CAMPOS_HEADERS_IP:
+        colunas.append(pyarrow.Array.from_buffers(esquema.field(campo).type, quantidade,
+                                                  [None, pyarrow.py_buffer(getattr(linhas, campo))]))
+    return pyarrow.RecordBatch.from_arrays(colunas, schema=esquema)
+
+# Função para gravar a tabela de cabeçalhos IP em Parquet ou Arrow IPC, um grupo de linhas por bloco
+# 'blocos' produz (captura, LinhasHeadersIp); a numeração dos pacotes recomeça em cada captura
+# Retorna a quantidade de linhas gravadas
+def exportar_headers_colunar(blocos, nome_arquivo, formato, compressao=None):
+    if not colunar_disponivel():
+        raise RuntimeError("a exportação colunar requer o pacote pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    esquema = esquema_headers_ip()
+    if formato == "parquet":
+        escritor = pyarrow.parquet.ParquetWriter(nome_arquivo, esquema, compression=compressao or "snappy")
+    else:
+        if compressao == "gzip":
+            raise ValueError("o Arrow IPC aceita apenas a compressão zstd")
+        opcoes = pyarrow.ipc.IpcWriteOptions(compression=compressao, emit_dictionary_deltas=True)
+        escritor = pyarrow.ipc.new_file(nome_arquivo, esquema, options=opcoes)
+
+    arquivos = []
+    proximo_numero = 1
+    total = 0
+    with escritor:
+        for arquivo, linhas in blocos:
+            if not arquivos or arquivos[-1] != arquivo:
+                arquivos.append(arquivo)
+                proximo_numero = 1
+            escritor.write_batch(lote_headers_ip(esquema, arquivos, proximo_numero, linhas))
+            proximo_numero += len(linhas)
+            total += len(linhas)
+    return total
@@ -0,0 +1,287 @@
+# Expressões de filtro no estilo BPF/tcpdump (ex.: "tcp and host 10.0.0.5 and len > 1000").
+# A expressão é analisada uma única vez numa árvore de nós (tuplas) e montada num predicado
+# predicado(pacote, ip) sobre os campos já decodificados, que o motor de analise_pcap aplica antes
+# de alimentar os acumuladores. O modo colunar (colunar_pcap) converte a mesma árvore numa máscara NumPy.
+#
+# Primitivas aceitas:
+#   ip | tcp | udp | icmp | [ip] proto N
+#   [src|dst] host ENDEREÇO | [src|dst] ENDEREÇO | [src|dst] net ENDEREÇO/PREFIXO
+#   [tcp|udp] [src|dst] port N
+#   len OP N | ttl OP N | greater N | less N      (OP: = == != < <= > >=; len é o tamanho original)
+# Combinadas com and/&&, or/||, not/! e parênteses.
+import operator
+import re
+import struct
+from functools import partial
+
+# Protocolos com nome próprio na expressão
+PROTOCOLOS_FILTRO = {"icmp": 1, "tcp": 6, "udp": 17}
+
+# Protocolos com portas (as primitivas "port" só casam com eles)
+PROTOCOLOS_COM_PORTAS = (6, 17)
+
+# Campos comparáveis: nome na expressão -> (campo, exige IPv4); len vem do pacote, os demais do cabeçalho IP
+CAMPOS_COMPARACAO = {
+    "len": ("origlen", False),
+    "ttl": ("ttl", True)
+}
+
+# Operadores de comparação da expressão -> operador normalizado (na árvore)
+SIMBOLOS_COMPARACAO = {"=": "==", "==": "==", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+# Operador normalizado -> função de comparação do predicado
+OPERADORES_COMPARACAO = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge
+}
+
+# Direção de "host"/"net" -> campo do cabeçalho IP comparado (sem direção, vale qualquer um dos dois)
+CAMPOS_DIRECAO = {"src": "ip_origem", "dst": "ip_destino"}
+
+# Direção de "port" -> posição em (porta de origem, porta de destino) (sem direção, vale qualquer uma)
+POSICOES_PORTA = {"src": 0, "dst": 1}
+
+# Portas de origem e destino (início dos cabeçalhos TCP e UDP)
+PORTAS = struct.Struct('!HH')
+
+# Sem portas (não é TCP/UDP, é um fragmento seguinte ou as portas não foram capturadas)
+SEM_PORTAS = (-1, -1)
+
+TOKEN = re.compile(r"\s*(?:(\d+\.\d+\.\d+\.\d+(?:/\d+)?)|(\d+)|(&&|\|\||!=|==|<=|>=|[()!<>=])|([A-Za-z_]\w*))")
+
+# Função para devolver as portas (origem, destino) de um pacote TCP/UDP, ou SEM_PORTAS
+def portas_transporte(pacote, ip):
+    if ip['protocolo'] not in PROTOCOLOS_COM_PORTAS or ip['fragment_offset']:
+        return SEM_PORTAS
+    dados = pacote['dados']
+    inicio = ip['inicio_transporte']
+    if len(dados) < inicio + 4:
+        return SEM_PORTAS
+    return PORTAS.unpack_from(dados, inicio)
+
+# Função para converter "a.b.c.d" num inteiro de 32 bits
+def ip_para_inteiro(texto):
+    partes = [int(parte) for parte in texto.split(".")]
+    if any(parte > 255 for parte in partes):
+        raise ValueError(f"endereço IPv4 inválido no filtro: {texto}")
+    return int.from_bytes(bytes(partes), 'big')
+
+# Função para dividir a expressão em tokens (tipo, valor)
+def separar_tokens(expressao):
+    tokens = []
+    posicao = 0
+    expressao = expressao.rstrip()
+    while posicao < len(expressao):
+        encontrado = TOKEN.match(expressao, posicao)
+        if encontrado is None:
+            raise ValueError(f"caractere inesperado no filtro na posição {posicao}: {expressao[posicao:]!r}")
+        endereco, numero, simbolo, palavra = encontrado.groups()
+        if endereco is not None:
+            tokens.append(("endereco", endereco))
+        elif numero is not None:
+            tokens.append(("numero", int(numero)))
+        elif simbolo is not None:
+            tokens.append(("simbolo", simbolo))
+        else:
+            tokens.append(("palavra", palavra.lower()))
+        posicao = encontrado.end()
+    return tokens
+
+# Classe do analisador sintático (descida recursiva); produz a árvore de nós:
+# ('e', a, b), ('ou', a, b), ('nao', a), ('ip',), ('protocolo', n), ('host', direcao, endereco),
+# ('net', direcao, rede, mascara), ('porta', direcao, n), ('comparacao', campo, operador, n)
+class AnalisadorFiltro:
+    def __init__(self, expressao):
+        self.tokens = separar_tokens(expressao)
+        self.posicao = 0
+
+    def olhar(self):
+        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else (None, None)
+
+    def consumir(self, tipo=None, valor=None):
+        atual = self.olhar()
+        if atual[0] is None or (tipo is not None and atual[0] != tipo) or (valor is not None and atual[1] != valor):
+            esperado = valor or tipo or "mais termos"
+            encontrado = atual[1] if atual[0] is not None else "o fim da expressão"
+            raise ValueError(f"filtro inválido: esperava {esperado}, encontrou {encontrado}")
+        self.posicao += 1
+        return atual[1]
+
+    def aceitar(self, *valores):
+        if self.olhar()[1] in valores:
+            self.posicao += 1
+            return True
+        return False
+
+    def analisar(self):
+        arvore = self.expressao_ou()
+        if self.posicao != len(self.tokens):
+            raise ValueError(f"filtro inválido: termo inesperado {self.olhar()[1]}")
+        return arvore
+
+    def expressao_ou(self):
+        no = self.expressao_e()
+        while self.aceitar("or", "||"):
+            no = ('ou', no, self.expressao_e())
+        return no
+
+    def expressao_e(self):
+        no = self.unario()
+        while self.aceitar("and", "&&"):
+            no = ('e', no, self.unario())
+        return no
+
+    def unario(self):
+        if self.aceitar("not", "!"):
+            return ('nao', self.unario())
+        if self.aceitar("("):
+            no = self.expressao_ou()
+            self.consumir("simbolo", ")")
+            return no
+        return self.primitiva()
+
+    def primitiva(self):
+        tipo, valor = self.olhar()
+        if tipo == "palavra" and valor in PROTOCOLOS_FILTRO:
+            self.posicao += 1
+            no = ('protocolo', PROTOCOLOS_FILTRO[valor])
+            # "tcp port 80", "udp dst port 53": o protocolo qualifica a primitiva de porta
+            if valor != "icmp" and self.olhar()[1] in ("src", "dst", "port"):
+                no = ('e', no, self.primitiva_direcionada())
+            return no
+        if self.aceitar("ip"):
+            if self.aceitar("proto"):
+                return ('protocolo', self.numero(255))
+            return ('ip',)
+        if self.aceitar("proto"):
+            return ('protocolo', self.numero(255))
+        if tipo == "palavra" and valor in CAMPOS_COMPARACAO:
+            self.posicao += 1
+            operador = self.consumir("simbolo")
+            if operador not in SIMBOLOS_COMPARACAO:
+                raise ValueError(f"filtro inválido: operador de comparação desconhecido {operador}")
+            return ('comparacao', valor, SIMBOLOS_COMPARACAO[operador], self.numero())
+        if self.aceitar("greater"):
+            return ('comparacao', "len", ">=", self.numero())
+        if self.aceitar("less"):
+            return ('comparacao', "len", "<=", self.numero())
+        return self.primitiva_direcionada()
+
+    def primitiva_direcionada(self):
+        direcao = None
+        if self.aceitar("src"):
+            direcao = "src"
+        elif self.aceitar("dst"):
+            direcao = "dst"
+
+        if self.aceitar("port"):
+            return ('porta', direcao, self.numero(65535))
+        if self.aceitar("net"):
+            texto = self.consumir("endereco")
+            endereco, _, prefixo = texto.partition("/")
+            prefixo = int(prefixo) if prefixo else 32
+            if prefixo > 32:
+                raise ValueError(f"prefixo de rede inválido no filtro: /{prefixo}")
+            mascara = (0xFFFFFFFF << (32 - prefixo)) & 0xFFFFFFFF
+            return ('net', direcao, ip_para_inteiro(endereco) & mascara, mascara)
+        if not self.aceitar("host") and self.olhar()[0] != "endereco":
+            if direcao is None and self.olhar()[0] is None:
+                raise ValueError("filtro inválido: a expressão termina no meio de um termo")
+            if direcao is None:
+                raise ValueError(f"filtro inválido: primitiva desconhecida {self.olhar()[1]}")
+        texto = self.consumir("endereco")
+        if "/" in texto:
+            raise ValueError(f"use 'net' para redes no filtro: {texto}")
+        return ('host', direcao, ip_para_inteiro(texto))
+
+    def numero(self, maximo=None):
+        valor = self.consumir("numero")
+        if maximo is not None and valor > maximo:
+            raise ValueError(f"valor fora do intervalo no filtro: {valor} (máximo {maximo})")
+        return valor
+
+# Testes de cada tipo de nó: funções do módulo com os parâmetros do nó à frente de (pacote, ip). O predicado
+# é a composição delas com functools.partial, a partir da árvore, e por isso é serializado com o filtro
+# (análise paralela ou em lote) sem nenhum tratamento especial
+def testar_e(a, b, pacote, ip):
+    return a(pacote, ip) and b(pacote, ip)
+
+def testar_ou(a, b, pacote, ip):
+    return a(pacote, ip) or b(pacote, ip)
+
+def testar_nao(a, pacote, ip):
+    return not a(pacote, ip)
+
+def testar_ip(pacote, ip):
+    return ip is not None
+
+def testar_protocolo(protocolo, pacote, ip):
+    return ip is not None and ip['protocolo'] == protocolo
+
+def testar_host(campo, endereco, pacote, ip):
+    return ip is not None and ip[campo] == endereco
+
+def testar_host_qualquer(endereco, pacote, ip):
+    return ip is not None and (ip['ip_origem'] == endereco or ip['ip_destino'] == endereco)
+
+def testar_net(campo, rede, mascara, pacote, ip):
+    return ip is not None and ip[campo] & mascara == rede
+
+def testar_net_qualquer(rede, mascara, pacote, ip):
+    return ip is not None and (ip['ip_origem'] & mascara == rede or ip['ip_destino'] & mascara == rede)
+
+def testar_porta(posicao, porta, pacote, ip):
+    return ip is not None and portas_transporte(pacote, ip)[posicao] == porta
+
+def testar_porta_qualquer(porta, pacote, ip):
+    return ip is not None and porta in portas_transporte(pacote, ip)
+
+def testar_comparacao(campo, comparar, valor, pacote, ip):
+    return comparar(pacote[campo], valor)
+
+def testar_comparacao_ip(campo, comparar, valor, pacote, ip):
+    return ip is not None and comparar(ip[campo], valor)
+
+# Função para montar o predicado(pacote, ip) de um nó da árvore
+def montar_predicado(no):
+    tipo = no[0]
+    if tipo == 'e':
+        return partial(testar_e, montar_predicado(no[1]), montar_predicado(no[2]))
+    if tipo == 'ou':
+        return partial(testar_ou, montar_predicado(no[1]), montar_predicado(no[2]))
+    if tipo == 'nao':
+        return partial(testar_nao, montar_predicado(no[1]))
+    if tipo == 'ip':
+        return testar_ip
+    if tipo == 'protocolo':
+        return partial(testar_protocolo, no[1])
+    if tipo == 'host':
+        if no[1] is None:
+            return partial(testar_host_qualquer, no[2])
+        return partial(testar_host, CAMPOS_DIRECAO[no[1]], no[2])
+    if tipo == 'net':
+        if no[1] is None:
+            return partial(testar_net_qualquer, no[2], no[3])
+        return partial(testar_net, CAMPOS_DIRECAO[no[1]], no[2], no[3])
+    if tipo == 'porta':
+        if no[1] is None:
+            return partial(testar_porta_qualquer, no[2])
+        return partial(testar_porta, POSICOES_PORTA[no[1]], no[2])
+    if tipo == 'comparacao':
+        campo, exige_ip = CAMPOS_COMPARACAO[no[1]]
+        return partial(testar_comparacao_ip if exige_ip else testar_comparacao, campo,
+                       OPERADORES_COMPARACAO[no[2]], no[3])
+    raise ValueError(f"nó de filtro desconhecido: {tipo}")
+
+# Classe de um filtro compilado: a expressão original, a árvore e o predicado(pacote, ip)
+class FiltroPacotes:
+    def __init__(self, expressao):
+        self.expressao = expressao
+        self.arvore = AnalisadorFiltro(expressao).analisar()
+        self.predicado = montar_predicado(self.arvore)
+
+    def __repr__(self):
+        return f"FiltroPacotes({self.expressao!r})"
+
+# Função para compilar uma expressão de filtro
+def compilar_filtro(expressao):
+    return FiltroPacotes(expressao)
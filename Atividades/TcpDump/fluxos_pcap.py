@@ -0,0 +1,314 @@
+# Tabela de fluxos da camada de transporte (TCP/UDP), identificados pela 5-tupla
+# (protocolo, IP de origem, IP de destino, porta de origem, porta de destino), como num exportador
+# de fluxos unidirecional. Cada fluxo ativo guarda contadores de pacotes e bytes, primeiro e último
+# instante e as flags TCP vistas (SYN/FIN/RST). Um fluxo parado há mais de TIMEOUT_INATIVIDADE
+# segundos (no relógio da captura) é encerrado: entra nos rankings de tamanho e duração e sai da
+# tabela, de modo que a memória depende do número de fluxos simultâneos, não da duração da captura.
+import bisect
+import heapq
+import struct
+from collections import OrderedDict
+
+from .analise_pcap import inteiro_para_ip
+
+# Tempo sem pacotes (segundos) após o qual um fluxo é encerrado
+TIMEOUT_INATIVIDADE = 60.0
+
+# Limite de fluxos ativos: acima dele, o fluxo parado há mais tempo é encerrado antes do timeout
+MAXIMO_FLUXOS_ATIVOS = 100_000
+
+# Intervalo (segundos da captura) entre duas varreduras de fluxos inativos: a varredura acontece no primeiro
+# pacote de cada intervalo, contado a partir da época, de modo que os trechos de uma análise em paralelo varrem
+# nos mesmos instantes que a análise sequencial
+INTERVALO_VARREDURA = 1.0
+
+# Quantidade de fluxos em cada ranking (mais bytes e mais longos)
+TOP_FLUXOS = 10
+
+# Limites superiores (segundos) das faixas de duração dos fluxos
+FAIXAS_DURACAO = (1, 10, 60, 600)
+
+# Protocolos com portas e flags TCP acompanhadas
+PROTOCOLO_TCP = 6
+PROTOCOLO_UDP = 17
+NOMES_PROTOCOLO = {PROTOCOLO_TCP: "TCP", PROTOCOLO_UDP: "UDP"}
+FLAG_FIN = 0x01
+FLAG_SYN = 0x02
+FLAG_RST = 0x04
+NOMES_FLAGS = ((FLAG_SYN, "SYN"), (FLAG_FIN, "FIN"), (FLAG_RST, "RST"))
+
+# Portas de origem e destino (início dos cabeçalhos TCP e UDP)
+PORTAS = struct.Struct('!HH')
+
+# Estado de um fluxo ativo (__slots__: sem dicionário por objeto)
+class Fluxo:
+    __slots__ = ('pacotes', 'bytes', 'primeiro', 'ultimo', 'flags')
+
+    def __init__(self, timestamp):
+        self.pacotes = 0
+        self.bytes = 0
+        self.primeiro = timestamp
+        self.ultimo = timestamp
+        self.flags = 0
+
+# Função para empacotar a 5-tupla numa única chave inteira (chave de dicionário barata)
+def chave_fluxo(protocolo, ip_origem, ip_destino, porta_origem, porta_destino):
+    return (protocolo << 96) | (ip_origem << 64) | (ip_destino << 32) | (porta_origem << 16) | porta_destino
+
+# Função para resumir um fluxo (chave desempacotada e endereços com pontos, para exibição)
+def resumir_fluxo(chave, fluxo):
+    return {
+        'protocolo': NOMES_PROTOCOLO.get(chave >> 96, str(chave >> 96)),
+        'origem': f"{inteiro_para_ip((chave >> 64) & 0xFFFFFFFF)}:{(chave >> 16) & 0xFFFF}",
+        'destino': f"{inteiro_para_ip((chave >> 32) & 0xFFFFFFFF)}:{chave & 0xFFFF}",
+        'pacotes': fluxo.pacotes,
+        'bytes': fluxo.bytes,
+        'inicio': fluxo.primeiro,
+        'fim': fluxo.ultimo,
+        'duracao': fluxo.ultimo - fluxo.primeiro,
+        'flags': " ".join(nome for bit, nome in NOMES_FLAGS if fluxo.flags & bit) or "-"
+    }
+
+# Função para contar um fluxo na sua faixa de duração e nas flags TCP que ele teve
+def contar_fluxo(fluxo, faixas, com_flag):
+    faixas[bisect.bisect_left(FAIXAS_DURACAO, fluxo.ultimo - fluxo.primeiro)] += 1
+    for bit in com_flag:
+        if fluxo.flags & bit:
+            com_flag[bit] += 1
+
+# Acumulador da tabela de fluxos, compatível com o motor de analise_pcap.
+# Os fluxos ativos ficam num OrderedDict em ordem de último pacote: os inativos estão sempre no início.
+# Um fluxo encerrado que começou a menos de timeout_inatividade segundos do primeiro pacote ("inicial") pode
+# ser a continuação de um fluxo ativo no fim do trecho anterior da captura (análise em paralelo): ele fica
+# guardado fora dos contadores e dos rankings até a mesclagem ou a finalização
+class AcumuladorFluxos:
+    nome = "fluxos"
+    por_datagrama = True  # Com a remontagem, cada datagrama fragmentado conta uma vez, com o tamanho inteiro
+
+    def __init__(self, timeout_inatividade=TIMEOUT_INATIVIDADE, maximo_ativos=MAXIMO_FLUXOS_ATIVOS, top=TOP_FLUXOS):
+        self.timeout_inatividade = timeout_inatividade
+        self.maximo_ativos = maximo_ativos
+        self.top = top
+        self.ativos = OrderedDict()
+        self.proxima_varredura = None
+        self.inicio = None
+        self.ultima_varredura = None
+        self.varreduras_iniciais = []  # Instantes das varreduras nos primeiros timeout_inatividade segundos
+        self.iniciais = []  # (sequência, chave, fluxo) dos fluxos iniciais já encerrados
+        # Rankings dos fluxos encerrados: heaps de mínimo com (valor, sequência, chave, fluxo)
+        self.top_bytes = []
+        self.top_duracao = []
+        self.sequencia = 0
+        self.encerrados = 0
+        self.encerrados_por_limite = 0
+        self.faixas = [0] * (len(FAIXAS_DURACAO) + 1)
+        self.com_flag = {bit: 0 for bit, _ in NOMES_FLAGS}
+
+    def atualizar(self, pacote, ip):
+        if ip is None or ip['fragment_offset']:
+            return  # Fragmentos seguintes não trazem o cabeçalho de transporte
+        protocolo = ip['protocolo']
+        if protocolo != PROTOCOLO_TCP and protocolo != PROTOCOLO_UDP:
+            return
+        dados = pacote['dados']
+        inicio = ip['inicio_transporte']
+        if len(dados) < inicio + 4:
+            return  # Portas não capturadas
+        porta_origem, porta_destino = PORTAS.unpack_from(dados, inicio)
+
+        timestamp = pacote['timestamp']
+        if self.proxima_varredura is None or timestamp >= self.proxima_varredura:
+            if self.inicio is None:
+                self.inicio = timestamp
+            else:
+                self.expirar(timestamp)
+            self.proxima_varredura = (timestamp // INTERVALO_VARREDURA + 1) * INTERVALO_VARREDURA
+
+        chave = chave_fluxo(protocolo, ip['ip_origem'], ip['ip_destino'], porta_origem, porta_destino)
+        ativos = self.ativos
+        fluxo = ativos.get(chave)
+        if fluxo is None:
+            if len(ativos) >= self.maximo_ativos:
+                self.encerrar(*ativos.popitem(last=False))
+                self.encerrados_por_limite += 1
+            fluxo = ativos[chave] = Fluxo(timestamp)
+        else:
+            ativos.move_to_end(chave)
+
+        fluxo.pacotes += 1
+        fluxo.bytes += pacote['origlen']
+        if timestamp > fluxo.ultimo:
+            fluxo.ultimo = timestamp
+        elif timestamp < fluxo.primeiro:
+            fluxo.primeiro = timestamp  # Pacote fora de ordem
+        if protocolo == PROTOCOLO_TCP and len(dados) >= inicio + 14:
+            fluxo.flags |= dados[inicio + 13] & (FLAG_FIN | FLAG_SYN | FLAG_RST)
+
+    # Encerra os fluxos sem pacotes há mais de timeout_inatividade segundos
+    def expirar(self, agora):
+        self.ultima_varredura = agora
+        if agora < self.inicio + self.timeout_inatividade:
+            self.varreduras_iniciais.append(agora)
+        ativos = self.ativos
+        limite = agora - self.timeout_inatividade
+        while ativos:
+            chave, fluxo = next(iter(ativos.items()))
+            if fluxo.ultimo > limite:
+                break
+            del ativos[chave]
+            self.encerrar(chave, fluxo)
+
+    def encerrar(self, chave, fluxo):
+        self.sequencia += 1
+        if fluxo.primeiro < self.inicio + self.timeout_inatividade:
+            self.iniciais.append((self.sequencia, chave, fluxo))
+        else:
+            self.contar_encerrado(self.sequencia, chave, fluxo)
+
+    # Conta um fluxo encerrado nos totais e nos rankings
+    def contar_encerrado(self, sequencia, chave, fluxo):
+        self.encerrados += 1
+        contar_fluxo(fluxo, self.faixas, self.com_flag)
+        for heap, valor in ((self.top_bytes, fluxo.bytes), (self.top_duracao, fluxo.ultimo - fluxo.primeiro)):
+            entrada = (valor, -sequencia, chave, fluxo)  # Empate: vale o fluxo encerrado antes
+            if len(heap) < self.top:
+                heapq.heappush(heap, entrada)
+            elif entrada > heap[0]:
+                heapq.heapreplace(heap, entrada)
+
+    # Junta o estado do acumulador do trecho seguinte da captura. Um fluxo ativo no fim deste trecho continua
+    # no fluxo inicial de mesma 5-tupla do outro trecho se a última varredura antes do primeiro pacote desse
+    # fluxo não o expirou; os que não continuam e que a última varredura do outro trecho teria expirado são
+    # encerrados. Os contadores são somados e os rankings, refeitos com as entradas dos dois. O limite de
+    # fluxos ativos de cada trecho não vê os fluxos do outro, de modo que só os encerramentos pelo limite
+    # podem diferir da análise sequencial
+    def mesclar(self, outro):
+        if outro.inicio is None:
+            return
+        if self.inicio is None:
+            self.__dict__.update(outro.__dict__)
+            return
+
+        # Na análise sequencial, o primeiro pacote do outro trecho só varre se abre um novo intervalo
+        ultima = self.ultima_varredura if self.ultima_varredura is not None else self.inicio
+        if outro.inicio // INTERVALO_VARREDURA != ultima // INTERVALO_VARREDURA:
+            ultima = outro.inicio
+            if outro.inicio < self.inicio + self.timeout_inatividade:
+                self.varreduras_iniciais.append(outro.inicio)
+        varreduras = [ultima] + outro.varreduras_iniciais
+        ultima_outro = outro.ultima_varredura if outro.ultima_varredura is not None else ultima
+
+        continuacoes = {}
+        candidatos = [(chave, fluxo) for _, chave, fluxo in outro.iniciais]
+        candidatos += [(chave, fluxo) for chave, fluxo in outro.ativos.items()
+                       if fluxo.primeiro < outro.inicio + outro.timeout_inatividade]
+        for chave, fluxo in candidatos:
+            if chave not in continuacoes or fluxo.primeiro < continuacoes[chave].primeiro:
+                continuacoes[chave] = fluxo
+        for chave, fluxo in list(self.ativos.items()):
+            continuacao = continuacoes.pop(chave, None)
+            if continuacao is not None:
+                varredura = varreduras[max(bisect.bisect_right(varreduras, continuacao.primeiro) - 1, 0)]
+                if fluxo.ultimo > varredura - self.timeout_inatividade:
+                    del self.ativos[chave]
+                    continuacao.pacotes += fluxo.pacotes
+                    continuacao.bytes += fluxo.bytes
+                    continuacao.primeiro = min(continuacao.primeiro, fluxo.primeiro)
+                    continuacao.ultimo = max(continuacao.ultimo, fluxo.ultimo)
+                    continuacao.flags |= fluxo.flags
+                    continue
+            if continuacao is not None or chave in outro.ativos or \
+                    fluxo.ultimo <= ultima_outro - self.timeout_inatividade:
+                del self.ativos[chave]
+                self.encerrar(chave, fluxo)
+
+        # Os fluxos do outro trecho foram encerrados depois dos deste: a sequência continua a partir daqui
+        deslocamento = self.sequencia
+        for sequencia, chave, fluxo in outro.iniciais:
+            if fluxo.primeiro < self.inicio + self.timeout_inatividade:
+                self.iniciais.append((sequencia + deslocamento, chave, fluxo))
+            else:
+                self.contar_encerrado(sequencia + deslocamento, chave, fluxo)
+        for heap, outro_heap in ((self.top_bytes, outro.top_bytes), (self.top_duracao, outro.top_duracao)):
+            entradas = heap + [(valor, sequencia - deslocamento, chave, fluxo)
+                               for valor, sequencia, chave, fluxo in outro_heap]
+            heap[:] = heapq.nlargest(self.top, entradas)
+            heapq.heapify(heap)
+        self.sequencia = deslocamento + outro.sequencia
+        self.encerrados += outro.encerrados
+        self.encerrados_por_limite += outro.encerrados_por_limite
+        self.faixas = [quantidade + outra for quantidade, outra in zip(self.faixas, outro.faixas)]
+        for bit, quantidade in outro.com_flag.items():
+            self.com_flag[bit] += quantidade
+
+        self.ativos.update(outro.ativos)
+        while len(self.ativos) > self.maximo_ativos:
+            self.encerrar(*self.ativos.popitem(last=False))
+            self.encerrados_por_limite += 1
+        self.varreduras_iniciais += [varredura for varredura in outro.varreduras_iniciais
+                                     if varredura < self.inicio + self.timeout_inatividade]
+        self.inicio = min(self.inicio, outro.inicio)
+        self.ultima_varredura = ultima_outro
+        self.proxima_varredura = outro.proxima_varredura
+
+    # Não altera o estado: no modo de acompanhamento os resultados parciais são pedidos várias vezes
+    def finalizar(self):
+        faixas = list(self.faixas)
+        com_flag = dict(self.com_flag)
+        ativos_bytes = []
+        ativos_duracao = []
+        for sequencia, chave, fluxo in self.iniciais:
+            contar_fluxo(fluxo, faixas, com_flag)
+            ativos_bytes.append((fluxo.bytes, -sequencia, chave, fluxo))
+            ativos_duracao.append((fluxo.ultimo - fluxo.primeiro, -sequencia, chave, fluxo))
+        for posicao, (chave, fluxo) in enumerate(self.ativos.items()):
+            contar_fluxo(fluxo, faixas, com_flag)
+            sequencia = -(self.sequencia + 1 + posicao)
+            ativos_bytes.append((fluxo.bytes, sequencia, chave, fluxo))
+            ativos_duracao.append((fluxo.ultimo - fluxo.primeiro, sequencia, chave, fluxo))
+
+        top_bytes = heapq.nlargest(self.top, self.top_bytes + ativos_bytes)
+        top_duracao = heapq.nlargest(self.top, self.top_duracao + ativos_duracao)
+        rotulos = [f"<= {limite}s" for limite in FAIXAS_DURACAO] + [f"> {FAIXAS_DURACAO[-1]}s"]
+        return {
+            'fluxos': self.encerrados + len(self.iniciais) + len(self.ativos),
+            'ativos': len(self.ativos),
+            'encerrados_por_limite': self.encerrados_por_limite,
+            'com_flag': {nome: com_flag[bit] for bit, nome in NOMES_FLAGS},
+            'faixas_duracao': list(zip(rotulos, faixas)),
+            'top_bytes': [resumir_fluxo(chave, fluxo) for _, _, chave, fluxo in top_bytes],
+            'top_duracao': [resumir_fluxo(chave, fluxo) for _, _, chave, fluxo in top_duracao]
+        }
+
+# Cabeçalho da tabela de fluxos (usado na exibição e na exportação)
+CABECALHO_TABELA_FLUXOS = [
+    "Ranking", "Protocolo", "Origem", "Destino", "Pacotes", "Bytes", "Duração (s)", "Flags TCP"
+]
+
+# Função para montar as linhas dos rankings de fluxos (mais bytes e mais longos)
+def linhas_fluxos(resultado):
+    linhas = []
+    for rotulo, fluxos in (("bytes", resultado['top_bytes']), ("duração", resultado['top_duracao'])):
+        for posicao, fluxo in enumerate(fluxos, start=1):
+            linhas.append([
+                f"{rotulo} #{posicao}",
+                fluxo['protocolo'],
+                fluxo['origem'],
+                fluxo['destino'],
+                fluxo['pacotes'],
+                fluxo['bytes'],
+                f"{fluxo['duracao']:.3f}",
+                fluxo['flags']
+            ])
+    return linhas
+
+# Função para montar as linhas do resumo dos fluxos (totais, flags e faixas de duração)
+def linhas_resumo_fluxos(resultado):
+    linhas = [
+        ["Fluxos TCP/UDP", resultado['fluxos']],
+        ["Fluxos ativos no fim da captura", resultado['ativos']],
+        ["Encerrados pelo limite de fluxos ativos", resultado['encerrados_por_limite']]
+    ]
+    linhas += [[f"Fluxos com {nome}", quantidade] for nome, quantidade in resultado['com_flag'].items()]
+    linhas += [[f"Duração {rotulo}", quantidade] for rotulo, quantidade in resultado['faixas_duracao']]
+    return linhas
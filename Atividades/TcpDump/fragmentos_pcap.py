@@ -0,0 +1,211 @@
+# Remontagem de datagramas IPv4 fragmentados (opção --remontar).
+# Os fragmentos são agrupados pela chave (origem, destino, identificação, protocolo) e a parte ainda
+# não recebida de cada datagrama é descrita por uma lista de buracos [início, fim) em bytes, como no
+# algoritmo da RFC 815. Quando o último fragmento (MF = 0) fixa o tamanho e não sobra buraco, o datagrama
+# é entregue aos relatórios por datagrama como um único pacote, com o tamanho remontado.
+# Só o primeiro fragmento (que traz o cabeçalho de transporte) é guardado; a memória é limitada por um
+# timeout (no relógio da captura) e por tetos de datagramas pendentes e de bytes guardados: ao passar de
+# um teto, o datagrama pendente mais antigo é descartado. Datagramas descartados ou incompletos não
+# chegam aos relatórios por datagrama, como num receptor real.
+from collections import OrderedDict
+
+# Tempo (segundos da captura) para um datagrama ficar completo desde o primeiro fragmento visto
+# (o mesmo padrão do Linux, net.ipv4.ipfrag_time)
+TIMEOUT_REMONTAGEM = 30.0
+
+# Tetos da memória de remontagem: datagramas pendentes e bytes dos primeiros fragmentos guardados
+# (4 MiB, como o net.ipv4.ipfrag_high_thresh do Linux)
+MAXIMO_DATAGRAMAS_PENDENTES = 10_000
+MAXIMO_BYTES_PENDENTES = 4 * 1024 * 1024
+
+# Intervalo (segundos da captura) entre duas varreduras de datagramas expirados
+INTERVALO_VARREDURA = 1.0
+
+# Bit "More Fragments" do campo flags já decodificado (flags = 3 bits mais altos)
+FLAG_MF = 0x1
+
+# Fim de um buraco ainda sem limite (o tamanho do datagrama só é conhecido no último fragmento)
+SEM_LIMITE = 1 << 17
+
+# Estado de um datagrama em remontagem (__slots__: sem dicionário por objeto)
+class DatagramaPendente:
+    __slots__ = ('buracos', 'tamanho', 'inicio', 'primeiro', 'caplen', 'fragmentos')
+
+    def __init__(self, timestamp):
+        self.buracos = [(0, SEM_LIMITE)]
+        self.tamanho = None  # Tamanho da carga IP, conhecido ao chegar o fragmento com MF = 0
+        self.inicio = timestamp
+        self.primeiro = None  # (pacote, ip) do fragmento de offset 0
+        self.caplen = 0
+        self.fragmentos = 0
+
+    # Registra o intervalo [inicio, fim) da carga; retorna quantos bytes dele já tinham chegado
+    def cobrir(self, inicio, fim):
+        restantes = []
+        novos = 0
+        for buraco_inicio, buraco_fim in self.buracos:
+            if fim <= buraco_inicio or inicio >= buraco_fim:
+                restantes.append((buraco_inicio, buraco_fim))
+                continue
+            novos += min(fim, buraco_fim) - max(inicio, buraco_inicio)
+            if buraco_inicio < inicio:
+                restantes.append((buraco_inicio, inicio))
+            if fim < buraco_fim:
+                restantes.append((fim, buraco_fim))
+        self.buracos = restantes
+        return (fim - inicio) - novos
+
+    # Fixa o tamanho da carga (último fragmento) e corta os buracos além dele
+    def limitar(self, tamanho):
+        self.tamanho = tamanho
+        self.buracos = [(inicio, min(fim, tamanho)) for inicio, fim in self.buracos if inicio < tamanho]
+
+# Função para empacotar a chave do datagrama num único inteiro (chave de dicionário barata)
+def chave_datagrama(ip):
+    return (ip['protocolo'] << 80) | (ip['ip_origem'] << 48) | (ip['ip_destino'] << 16) | ip['identificacao']
+
+# Função para saber se um pacote IPv4 é um fragmento (MF ligado ou offset diferente de zero)
+def eh_fragmento(ip):
+    return ip is not None and (ip['flags'] & FLAG_MF or ip['fragment_offset'])
+
+# Classe da etapa de remontagem; segue o protocolo dos acumuladores (nome, mesclar, finalizar) para que
+# os seus contadores viajem com eles na análise paralela e em lote
+class RemontadorFragmentos:
+    nome = "remontagem_ip"
+
+    def __init__(self, timeout=TIMEOUT_REMONTAGEM, maximo_pendentes=MAXIMO_DATAGRAMAS_PENDENTES,
+                 maximo_bytes=MAXIMO_BYTES_PENDENTES):
+        self.timeout = timeout
+        self.maximo_pendentes = maximo_pendentes
+        self.maximo_bytes = maximo_bytes
+        self.pendentes = OrderedDict()  # Em ordem de chegada do primeiro fragmento: os mais antigos no início
+        self.bytes_pendentes = 0
+        self.proxima_varredura = None
+        self.fragmentos = 0
+        self.remontados = 0
+        self.sobreposicoes = 0
+        self.inconsistentes = 0
+        self.expirados = 0
+        self.descartados_por_limite = 0
+        self.incompletos = 0  # Pendentes de outras partes da captura, já mescladas
+        self.pico_pendentes = 0
+        self.pico_bytes = 0
+
+    # Recebe um fragmento; retorna (pacote, ip) do datagrama remontado quando ele fica completo,
+    # ou (None, None) enquanto faltam partes
+    def remontar(self, pacote, ip):
+        self.fragmentos += 1
+        timestamp = pacote['timestamp']
+        if self.proxima_varredura is None or timestamp >= self.proxima_varredura:
+            self.expirar(timestamp)
+            self.proxima_varredura = timestamp + INTERVALO_VARREDURA
+
+        chave = chave_datagrama(ip)
+        datagrama = self.pendentes.get(chave)
+        if datagrama is None:
+            while len(self.pendentes) >= self.maximo_pendentes:
+                self.descartar_mais_antigo()
+            datagrama = self.pendentes[chave] = DatagramaPendente(timestamp)
+            self.pico_pendentes = max(self.pico_pendentes, len(self.pendentes))
+
+        inicio = ip['fragment_offset'] * 8
+        fim = inicio + ip['tamanho_total'] - ip['ihl']
+        ultimo = not ip['flags'] & FLAG_MF
+        if fim <= inicio or (datagrama.tamanho is not None and (fim > datagrama.tamanho
+                                                                or (ultimo and fim != datagrama.tamanho))):
+            self.inconsistentes += 1  # Fragmento vazio ou além do fim já fixado: ignorado
+            return None, None
+        if datagrama.cobrir(inicio, fim):
+            self.sobreposicoes += 1  # A parte repetida é ignorada: vale o que chegou primeiro
+        if ultimo:
+            datagrama.limitar(fim)
+        datagrama.fragmentos += 1
+        datagrama.caplen += pacote['caplen']
+        if inicio == 0 and datagrama.primeiro is None:
+            datagrama.primeiro = (pacote, ip)
+            self.bytes_pendentes += len(pacote['dados'])
+            self.pico_bytes = max(self.pico_bytes, self.bytes_pendentes)
+            while self.bytes_pendentes > self.maximo_bytes and self.pendentes:
+                self.descartar_mais_antigo()
+            if chave not in self.pendentes:
+                return None, None
+
+        if datagrama.tamanho is None or datagrama.buracos:
+            return None, None
+        self.remover(chave)
+        self.remontados += 1
+        return self.montar(datagrama, timestamp)
+
+    # Monta o pacote do datagrama completo: os dados do primeiro fragmento (cabeçalho de transporte),
+    # com o tamanho original e o cabeçalho IP ajustados ao datagrama inteiro
+    def montar(self, datagrama, timestamp):
+        pacote, ip = datagrama.primeiro
+        tamanho_total = ip['ihl'] + datagrama.tamanho
+        ip_datagrama = dict(ip, tamanho_total=tamanho_total, flags=ip['flags'] & ~FLAG_MF)
+        pacote_datagrama = dict(pacote, timestamp=timestamp, caplen=datagrama.caplen,
+                                origlen=pacote['origlen'] - ip['tamanho_total'] + tamanho_total)
+        return pacote_datagrama, ip_datagrama
+
+    def remover(self, chave):
+        datagrama = self.pendentes.pop(chave)
+        if datagrama.primeiro is not None:
+            self.bytes_pendentes -= len(datagrama.primeiro[0]['dados'])
+        return datagrama
+
+    def descartar_mais_antigo(self):
+        self.remover(next(iter(self.pendentes)))
+        self.descartados_por_limite += 1
+
+    # Descarta os datagramas cujo primeiro fragmento chegou há mais de 'timeout' segundos
+    def expirar(self, agora):
+        limite = agora - self.timeout
+        while self.pendentes:
+            chave, datagrama = next(iter(self.pendentes.items()))
+            if datagrama.inicio > limite:
+                break
+            self.remover(chave)
+            self.expirados += 1
+
+    # Ao voltar de um processo (análise paralela ou em lote) só a quantidade de pendentes é enviada:
+    # os fragmentos guardados podem ser fatias do arquivo mapeado, que não são serializáveis
+    def __getstate__(self):
+        estado = dict(self.__dict__, pendentes=OrderedDict(), bytes_pendentes=0)
+        estado['incompletos'] += len(self.pendentes)
+        return estado
+
+    # Soma os contadores de outra parte da captura (os datagramas pendentes de cada parte não se
+    # completam entre si: ficam contados como incompletos)
+    def mesclar(self, outro):
+        for contador in ('fragmentos', 'remontados', 'sobreposicoes', 'inconsistentes', 'expirados',
+                         'descartados_por_limite', 'incompletos'):
+            setattr(self, contador, getattr(self, contador) + getattr(outro, contador))
+        self.incompletos += len(outro.pendentes)
+        self.pico_pendentes = max(self.pico_pendentes, outro.pico_pendentes)
+        self.pico_bytes = max(self.pico_bytes, outro.pico_bytes)
+
+    def finalizar(self):
+        return {
+            'fragmentos': self.fragmentos,
+            'remontados': self.remontados,
+            'sobreposicoes': self.sobreposicoes,
+            'inconsistentes': self.inconsistentes,
+            'expirados': self.expirados,
+            'descartados_por_limite': self.descartados_por_limite,
+            'incompletos': self.incompletos + len(self.pendentes),
+            'pico_pendentes': self.pico_pendentes,
+            'pico_bytes': self.pico_bytes
+        }
+
+# Função para montar as linhas (descrição, valor) do relatório de remontagem
+def linhas_remontagem(resultado):
+    return [
+        ["Fragmentos IPv4 recebidos", resultado['fragmentos']],
+        ["Datagramas remontados", resultado['remontados']],
+        ["Fragmentos sobrepostos ou repetidos", resultado['sobreposicoes']],
+        ["Fragmentos inconsistentes (ignorados)", resultado['inconsistentes']],
+        ["Datagramas expirados (timeout)", resultado['expirados']],
+        ["Datagramas descartados (limite de memória)", resultado['descartados_por_limite']],
+        ["Datagramas incompletos no fim da captura", resultado['incompletos']],
+        ["Pico de datagramas pendentes", resultado['pico_pendentes']],
+        ["Pico de bytes guardados", resultado['pico_bytes']]
+    ]
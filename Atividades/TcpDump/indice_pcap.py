@@ -0,0 +1,348 @@
+# Índice persistente em disco para reanálise instantânea.
+# Ao lado de cada captura é gravado um arquivo "<captura>.idx" com um índice esparso dos registros e o
+# estado dos acumuladores. Se o arquivo não mudou (tamanho, mtime e hash do início), os resultados vêm
+# direto do índice; se só cresceu no final (maior, com o início e o antigo trecho final intactos), apenas os
+# registros novos são lidos e mesclados ao estado salvo. Qualquer outra mudança refaz o índice.
+# O índice esparso guarda, a cada INTERVALO_INDICE registros, o número e o offset do primeiro registro do
+# bloco e o menor e o maior timestamp do bloco: uma faixa de pacotes ou um intervalo de tempo é localizado
+# por busca binária, sem percorrer a captura desde o cabeçalho global (ver selecao_pcap).
+# O arquivo só tem dados: um cabeçalho JSON (versão, assinatura e o estado codificado) seguido das colunas
+# (array) em binário. Na leitura, só as classes de CLASSES_INDICE são recriadas, com os atributos gravados;
+# nenhum código vem do arquivo, e um índice corrompido é descartado e refeito.
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from .leitura_pcap import iterar_pacotes_pcap_mmap, ler_tipo_link
+from .analise_pcap import ACUMULADORES_PADRAO, LinhasHeadersIp, alimentar_acumuladores
+from .paralelo_pcap import analisar_acumuladores_paralelo, deve_analisar_em_paralelo
+
+# Versão do formato do índice: índices de outra versão são descartados e refeitos
+VERSAO_INDICE = 8
+
+# Início de todo arquivo de índice, seguido do tamanho (8 bytes, little-endian) do cabeçalho JSON
+MAGICO_INDICE = b"PCAPIDX\n"
+
+# Registros por bloco do índice esparso (cerca de 32 bytes de índice a cada 1024 registros)
+INTERVALO_INDICE = 1024
+
+# Extensão do arquivo de índice gravado ao lado da captura
+EXTENSAO_INDICE = ".idx"
+
+# Quantidade de bytes do início e do fim da captura usada nos hashes de validação
+TAMANHO_AMOSTRA_HASH = 4096
+
+# Descrição de cada situação devolvida por executar_analise_indexada (para as mensagens de [INFO])
+DESCRICAO_SITUACAO_INDICE = {
+    "indice": "resultados carregados do índice, sem reler a captura",
+    "incremental": "apenas os registros novos foram lidos e o índice foi atualizado",
+    "completa": "captura lida por completo e índice gravado"
+}
+
+# Acumulador do índice esparso: um bloco a cada INTERVALO_INDICE registros, com o número (a partir de 0) e o
+# offset do primeiro registro e o menor e o maior timestamp do bloco. Os números são guardados explicitamente
+# porque, ao mesclar as fatias da análise paralela, o último bloco de cada fatia fica mais curto. Para a busca
+# por tempo, 'busca' guarda os timestamps acumulados dos blocos (ver preparar_busca), gravados junto no índice
+class AcumuladorIndice:
+    nome = "indice"
+
+    def __init__(self):
+        self.numeros = array('Q')
+        self.offsets = array('Q')
+        self.minimos = array('d')
+        self.maximos = array('d')
+        self.pacotes = 0
+        self.restantes = 0  # Registros que ainda cabem no bloco atual
+        self.ultimo = None  # Offset do último registro indexado
+        self.busca = None  # (pacotes, maiores acumulados, menores acumulados) de preparar_busca
+
+    def atualizar(self, pacote, ip):
+        timestamp = pacote['timestamp']
+        if self.restantes == 0:
+            self.numeros.append(self.pacotes)
+            self.offsets.append(pacote['offset'])
+            self.minimos.append(timestamp)
+            self.maximos.append(timestamp)
+            self.restantes = INTERVALO_INDICE
+        elif timestamp < self.minimos[-1]:
+            self.minimos[-1] = timestamp
+        elif timestamp > self.maximos[-1]:
+            self.maximos[-1] = timestamp
+        self.restantes -= 1
+        self.pacotes += 1
+        self.ultimo = pacote['offset']
+
+    def mesclar(self, outro):
+        self.numeros.extend(numero + self.pacotes for numero in outro.numeros)
+        self.offsets.extend(outro.offsets)
+        self.minimos.extend(outro.minimos)
+        self.maximos.extend(outro.maximos)
+        if outro.pacotes:
+            self.restantes = outro.restantes
+            self.ultimo = outro.ultimo
+        self.pacotes += outro.pacotes
+
+    # Offset do último registro indexado (ou None): a leitura incremental recomeça nele e o descarta.
+    # Assim o fim do registro não precisa ser calculado, o que no pcapng depende das opções do bloco
+    def ultimo_offset(self):
+        return self.ultimo
+
+    # Localiza o registro de número 'numero' (a partir de 0): retorna (offset do bloco, número do primeiro
+    # registro do bloco), de onde a leitura parte e pula os registros anteriores, ou None se não existe
+    def localizar_pacote(self, numero):
+        if numero >= self.pacotes:
+            return None
+        bloco = bisect_right(self.numeros, numero) - 1
+        return self.offsets[bloco], self.numeros[bloco]
+
+    # Calcula, uma vez por atualização do índice, o maior timestamp acumulado desde o primeiro bloco e o menor
+    # acumulado a partir do último (negado, para formar uma sequência crescente). O número de pacotes indexados
+    # identifica o estado do índice: se ele não mudou, os valores já calculados continuam válidos
+    def preparar_busca(self):
+        if self.busca is None or self.busca[0] != self.pacotes:
+            self.busca = (self.pacotes, array('d', accumulate(self.maximos, max)),
+                          array('d', [-minimo for minimo in accumulate(reversed(self.minimos), min)]))
+        return self.busca
+
+    # Localiza os blocos que podem ter registros com timestamp em [inicio, fim], mesmo fora de ordem:
+    # a leitura começa no primeiro bloco cujo maior timestamp acumulado (desde o início) alcança 'inicio'
+    # e termina no último bloco com algum timestamp até 'fim'. Retorna (offset inicial, número do primeiro
+    # registro, offset final ou None até o fim do arquivo), ou None se nenhum bloco serve
+    def localizar_intervalo(self, inicio, fim):
+        _, maiores, sufixos = self.preparar_busca()
+        primeiro = bisect_left(maiores, inicio)
+        ultimo = len(self.minimos) - 1 - bisect_left(sufixos, -fim)
+        if primeiro > ultimo:
+            return None
+        offset_final = self.offsets[ultimo + 1] if ultimo + 1 < len(self.offsets) else None
+        return self.offsets[primeiro], self.numeros[primeiro], offset_final
+
+    def finalizar(self):
+        return {'pacotes': self.pacotes, 'blocos': len(self.offsets), 'ultimo_offset': self.ultimo_offset()}
+
+# Classes que podem ser recriadas a partir do índice (o estado dos acumuladores gravados)
+CLASSES_INDICE = {classe.__name__: classe for classe in [AcumuladorIndice, LinhasHeadersIp] + ACUMULADORES_PADRAO}
+
+# Maior inteiro guardado numa coluna 'Q'
+MAXIMO_COLUNA = (1 << 64) - 1
+
+# Função para codificar uma sequência de itens: só inteiros sem sinal de 64 bits viram uma coluna binária
+# (os pares de IPs e as contagens dos acumuladores), o resto vira uma lista JSON
+def codificar_itens(itens, blocos, objetos):
+    if itens and all(type(item) is int and 0 <= item <= MAXIMO_COLUNA for item in itens):
+        blocos.append(array('Q', itens))
+        return {'bloco': len(blocos) - 1}
+    return {'lista': [codificar_valor(item, blocos, objetos) for item in itens]}
+
+# Função para codificar um valor do estado do índice num valor JSON. Listas, tuplas, dicionários e conjuntos
+# levam uma marca do tipo; os arrays vão para 'blocos' (gravados em binário depois do JSON); os objetos de
+# CLASSES_INDICE são gravados pelos atributos, uma única vez (as demais aparições referenciam a primeira)
+def codificar_valor(valor, blocos, objetos):
+    if valor is None or type(valor) in (bool, int, float, str):
+        return valor
+    if type(valor) is array:
+        blocos.append(valor)
+        return {'bloco': len(blocos) - 1}
+    if type(valor) is list:
+        return {'lista': [codificar_valor(item, blocos, objetos) for item in valor]}
+    if type(valor) is tuple:
+        return {'tupla': [codificar_valor(item, blocos, objetos) for item in valor]}
+    if type(valor) is dict:
+        return {'dicionario': [codificar_itens(list(valor), blocos, objetos),
+                               codificar_itens(list(valor.values()), blocos, objetos)]}
+    if type(valor) is set:
+        return {'conjunto': codificar_itens(list(valor), blocos, objetos)}
+    nome = type(valor).__name__
+    if CLASSES_INDICE.get(nome) is type(valor):
+        if id(valor) in objetos:
+            return {'referencia': objetos[id(valor)]}
+        objetos[id(valor)] = len(objetos)
+        return {'objeto': [nome, codificar_valor(vars(valor), blocos, objetos)]}
+    raise TypeError(f"tipo {nome} não pode ser gravado no índice")
+
+# Função inversa de codificar_valor; um dado fora do formato gera ValueError, TypeError, KeyError ou IndexError
+def decodificar_valor(dado, blocos, objetos):
+    if not isinstance(dado, dict):
+        return dado
+    (marca, conteudo), = dado.items()
+    if marca == 'bloco':
+        return blocos[conteudo]
+    if marca == 'lista':
+        return [decodificar_valor(item, blocos, objetos) for item in conteudo]
+    if marca == 'tupla':
+        return tuple(decodificar_valor(item, blocos, objetos) for item in conteudo)
+    if marca == 'dicionario':
+        chaves, valores = (decodificar_valor(parte, blocos, objetos) for parte in conteudo)
+        if len(chaves) != len(valores):
+            raise ValueError("dicionário do índice com chaves e valores de tamanhos diferentes")
+        return dict(zip(chaves, valores))
+    if marca == 'conjunto':
+        return set(decodificar_valor(conteudo, blocos, objetos))
+    if marca == 'referencia':
+        return objetos[conteudo]
+    if marca == 'objeto':
+        nome, estado = conteudo
+        classe = CLASSES_INDICE[nome]
+        instancia = objetos[len(objetos)] = classe.__new__(classe)
+        atributos = decodificar_valor(estado, blocos, objetos)
+        if not all(isinstance(atributo, str) for atributo in atributos):
+            raise ValueError("atributo inválido no índice")
+        instancia.__dict__.update(atributos)
+        return instancia
+    raise ValueError(f"marca desconhecida no índice: {marca}")
+
+# Função para ler um arquivo de índice; retorna o dicionário gravado por salvar_indice, ou None se o índice é
+# de outra versão. Um arquivo corrompido gera OSError, EOFError, ValueError, TypeError, KeyError, IndexError
+# ou struct.error
+def ler_indice(caminho):
+    with open(caminho, 'rb') as arquivo_indice:
+        if arquivo_indice.read(len(MAGICO_INDICE)) != MAGICO_INDICE:
+            raise ValueError("arquivo não é um índice")
+        tamanho_cabecalho, = struct.unpack('<Q', arquivo_indice.read(8))
+        tamanho_arquivo = os.fstat(arquivo_indice.fileno()).st_size
+        if tamanho_cabecalho > tamanho_arquivo - arquivo_indice.tell():
+            raise ValueError("índice truncado")
+        cabecalho = json.loads(arquivo_indice.read(tamanho_cabecalho))
+        if not isinstance(cabecalho, dict) or cabecalho.get('versao') != VERSAO_INDICE:
+            return None
+        blocos = [array(tipo) for tipo, _ in cabecalho['blocos']]
+        quantidades = [quantidade for _, quantidade in cabecalho['blocos']]
+        # As colunas ocupam exatamente o resto do arquivo (confere antes de alocá-las)
+        tamanho_blocos = sum(bloco.itemsize * quantidade for bloco, quantidade in zip(blocos, quantidades))
+        if tamanho_blocos != tamanho_arquivo - arquivo_indice.tell():
+            raise ValueError("índice truncado")
+        for bloco, quantidade in zip(blocos, quantidades):
+            bloco.fromfile(arquivo_indice, quantidade)
+            if cabecalho['ordem'] != sys.byteorder:
+                bloco.byteswap()
+        conteudo = decodificar_valor(cabecalho['conteudo'], blocos, {})
+    acumuladores = conteudo['acumuladores']
+    if not acumuladores or type(acumuladores[0]) is not AcumuladorIndice or \
+            any(type(acumulador) not in ACUMULADORES_PADRAO for acumulador in acumuladores[1:]):
+        raise ValueError("acumuladores inválidos no índice")
+    return {
+        'versao': cabecalho['versao'],
+        'assinatura': cabecalho['assinatura'],
+        'acumuladores': acumuladores,
+        'resultados': conteudo['resultados']
+    }
+
+# Função para obter o caminho do arquivo de índice de uma captura
+def caminho_indice(caminho_arquivo):
+    return caminho_arquivo + EXTENSAO_INDICE
+
+# Função para calcular o hash de 'tamanho_amostra' bytes da captura a partir do offset 'inicio'
+def hash_trecho_arquivo(caminho_arquivo, inicio, tamanho_amostra):
+    with open(caminho_arquivo, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        return hashlib.sha256(arquivo.read(tamanho_amostra)).hexdigest()
+
+# Função para calcular a assinatura (tamanho, mtime e hashes do início e do fim) de uma captura. O hash do fim
+# cobre o último registro indexado, de onde a leitura incremental recomeça se a captura crescer
+def assinatura_arquivo(caminho_arquivo):
+    estado = os.stat(caminho_arquivo)
+    tamanho_amostra = min(TAMANHO_AMOSTRA_HASH, estado.st_size)
+    return {
+        'tamanho': estado.st_size,
+        'mtime': estado.st_mtime_ns,
+        'tamanho_amostra': tamanho_amostra,
+        'hash_inicio': hash_trecho_arquivo(caminho_arquivo, 0, tamanho_amostra),
+        'hash_fim': hash_trecho_arquivo(caminho_arquivo, estado.st_size - tamanho_amostra, tamanho_amostra)
+    }
+
+# Função para carregar o índice de uma captura e classificá-lo em relação ao arquivo atual
+# Retorna (indice, situacao), com situacao "valido", "anexado" ou None (sem índice utilizável)
+def carregar_indice(caminho_arquivo):
+    try:
+        indice = ler_indice(caminho_indice(caminho_arquivo))
+        if indice is None:
+            return None, None
+        salvo = indice['assinatura']
+        estado = os.stat(caminho_arquivo)
+        if estado.st_size < salvo['tamanho']:
+            return None, None  # Arquivo encolheu: foi reescrito
+        tamanho_amostra = salvo['tamanho_amostra']
+        if hash_trecho_arquivo(caminho_arquivo, 0, tamanho_amostra) != salvo['hash_inicio']:
+            return None, None  # Início do arquivo mudou: é outra captura
+        if estado.st_size == salvo['tamanho']:
+            # Mesmo tamanho com outro mtime: o arquivo foi reescrito no lugar, não cresceu
+            return (indice, "valido") if estado.st_mtime_ns == salvo['mtime'] else (None, None)
+        antigo_fim = salvo['tamanho'] - tamanho_amostra
+        if hash_trecho_arquivo(caminho_arquivo, antigo_fim, tamanho_amostra) != salvo['hash_fim']:
+            return None, None  # O trecho antes do antigo fim mudou: os registros indexados não são os mesmos
+    except (OSError, EOFError, ValueError, TypeError, KeyError, IndexError, struct.error):
+        return None, None  # Índice ausente ou corrompido: é refeito
+    return indice, "anexado"
+
+# Função para gravar o índice ao lado da captura (falhas de escrita não interrompem a análise)
+def salvar_indice(caminho_arquivo, acumuladores, resultados):
+    caminho_temporario = caminho_indice(caminho_arquivo) + ".tmp"
+    try:
+        blocos = []
+        conteudo = codificar_valor({'acumuladores': acumuladores, 'resultados': resultados}, blocos, {})
+        cabecalho = json.dumps({
+            'versao': VERSAO_INDICE,
+            'assinatura': assinatura_arquivo(caminho_arquivo),
+            'ordem': sys.byteorder,
+            'blocos': [[bloco.typecode, len(bloco)] for bloco in blocos],
+            'conteudo': conteudo
+        }).encode()
+        with open(caminho_temporario, 'wb') as arquivo_indice:
+            arquivo_indice.write(MAGICO_INDICE + struct.pack('<Q', len(cabecalho)) + cabecalho)
+            for bloco in blocos:
+                bloco.tofile(arquivo_indice)
+        os.replace(caminho_temporario, caminho_indice(caminho_arquivo))
+        return True
+    except (OSError, TypeError):
+        return False
+
+# Função que carrega o índice da captura, atualizando-o (ou criando-o) se preciso
+# Retorna (acumuladores, resultados, situacao), com situacao "indice", "incremental" ou "completa";
+# o primeiro acumulador é o AcumuladorIndice
+def atualizar_indice(caminho_arquivo, salvar=True):
+    indice, situacao = carregar_indice(caminho_arquivo)
+
+    if situacao == "valido":
+        return indice['acumuladores'], indice['resultados'], "indice"
+
+    if situacao == "anexado":
+        acumuladores = indice['acumuladores']
+        ultimo_offset = acumuladores[0].ultimo_offset()
+        pacotes = iterar_pacotes_pcap_mmap(caminho_arquivo, ultimo_offset)
+        if ultimo_offset is not None:
+            next(pacotes, None)  # Último registro já indexado
+        alimentar_acumuladores(pacotes, acumuladores, ler_tipo_link(caminho_arquivo))
+        situacao = "incremental"
+    else:
+        classes = [AcumuladorIndice] + ACUMULADORES_PADRAO
+        if deve_analisar_em_paralelo(caminho_arquivo):
+            acumuladores = analisar_acumuladores_paralelo(caminho_arquivo, classes_acumuladores=classes)
+        else:
+            acumuladores = alimentar_acumuladores(
+                iterar_pacotes_pcap_mmap(caminho_arquivo), [classe() for classe in classes],
+                ler_tipo_link(caminho_arquivo)
+            )
+        situacao = "completa"
+
+    resultados = {acumulador.nome: acumulador.finalizar() for acumulador in acumuladores[1:]}
+    acumuladores[0].preparar_busca()
+    if salvar:
+        salvar_indice(caminho_arquivo, acumuladores, resultados)
+    return acumuladores, resultados, situacao
+
+# Função que analisa a captura aproveitando o índice em disco
+# Retorna ({nome do acumulador: resultado}, situacao), com situacao "indice", "incremental" ou "completa"
+def executar_analise_indexada(caminho_arquivo, salvar=True):
+    _, resultados, situacao = atualizar_indice(caminho_arquivo, salvar)
+    return resultados, situacao
+
+# Função que devolve o índice esparso da captura (AcumuladorIndice), atualizando-o se preciso; retorna
+# (indice, situacao)
+def obter_indice(caminho_arquivo, salvar=True):
+    acumuladores, _, situacao = atualizar_indice(caminho_arquivo, salvar)
+    return acumuladores[0], situacao
@@ -0,0 +1,262 @@
+# Estatísticas por janela de tempo (1s, 10s, 60s, ...) com memória limitada.
+# Cada tamanho de janela guarda as últimas N janelas fechadas num buffer circular (deque com
+# maxlen), de modo que a memória não cresce com a duração da captura. Por janela são calculados
+# pacotes/s, bytes/s, o par de IPs com mais tráfego (top talkers) e o tamanho médio UDP. Intervalos sem
+# pacotes aparecem como janelas zeradas, e o tráfego por par da janela aberta tem um limite de pares.
+from collections import deque
+
+from .analise_pcap import par_da_chave
+
+# Tamanhos de janela padrão (segundos)
+TAMANHOS_JANELA_PADRAO = (1, 10, 60)
+
+# Quantidade de janelas fechadas mantidas por tamanho de janela
+JANELAS_MANTIDAS = 120
+
+# Quantidade de pares (top talkers) guardados por janela
+TOP_PARES_POR_JANELA = 3
+
+# Limite de pares acompanhados na janela aberta: acima dele, só a metade com mais tráfego é mantida
+MAXIMO_PARES_POR_JANELA = 10_000
+
+# Função para resumir uma janela fechada (o dicionário de pares é descartado, só o top-N fica)
+def resumir_janela(inicio, tamanho, pacotes, total_bytes, trafego_por_par, soma_udp, quantidade_udp):
+    top_pares = sorted(trafego_por_par.items(), key=lambda item: item[1], reverse=True)[:TOP_PARES_POR_JANELA]
+    return {
+        'inicio': inicio,
+        'tamanho': tamanho,
+        'pacotes': pacotes,
+        'bytes': total_bytes,
+        'pacotes_por_segundo': pacotes / tamanho,
+        'bytes_por_segundo': total_bytes / tamanho,
+        'top_pares': [(par_da_chave(par), total) for par, total in top_pares],
+        'media_udp': soma_udp / quantidade_udp if quantidade_udp else None,
+        'quantidade_udp': quantidade_udp
+    }
+
+# Função para somar duas janelas resumidas com o mesmo início (a janela dividida entre duas partes da
+# análise, quando uma delas só guardou o resumo): os contadores são somados e o top de pares sai da soma dos
+# tops de cada parte
+def combinar_janelas(janela, outra):
+    trafego_por_par = {}
+    for par, total in janela['top_pares'] + outra['top_pares']:
+        trafego_por_par[par] = trafego_por_par.get(par, 0) + total
+    top_pares = sorted(trafego_por_par.items(), key=lambda item: item[1], reverse=True)[:TOP_PARES_POR_JANELA]
+    quantidade_udp = janela['quantidade_udp'] + outra['quantidade_udp']
+    soma_udp = sum((resumo['media_udp'] or 0) * resumo['quantidade_udp'] for resumo in (janela, outra))
+    pacotes = janela['pacotes'] + outra['pacotes']
+    total_bytes = janela['bytes'] + outra['bytes']
+    return dict(
+        janela, pacotes=pacotes, bytes=total_bytes, pacotes_por_segundo=pacotes / janela['tamanho'],
+        bytes_por_segundo=total_bytes / janela['tamanho'], top_pares=top_pares, quantidade_udp=quantidade_udp,
+        media_udp=soma_udp / quantidade_udp if quantidade_udp else None
+    )
+
+# Classe com os contadores completos de uma janela (o tráfego de todos os pares acompanhados, não só o top)
+class ContadoresJanela:
+    def __init__(self, inicio):
+        self.inicio = inicio
+        self.pacotes = 0
+        self.bytes = 0
+        self.trafego_por_par = {}
+        self.soma_udp = 0
+        self.quantidade_udp = 0
+
+    # Mantém só a metade dos pares com mais tráfego (poda amortizada: uma ordenação a cada maximo_pares / 2
+    # pares novos). Retorna a quantidade de pares descartados
+    def podar_pares(self, maximo_pares):
+        mantidos = sorted(self.trafego_por_par.items(), key=lambda item: item[1], reverse=True)[:maximo_pares // 2]
+        descartados = len(self.trafego_por_par) - len(mantidos)
+        self.trafego_por_par = dict(mantidos)
+        return descartados
+
+    # Soma os contadores da mesma janela vindos de outra parte da análise. Retorna os pares descartados
+    def somar(self, outros, maximo_pares):
+        self.pacotes += outros.pacotes
+        self.bytes += outros.bytes
+        self.soma_udp += outros.soma_udp
+        self.quantidade_udp += outros.quantidade_udp
+        descartados = 0
+        for par, total in outros.trafego_por_par.items():
+            if len(self.trafego_por_par) >= maximo_pares and par not in self.trafego_por_par:
+                descartados += self.podar_pares(maximo_pares)
+            self.trafego_por_par[par] = self.trafego_por_par.get(par, 0) + total
+        return descartados
+
+    def resumir(self, tamanho):
+        return resumir_janela(
+            self.inicio, tamanho, self.pacotes, self.bytes, self.trafego_por_par, self.soma_udp, self.quantidade_udp
+        )
+
+# Estado de um único tamanho de janela: a janela aberta e o buffer circular das fechadas
+class SerieJanelas:
+    def __init__(self, tamanho, janelas_mantidas=JANELAS_MANTIDAS, maximo_pares=MAXIMO_PARES_POR_JANELA):
+        self.tamanho = tamanho
+        self.maximo_pares = maximo_pares
+        self.fechadas = deque(maxlen=janelas_mantidas)
+        # A janela de pico (mais bytes) é guardada à parte: ela pode já ter saído do buffer circular
+        self.pico = None
+        self.aberta = None
+        # Contadores completos da primeira janela fechada: na mesclagem, a janela dividida entre o fim de uma
+        # fatia e o começo da seguinte é somada com todos os pares, e não só com o top de cada parte
+        self.primeira = None
+        self.pares_descartados = 0
+
+    def registrar(self, janela):
+        self.fechadas.append(janela)
+        if self.pico is None or janela['bytes'] > self.pico['bytes']:
+            self.pico = janela
+
+    def fechar_janela(self):
+        if self.primeira is None:
+            self.primeira = self.aberta
+        self.registrar(self.aberta.resumir(self.tamanho))
+
+    # Registra como zeradas as janelas sem pacotes entre as que começam em 'anterior' e em 'inicio'. Só as
+    # últimas janelas_mantidas importam (as anteriores sairiam do buffer circular), então um salto longo no
+    # relógio da captura não gera uma janela por intervalo vazio
+    def preencher_lacuna(self, anterior, inicio):
+        vazias = round((inicio - anterior) / self.tamanho) - 1
+        for posicao in range(min(vazias, self.fechadas.maxlen), 0, -1):
+            self.fechadas.append(resumir_janela(inicio - posicao * self.tamanho, self.tamanho, 0, 0, {}, 0, 0))
+
+    def atualizar(self, timestamp, origlen, ip):
+        # Alinha a janela a múltiplos do tamanho (ex.: janelas de 10s começam em ...0s)
+        inicio = timestamp - (timestamp % self.tamanho)
+        janela = self.aberta
+        if janela is None:
+            janela = self.aberta = ContadoresJanela(inicio)
+        elif inicio > janela.inicio:
+            self.fechar_janela()
+            self.preencher_lacuna(janela.inicio, inicio)
+            janela = self.aberta = ContadoresJanela(inicio)
+        # Pacotes ligeiramente fora de ordem (timestamp anterior à janela aberta) contam na janela aberta
+
+        janela.pacotes += 1
+        janela.bytes += origlen
+        if ip is not None:
+            par = (ip['ip_origem'] << 32) | ip['ip_destino']
+            trafego_por_par = janela.trafego_por_par
+            if len(trafego_por_par) >= self.maximo_pares and par not in trafego_por_par:
+                self.pares_descartados += janela.podar_pares(self.maximo_pares)
+                trafego_por_par = janela.trafego_por_par
+            trafego_por_par[par] = trafego_por_par.get(par, 0) + origlen
+            if ip['protocolo'] == 17:
+                janela.soma_udp += origlen
+                janela.quantidade_udp += 1
+
+    # Janelas fechadas mais a janela aberta (parcial), da mais antiga para a mais recente
+    def janelas(self):
+        janelas = list(self.fechadas)
+        if self.aberta is not None:
+            janelas.append(self.aberta.resumir(self.tamanho))
+        return janelas
+
+    # Junta a série de outra parte da análise (outra fatia do arquivo ou outro arquivo, com o mesmo tamanho de
+    # janela). As janelas das duas séries são intercaladas pelo início, e as que começam juntas são somadas:
+    # com os contadores completos quando as duas partes os têm (a janela aberta e a primeira fechada, que é o
+    # caso da divisão em fatias), senão pelos resumos. A janela mais recente continua aberta
+    def mesclar(self, outro):
+        self.pares_descartados += outro.pares_descartados
+        if outro.aberta is None:
+            return
+        completas = {}
+        for contadores in (self.primeira, self.aberta, outro.primeira, outro.aberta):
+            if contadores is None:
+                continue
+            if contadores.inicio not in completas:
+                completas[contadores.inicio] = ContadoresJanela(contadores.inicio)
+            self.pares_descartados += completas[contadores.inicio].somar(contadores, self.maximo_pares)
+        resumidas = {}
+        for serie in (self, outro):
+            ja_contada = serie.primeira.inicio if serie.primeira is not None else None
+            for janela in serie.fechadas:
+                if janela['inicio'] != ja_contada:
+                    anterior = resumidas.get(janela['inicio'])
+                    resumidas[janela['inicio']] = janela if anterior is None else combinar_janelas(anterior, janela)
+
+        # A janela mais recente é a aberta de uma das partes (a outra parte não tem janela fechada depois dela)
+        inicios = sorted(set(completas) | set(resumidas))
+        self.aberta = completas[inicios[-1]]
+        self.primeira = completas.get(inicios[0]) if len(inicios) > 1 and inicios[0] not in resumidas else None
+        janelas = []
+        for inicio in inicios[:-1]:
+            resumo = resumidas.get(inicio)
+            if inicio in completas:
+                janela = completas[inicio].resumir(self.tamanho)
+                resumo = janela if resumo is None else combinar_janelas(janela, resumo)
+            janelas.append(resumo)
+
+        # Pico: a maior janela entre as intercaladas e os picos que já saíram dos buffers (em caso de empate,
+        # vale a janela mais antiga)
+        candidatas = janelas + [pico for pico in (self.pico, outro.pico) if pico is not None and
+                                pico['inicio'] not in completas and pico['inicio'] not in resumidas]
+        self.pico = None
+        self.fechadas.clear()
+        for janela in sorted(candidatas, key=lambda janela: janela['inicio']):
+            if self.pico is None or janela['bytes'] > self.pico['bytes']:
+                self.pico = janela
+        # Reconstrói o buffer circular em ordem, com janelas zeradas entre partes que não se tocam
+        for anterior, janela in zip([None] + janelas, janelas):
+            if anterior is not None:
+                self.preencher_lacuna(anterior['inicio'], janela['inicio'])
+            self.fechadas.append(janela)
+        if janelas:
+            self.preencher_lacuna(janelas[-1]['inicio'], self.aberta.inicio)
+
+# Acumulador de estatísticas por janela de tempo, compatível com o motor de analise_pcap
+class AcumuladorJanelas:
+    nome = "janelas"
+
+    def __init__(self, tamanhos=TAMANHOS_JANELA_PADRAO, janelas_mantidas=JANELAS_MANTIDAS):
+        self.series = [SerieJanelas(tamanho, janelas_mantidas) for tamanho in tamanhos]
+
+    def atualizar(self, pacote, ip):
+        timestamp = pacote['timestamp']
+        origlen = pacote['origlen']
+        for serie in self.series:
+            serie.atualizar(timestamp, origlen, ip)
+
+    def mesclar(self, outro):
+        for serie, outra in zip(self.series, outro.series):
+            serie.mesclar(outra)
+
+    def finalizar(self):
+        resultado = {}
+        for serie in self.series:
+            janelas = serie.janelas()
+            pico = serie.pico
+            if janelas and (pico is None or janelas[-1]['bytes'] > pico['bytes']):
+                pico = janelas[-1]  # A janela aberta também pode ser o pico
+            resultado[serie.tamanho] = {'janelas': janelas, 'pico': pico, 'pares_descartados': serie.pares_descartados}
+        return resultado
+
+# Cabeçalho da tabela de janelas (usado na exibição e na exportação)
+CABECALHO_TABELA_JANELAS = [
+    "Janela (s)", "Início", "Pacotes", "Pacotes/s", "Bytes/s", "Média UDP (bytes)", "Par com mais tráfego"
+]
+
+# Função para montar as linhas da tabela de janelas: para cada tamanho, a janela de pico e depois
+# as janelas mantidas no buffer circular
+def linhas_janelas(resultado):
+    linhas = []
+    for tamanho, serie in resultado.items():
+        janelas = [("pico", serie['pico'])] if serie['pico'] is not None else []
+        janelas += [("", janela) for janela in serie['janelas']]
+        for marcador, janela in janelas:
+            if janela['top_pares']:
+                (ip_origem, ip_destino), total = janela['top_pares'][0]
+                par = f"{ip_origem} -> {ip_destino} ({total} bytes)"
+            else:
+                par = "-"
+            media_udp = f"{janela['media_udp']:.2f}" if janela['media_udp'] is not None else "-"
+            linhas.append([
+                f"{tamanho} {marcador}".strip(),
+                f"{janela['inicio']:.0f}",
+                janela['pacotes'],
+                f"{janela['pacotes_por_segundo']:.2f}",
+                f"{janela['bytes_por_segundo']:.2f}",
+                media_udp,
+                par
+            ])
+    return linhas
@@ -0,0 +1,437 @@
+# Leitura de arquivos de captura compartilhada por tcpdump.py e tcpdump2.py.
+# O formato é detectado pelo magic number: pcap clássico (little ou big endian, timestamps em
+# microssegundos ou nanossegundos) e pcapng (seções com ordem de bytes própria e várias interfaces,
+# cada uma com o seu tipo de enlace e resolução de timestamp). Os unpackers são pré-compilados e
+# escolhidos uma vez por arquivo (ou por seção do pcapng), sem testar o formato a cada pacote.
+# Há dois modos: leitura em fluxo com buffer (padrão) e leitura por mmap, que entrega os
+# dados de cada pacote como memoryview sobre o arquivo mapeado, sem copiar o payload.
+import mmap
+import struct
+
+from .decodificacao_pcap import LINKTYPE_POR_INTERFACE
+
+# Tamanho do buffer de leitura (1 MiB): o arquivo é lido em blocos grandes, não registro a registro no disco
+TAMANHO_BUFFER_LEITURA = 1024 * 1024
+
+# Tamanho do cabeçalho global do pcap clássico (e da parte fixa do bloco de seção do pcapng)
+TAMANHO_CABECALHO_GLOBAL = 24
+
+# Magic do pcap clássico, como gravado no arquivo: (ordem dos bytes, divisor da fração do timestamp)
+FORMATOS_PCAP = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1_000_000),
+    b'\xa1\xb2\xc3\xd4': ('>', 1_000_000),
+    b'\x4d\x3c\xb2\xa1': ('<', 1_000_000_000),
+    b'\xa1\xb2\x3c\x4d': ('>', 1_000_000_000)
+}
+
+# Tipo do bloco de seção do pcapng (igual nas duas ordens de bytes) e o magic que define a ordem da seção
+MAGIC_PCAPNG = b'\x0a\x0d\x0d\x0a'
+ORDENS_PCAPNG = {
+    b'\x4d\x3c\x2b\x1a': '<',
+    b'\x1a\x2b\x3c\x4d': '>'
+}
+
+# Tipos de bloco do pcapng
+BLOCO_SECAO = 0x0A0D0D0A
+BLOCO_INTERFACE = 0x00000001
+BLOCO_PACOTE_OBSOLETO = 0x00000002
+BLOCO_PACOTE_SIMPLES = 0x00000003
+BLOCO_PACOTE_ESTENDIDO = 0x00000006
+BLOCOS_PACOTE = (BLOCO_PACOTE_ESTENDIDO, BLOCO_PACOTE_SIMPLES, BLOCO_PACOTE_OBSOLETO)
+
+# Opções do bloco de interface: resolução e deslocamento (segundos) dos timestamps
+OPCAO_FIM = 0
+OPCAO_IF_TSRESOL = 9
+OPCAO_IF_TSOFFSET = 14
+
+# Unpackers pré-compilados para cada ordem de bytes
+CABECALHOS_GLOBAIS = {ordem: struct.Struct(ordem + 'IHHiIII') for ordem in '<>'}
+CABECALHOS_REGISTRO = {ordem: struct.Struct(ordem + 'IIII') for ordem in '<>'}
+CABECALHOS_BLOCO = {ordem: struct.Struct(ordem + 'II') for ordem in '<>'}
+CORPOS_SECAO = {ordem: struct.Struct(ordem + 'IHHq') for ordem in '<>'}
+CORPOS_INTERFACE = {ordem: struct.Struct(ordem + 'HHI') for ordem in '<>'}
+CORPOS_PACOTE_ESTENDIDO = {ordem: struct.Struct(ordem + 'IIIII') for ordem in '<>'}
+CORPOS_PACOTE_OBSOLETO = {ordem: struct.Struct(ordem + 'HHIIII') for ordem in '<>'}
+CORPOS_PACOTE_SIMPLES = {ordem: struct.Struct(ordem + 'I') for ordem in '<>'}
+CABECALHOS_OPCAO = {ordem: struct.Struct(ordem + 'HH') for ordem in '<>'}
+DESLOCAMENTOS_TIMESTAMP = {ordem: struct.Struct(ordem + 'q') for ordem in '<>'}
+
+# Função para decodificar o cabeçalho global (24 bytes) de um arquivo de captura
+# No pcapng, os 24 bytes são a parte fixa do primeiro bloco de seção; as interfaces vêm depois
+def decodificar_cabecalho_global(cabecalho_global):
+    if len(cabecalho_global) < TAMANHO_CABECALHO_GLOBAL:
+        raise Exception("Cabeçalho global incompleto.")
+
+    magic = bytes(cabecalho_global[0:4])
+    if magic == MAGIC_PCAPNG:
+        ordem = ORDENS_PCAPNG.get(bytes(cabecalho_global[8:12]))
+        if ordem is None:
+            raise Exception("Bloco de seção pcapng com ordem de bytes inválida.")
+        _, versao_maior, versao_menor, _ = CORPOS_SECAO[ordem].unpack_from(cabecalho_global, 8)
+        return {
+            'formato': "pcapng",
+            'ordem': ordem,
+            'magic': BLOCO_SECAO,
+            'versao_maior': versao_maior,
+            'versao_menor': versao_menor,
+            'snaplen': 0,
+            'linktype': LINKTYPE_POR_INTERFACE,
+            'interfaces': []
+        }
+
+    if magic not in FORMATOS_PCAP:
+        raise Exception(f"Formato de captura não reconhecido (magic 0x{magic.hex()}).")
+    ordem, divisor = FORMATOS_PCAP[magic]
+    magic_lido, versao_maior, versao_menor, _, _, snaplen, linktype = \
+        CABECALHOS_GLOBAIS[ordem].unpack_from(cabecalho_global, 0)
+    return {
+        'formato': "pcap",
+        'ordem': ordem,
+        'divisor': divisor,
+        'magic': magic_lido,
+        'versao_maior': versao_maior,
+        'versao_menor': versao_menor,
+        'snaplen': snaplen,
+        'linktype': linktype
+    }
+
+# Função para converter a opção if_tsresol no divisor do timestamp (potência de 10 ou de 2)
+def divisor_resolucao(valor):
+    if valor & 0x80:
+        return 2 ** (valor & 0x7F)
+    return 10 ** valor
+
+# Função para ler as opções (código -> valor) de um bloco pcapng, de 'posicao' até 'fim'
+def ler_opcoes(buffer, posicao, fim, ordem):
+    desempacotar = CABECALHOS_OPCAO[ordem].unpack_from
+    opcoes = {}
+    while posicao + 4 <= fim:
+        codigo, tamanho = desempacotar(buffer, posicao)
+        if codigo == OPCAO_FIM:
+            break
+        opcoes.setdefault(codigo, bytes(buffer[posicao + 4:posicao + 4 + tamanho]))
+        posicao += 4 + ((tamanho + 3) & ~3)  # Valores alinhados a 4 bytes
+    return opcoes
+
+# Estado de leitura de um arquivo pcapng: ordem de bytes da seção atual e as suas interfaces.
+# Cada bloco é lido a partir de um buffer (o arquivo mapeado ou os bytes do próprio bloco)
+class SecaoPcapng:
+    def __init__(self):
+        self.ordem = '<'
+        self.versao_maior = 1
+        self.versao_menor = 0
+        self.interfaces = []
+        self.ultimo_timestamp = 0.0
+
+    # Lê tipo e tamanho do bloco que começa em 'posicao' (são necessários 12 bytes a partir dela)
+    def ler_cabecalho_bloco(self, buffer, posicao):
+        if bytes(buffer[posicao:posicao + 4]) == MAGIC_PCAPNG:
+            ordem = ORDENS_PCAPNG.get(bytes(buffer[posicao + 8:posicao + 12]))
+            if ordem is None:
+                raise Exception(f"Bloco de seção pcapng inválido no offset {posicao}.")
+            self.ordem = ordem
+        tipo, tamanho = CABECALHOS_BLOCO[self.ordem].unpack_from(buffer, posicao)
+        if tamanho < 12 or tamanho % 4:
+            raise Exception(f"Bloco pcapng com tamanho inválido no offset {posicao}.")
+        return tipo, tamanho
+
+    # Interpreta o bloco de 'tamanho' bytes em 'posicao'; devolve o pacote ou None (bloco sem pacote)
+    def interpretar_bloco(self, buffer, posicao, tipo, tamanho, offset=None):
+        ordem = self.ordem
+        corpo = posicao + 8
+        fim_corpo = posicao + tamanho - 4
+
+        if tipo == BLOCO_PACOTE_ESTENDIDO:
+            indice, alto, baixo, caplen, origlen = CORPOS_PACOTE_ESTENDIDO[ordem].unpack_from(buffer, corpo)
+            inicio_dados = corpo + 20
+        elif tipo == BLOCO_PACOTE_SIMPLES:
+            origlen = CORPOS_PACOTE_SIMPLES[ordem].unpack_from(buffer, corpo)[0]
+            snaplen = self.interfaces[0]['snaplen'] if self.interfaces else 0
+            caplen = min(origlen, snaplen or origlen, fim_corpo - corpo - 4)
+            inicio_dados = corpo + 4
+            indice = 0
+        elif tipo == BLOCO_PACOTE_OBSOLETO:
+            indice, _, alto, baixo, caplen, origlen = CORPOS_PACOTE_OBSOLETO[ordem].unpack_from(buffer, corpo)
+            inicio_dados = corpo + 20
+        elif tipo == BLOCO_INTERFACE:
+            self.adicionar_interface(buffer, corpo, fim_corpo)
+            return None
+        elif tipo == BLOCO_SECAO:
+            _, self.versao_maior, self.versao_menor, _ = CORPOS_SECAO[ordem].unpack_from(buffer, corpo)
+            self.interfaces = []  # Cada seção define as suas próprias interfaces
+            return None
+        else:
+            return None  # Estatísticas, resolução de nomes, blocos personalizados...
+
+        if indice >= len(self.interfaces):
+            raise Exception(f"Pacote pcapng de interface não declarada ({indice}).")
+        interface = self.interfaces[indice]
+        if tipo == BLOCO_PACOTE_SIMPLES:
+            # O bloco simples não tem timestamp: usa o do pacote anterior para manter a ordem temporal
+            timestamp = self.ultimo_timestamp
+        else:
+            divisor = interface['divisor']
+            segundos, fracao = divmod((alto << 32) | baixo, divisor)
+            timestamp = interface['deslocamento'] + segundos + fracao / divisor
+            self.ultimo_timestamp = timestamp
+
+        pacote = {
+            'timestamp': timestamp,
+            'caplen': caplen,
+            'origlen': origlen,
+            'dados': buffer[inicio_dados:inicio_dados + caplen],
+            'interface': indice,
+            'linktype': interface['linktype']
+        }
+        if offset is not None:
+            pacote['offset'] = offset
+        return pacote
+
+    def adicionar_interface(self, buffer, corpo, fim_corpo):
+        linktype, _, snaplen = CORPOS_INTERFACE[self.ordem].unpack_from(buffer, corpo)
+        opcoes = ler_opcoes(buffer, corpo + 8, fim_corpo, self.ordem)
+        divisor = 1_000_000
+        if OPCAO_IF_TSRESOL in opcoes:
+            divisor = divisor_resolucao(opcoes[OPCAO_IF_TSRESOL][0])
+        deslocamento = 0
+        if OPCAO_IF_TSOFFSET in opcoes:
+            deslocamento = DESLOCAMENTOS_TIMESTAMP[self.ordem].unpack_from(opcoes[OPCAO_IF_TSOFFSET])[0]
+        self.interfaces.append({
+            'linktype': linktype,
+            'snaplen': snaplen,
+            'divisor': divisor,
+            'deslocamento': deslocamento
+        })
+
+# Função para ler o próximo bloco pcapng de um arquivo aberto
+# Retorna (tipo, tamanho, bytes do bloco) ou None no fim do arquivo (ou bloco incompleto)
+def ler_bloco_pcapng(arquivo, secao):
+    inicio_bloco = arquivo.read(12)
+    if len(inicio_bloco) < 12:
+        return None
+    tipo, tamanho = secao.ler_cabecalho_bloco(inicio_bloco, 0)
+    restante = arquivo.read(tamanho - 12)
+    if len(restante) < tamanho - 12:
+        return None
+    return tipo, tamanho, inicio_bloco + restante
+
+# Função para ler o cabeçalho global de um arquivo de captura já aberto
+# No pcapng, percorre os blocos iniciais até o primeiro pacote para listar as interfaces
+def ler_cabecalho_global(arquivo):
+    posicao = arquivo.tell()
+    cabecalho = decodificar_cabecalho_global(arquivo.read(TAMANHO_CABECALHO_GLOBAL))
+    if cabecalho['formato'] != "pcapng":
+        return cabecalho
+
+    arquivo.seek(posicao)
+    secao = SecaoPcapng()
+    while True:
+        bloco = ler_bloco_pcapng(arquivo, secao)
+        if bloco is None:
+            break
+        tipo, tamanho, dados_bloco = bloco
+        if tipo in BLOCOS_PACOTE:
+            break
+        secao.interpretar_bloco(dados_bloco, 0, tipo, tamanho)
+    cabecalho['interfaces'] = secao.interfaces
+    if secao.interfaces:
+        cabecalho['snaplen'] = secao.interfaces[0]['snaplen']
+    return cabecalho
+
+# Função para ler apenas o tipo de enlace (LinkType) de um arquivo de captura
+# No pcapng é LINKTYPE_POR_INTERFACE: cada pacote traz o tipo de enlace da sua interface
+def ler_tipo_link(caminho_arquivo):
+    with open(caminho_arquivo, 'rb') as arquivo:
+        return decodificar_cabecalho_global(arquivo.read(TAMANHO_CABECALHO_GLOBAL))['linktype']
+
+# Função para descrever o formato do arquivo (exibido junto com o cabeçalho global)
+def descrever_formato(cabecalho):
+    if cabecalho['formato'] == "pcapng":
+        return f"pcapng ({len(cabecalho['interfaces'])} interface(s))"
+    ordem = "little endian" if cabecalho['ordem'] == '<' else "big endian"
+    resolucao = "microssegundos" if cabecalho['divisor'] == 1_000_000 else "nanossegundos"
+    return f"pcap ({ordem}, {resolucao})"
+
+# Função para descrever o tipo de enlace (no pcapng, o de cada interface)
+def descrever_tipo_link(cabecalho):
+    if cabecalho['formato'] == "pcapng":
+        return ", ".join(str(interface['linktype']) for interface in cabecalho['interfaces']) or "-"
+    return cabecalho['linktype']
+
+# Gerador que lê os pacotes de um arquivo de captura um a um, sem manter o arquivo inteiro na memória
+def iterar_pacotes_pcap(caminho_arquivo):
+    with open(caminho_arquivo, 'rb', buffering=TAMANHO_BUFFER_LEITURA) as arquivo:
+        cabecalho = decodificar_cabecalho_global(arquivo.read(TAMANHO_CABECALHO_GLOBAL))
+
+        if cabecalho['formato'] == "pcapng":
+            arquivo.seek(0)
+            secao = SecaoPcapng()
+            while True:
+                bloco = ler_bloco_pcapng(arquivo, secao)
+                if bloco is None:
+                    break  # Fim do arquivo ou bloco truncado
+                tipo, tamanho, dados_bloco = bloco
+                pacote = secao.interpretar_bloco(dados_bloco, 0, tipo, tamanho)
+                if pacote is not None:
+                    yield pacote
+            return
+
+        desempacotar = CABECALHOS_REGISTRO[cabecalho['ordem']].unpack
+        divisor = cabecalho['divisor']
+        while True:
+            cabecalho_pacote = arquivo.read(16)
+            if len(cabecalho_pacote) < 16:
+                break  # Fim do arquivo
+
+            segundos, fracao, comprimento_capturado, comprimento_original = desempacotar(cabecalho_pacote)
+
+            conteudo_pacote = arquivo.read(comprimento_capturado)
+            if len(conteudo_pacote) < comprimento_capturado:
+                break  # Arquivo truncado
+
+            yield {
+                'timestamp': segundos + fracao / divisor,
+                'caplen': comprimento_capturado,
+                'origlen': comprimento_original,
+                'dados': conteudo_pacote
+            }
+
+# Gerador que percorre os blocos de um pcapng mapeado, entregando os pacotes cujo bloco começa
+# em [inicio, fim). Os blocos anteriores a 'inicio' são apenas saltados, exceto os de seção e de
+# interface, necessários para interpretar os pacotes da faixa
+def iterar_blocos_pcapng(visao, inicio, fim):
+    secao = SecaoPcapng()
+    posicao = 0
+    while posicao < fim and posicao + 12 <= len(visao):
+        tipo, tamanho = secao.ler_cabecalho_bloco(visao, posicao)
+        if posicao + tamanho > len(visao):
+            break  # Arquivo truncado
+        if posicao >= inicio or tipo in (BLOCO_SECAO, BLOCO_INTERFACE):
+            pacote = secao.interpretar_bloco(visao, posicao, tipo, tamanho, posicao)
+            if pacote is not None and posicao >= inicio:
+                yield pacote
+        posicao += tamanho
+
+# Gerador que percorre o arquivo mapeado em memória. 'dados' é um memoryview (sem cópia)
+# e 'offset' é a posição do registro (ou bloco) no arquivo, que pode ser usada depois em pacote_no_offset.
+# 'inicio' e 'fim' limitam a leitura a uma faixa de bytes alinhada aos registros (ver dividir_em_fatias);
+# sem 'inicio', a leitura começa no primeiro registro
+def iterar_pacotes_pcap_mmap(caminho_arquivo, inicio=None, fim=None):
+    with open(caminho_arquivo, 'rb') as arquivo:
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    visao = memoryview(mapa)
+    try:
+        cabecalho = decodificar_cabecalho_global(visao[0:TAMANHO_CABECALHO_GLOBAL])
+        tamanho_arquivo = len(mapa) if fim is None else min(fim, len(mapa))
+
+        if cabecalho['formato'] == "pcapng":
+            yield from iterar_blocos_pcapng(visao, inicio or 0, tamanho_arquivo)
+            return
+
+        desempacotar = CABECALHOS_REGISTRO[cabecalho['ordem']].unpack_from
+        divisor = cabecalho['divisor']
+        posicao = TAMANHO_CABECALHO_GLOBAL if inicio is None else inicio
+
+        while posicao + 16 <= tamanho_arquivo:
+            segundos, fracao, caplen, origlen = desempacotar(mapa, posicao)
+            inicio_dados = posicao + 16
+            fim_dados = inicio_dados + caplen
+            if fim_dados > tamanho_arquivo:
+                break  # Arquivo truncado
+
+            yield {
+                'timestamp': segundos + fracao / divisor,
+                'caplen': caplen,
+                'origlen': origlen,
+                'dados': visao[inicio_dados:fim_dados],
+                'offset': posicao
+            }
+            posicao = fim_dados
+    finally:
+        visao.release()
+        try:
+            mapa.close()
+        except BufferError:
+            pass  # Ainda há fatias em uso; o mapeamento é liberado quando forem coletadas
+
+# Função para ler um único pacote a partir do offset do seu registro (acesso aleatório)
+def pacote_no_offset(caminho_arquivo, offset):
+    with open(caminho_arquivo, 'rb') as arquivo:
+        cabecalho = decodificar_cabecalho_global(arquivo.read(TAMANHO_CABECALHO_GLOBAL))
+        if cabecalho['formato'] != "pcapng":
+            arquivo.seek(offset)
+            cabecalho_pacote = arquivo.read(16)
+            if len(cabecalho_pacote) < 16:
+                raise Exception(f"Nenhum registro completo no offset {offset}.")
+            segundos, fracao, caplen, origlen = CABECALHOS_REGISTRO[cabecalho['ordem']].unpack(cabecalho_pacote)
+            conteudo_pacote = arquivo.read(caplen)
+            if len(conteudo_pacote) < caplen:
+                raise Exception(f"Registro truncado no offset {offset}.")
+            return {
+                'timestamp': segundos + fracao / cabecalho['divisor'],
+                'caplen': caplen,
+                'origlen': origlen,
+                'dados': conteudo_pacote,
+                'offset': offset
+            }
+
+    # No pcapng, as interfaces declaradas antes do offset são necessárias para interpretar o bloco
+    for pacote in iterar_pacotes_pcap_mmap(caminho_arquivo, offset, offset + 1):
+        pacote['dados'] = bytes(pacote['dados'])
+        return pacote
+    raise Exception(f"Nenhum pacote completo no offset {offset}.")
+
+# Função para dividir o arquivo em faixas de bytes alinhadas aos registros, percorrendo apenas
+# os cabeçalhos dos registros (ou blocos). Retorna uma lista de (inicio, fim) com tamanhos aproximadamente iguais
+def dividir_em_fatias(caminho_arquivo, quantidade_fatias):
+    with open(caminho_arquivo, 'rb') as arquivo:
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        cabecalho = decodificar_cabecalho_global(mapa[0:TAMANHO_CABECALHO_GLOBAL])
+        tamanho_arquivo = len(mapa)
+
+        if cabecalho['formato'] == "pcapng":
+            secao = SecaoPcapng()
+            def tamanho_registro(posicao):
+                return secao.ler_cabecalho_bloco(mapa, posicao)[1]
+            inicio_fatia = 0
+            tamanho_minimo = 12
+        else:
+            desempacotar = struct.Struct(cabecalho['ordem'] + 'I').unpack_from
+            def tamanho_registro(posicao):
+                return 16 + desempacotar(mapa, posicao + 8)[0]
+            inicio_fatia = TAMANHO_CABECALHO_GLOBAL
+            tamanho_minimo = 16
+
+        tamanho_alvo = max(1, (tamanho_arquivo - inicio_fatia) // max(1, quantidade_fatias))
+        fatias = []
+        proximo_corte = inicio_fatia + tamanho_alvo
+        posicao = inicio_fatia
+        while posicao + tamanho_minimo <= tamanho_arquivo:
+            tamanho = tamanho_registro(posicao)
+            if posicao + tamanho > tamanho_arquivo:
+                break  # Arquivo truncado
+            posicao += tamanho
+            if posicao >= proximo_corte and len(fatias) < quantidade_fatias - 1:
+                fatias.append((inicio_fatia, posicao))
+                inicio_fatia = posicao
+                proximo_corte = inicio_fatia + tamanho_alvo
+        if posicao > inicio_fatia:
+            fatias.append((inicio_fatia, posicao))
+        return fatias
+    finally:
+        mapa.close()
+
+# Fonte de pacotes reutilizável: cada iteração relê o arquivo (em fluxo ou via mmap) com memória constante,
+# o que permite que várias análises consumam a mesma fonte
+class FontePacotesPcap:
+    def __init__(self, caminho_arquivo, usar_mmap=False):
+        self.caminho_arquivo = caminho_arquivo
+        self.usar_mmap = usar_mmap
+        with open(caminho_arquivo, 'rb') as arquivo:
+            self.cabecalho = ler_cabecalho_global(arquivo)
+
+    def __iter__(self):
+        if self.usar_mmap:
+            return iterar_pacotes_pcap_mmap(self.caminho_arquivo)
+        return iterar_pacotes_pcap(self.caminho_arquivo)
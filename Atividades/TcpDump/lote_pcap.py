@@ -0,0 +1,162 @@
+# Modo em lote: analisa vários arquivos PCAP (por exemplo, capturas rotacionadas) em paralelo.
+# Cada arquivo é analisado por um processo; o resultado traz o relatório de cada arquivo e um
+# consolidado com todos os arquivos mesclados.
+# A tabela de cabeçalhos IP de cada arquivo é gravada pelo próprio processo, em blocos, num arquivo
+# temporário: só os acumuladores de resumo voltam ao processo principal, que lê a tabela do disco
+# quando ela é exibida ou exportada.
+import glob
+import os
+import tempfile
+from array import array
+from itertools import repeat
+from pathlib import Path
+
+from .leitura_pcap import iterar_pacotes_pcap_mmap, ler_tipo_link
+from .analise_pcap import (
+    ACUMULADORES_PADRAO, AcumuladorHeadersIp, CAMPOS_HEADERS_IP, LinhasHeadersIp, alimentar_acumuladores
+)
+from .paralelo_pcap import mesclar_parciais
+
+# Linhas da tabela de cabeçalhos IP por bloco gravado em disco (as colunas de um bloco ficam em sequência)
+TAMANHO_BLOCO_TABELA = 65536
+
+# Bytes de uma linha da tabela gravada (soma dos tamanhos das colunas)
+TAMANHO_LINHA_TABELA = sum(array(tipo).itemsize for _, tipo in CAMPOS_HEADERS_IP)
+
+# Extensões consideradas capturas ao expandir um diretório
+EXTENSOES_PCAP = {".pcap", ".pcapng", ".cap", ".dump"}
+
+# Função para saber se um nome de arquivo tem a extensão de uma captura. Só o sufixo final conta (o índice
+# "captura.pcap.idx" não é captura); capturas rotacionadas costumam ter sufixo numérico (ex.: captura.pcap1)
+def eh_captura(nome):
+    return Path(nome).suffix.lower().rstrip("0123456789") in EXTENSOES_PCAP
+
+# Função para expandir arquivos, padrões glob e diretórios numa lista ordenada de capturas
+def expandir_entradas(entradas):
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for nome in sorted(os.listdir(entrada)):
+                if eh_captura(nome):
+                    caminhos.append(os.path.join(entrada, nome))
+        elif glob.has_magic(entrada):
+            caminhos.extend(sorted(glob.glob(entrada)))
+        else:
+            caminhos.append(entrada)
+
+    # Remove duplicados mantendo a ordem
+    vistos = set()
+    unicos = []
+    for caminho in caminhos:
+        if caminho not in vistos and os.path.isfile(caminho):
+            vistos.add(caminho)
+            unicos.append(caminho)
+    return unicos
+
+# Acumulador da tabela de cabeçalhos IP nos processos do lote: as colunas são gravadas no arquivo
+# 'caminho_tabela' a cada TAMANHO_BLOCO_TABELA linhas, em vez de guardadas até o fim da captura
+class AcumuladorHeadersIpEmDisco:
+    nome = AcumuladorHeadersIp.nome
+
+    def __init__(self, caminho_tabela):
+        self.arquivo = open(caminho_tabela, 'wb')
+        self.bloco = LinhasHeadersIp()
+        self.total = 0
+
+    def atualizar(self, pacote, ip):
+        if ip is not None:
+            self.bloco.adicionar(ip)
+            if len(self.bloco) == TAMANHO_BLOCO_TABELA:
+                self.gravar_bloco()
+
+    def gravar_bloco(self):
+        for campo, _ in CAMPOS_HEADERS_IP:
+            getattr(self.bloco, campo).tofile(self.arquivo)
+        self.total += len(self.bloco)
+        self.bloco = LinhasHeadersIp()
+
+    # Grava o último bloco e fecha o arquivo; retorna a quantidade de linhas gravadas
+    def finalizar(self):
+        if len(self.bloco):
+            self.gravar_bloco()
+        self.arquivo.close()
+        return self.total
+
+# Classe da tabela de cabeçalhos IP gravada por um processo do lote, lida do disco bloco a bloco, com a
+# mesma interface de leitura de LinhasHeadersIp (len, iteração e iterar(inicio, fim)). A tabela guarda o
+# diretório temporário (TemporaryDirectory), apagado quando nenhuma tabela do lote o referencia mais
+class TabelaHeadersIpEmDisco:
+    def __init__(self, caminho_tabela, total, diretorio):
+        self.caminho_tabela = caminho_tabela
+        self.total = total
+        self.diretorio = diretorio
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return self.iterar()
+
+    # Gera as linhas de 'inicio' até 'fim' (exclusivo); os blocos anteriores a 'inicio' são pulados sem leitura
+    def iterar(self, inicio=0, fim=None):
+        fim = self.total if fim is None else min(fim, self.total)
+        with open(self.caminho_tabela, 'rb') as arquivo:
+            for primeiro in range(0, fim, TAMANHO_BLOCO_TABELA):
+                quantidade = min(TAMANHO_BLOCO_TABELA, self.total - primeiro)
+                if primeiro + quantidade <= inicio:
+                    arquivo.seek(quantidade * TAMANHO_LINHA_TABELA, os.SEEK_CUR)
+                    continue
+                bloco = LinhasHeadersIp()
+                for campo, _ in CAMPOS_HEADERS_IP:
+                    getattr(bloco, campo).fromfile(arquivo, quantidade)
+                for indice in range(max(inicio - primeiro, 0), min(fim - primeiro, quantidade)):
+                    linha = bloco.linha(indice)
+                    linha[0] = primeiro + indice + 1
+                    yield linha
+
+# Função executada em cada processo: analisa um arquivo inteiro, gravando a tabela de cabeçalhos IP (se pedida)
+# em 'caminho_tabela'. Retorna (acumuladores de resumo, quantidade de linhas da tabela ou None)
+def analisar_arquivo(caminho_arquivo, classes_acumuladores, filtro, remontar, caminho_tabela):
+    acumuladores = [
+        AcumuladorHeadersIpEmDisco(caminho_tabela) if classe.nome == AcumuladorHeadersIp.nome else classe()
+        for classe in classes_acumuladores
+    ]
+    acumuladores = alimentar_acumuladores(iterar_pacotes_pcap_mmap(caminho_arquivo), acumuladores,
+                                          ler_tipo_link(caminho_arquivo), filtro, remontar)
+    linhas = None
+    for acumulador in acumuladores:
+        if isinstance(acumulador, AcumuladorHeadersIpEmDisco):
+            linhas = acumulador.finalizar()
+    return [acumulador for acumulador in acumuladores if not isinstance(acumulador, AcumuladorHeadersIpEmDisco)], linhas
+
+# Função para analisar um lote de arquivos em paralelo
+# Retorna ({caminho: resultados do arquivo}, resultados consolidados de todos os arquivos)
+def analisar_lote(caminhos, processos=None, classes_acumuladores=None, filtro=None, remontar=False):
+    if processos is None:
+        processos = os.cpu_count() or 1
+    if classes_acumuladores is None:
+        classes_acumuladores = ACUMULADORES_PADRAO
+    from concurrent.futures import ProcessPoolExecutor
+
+    diretorio = tempfile.TemporaryDirectory(prefix="lote_pcap_")
+    caminhos_tabela = [os.path.join(diretorio.name, f"{numero}.headers") for numero in range(len(caminhos))]
+    with ProcessPoolExecutor(max_workers=max(1, min(processos, len(caminhos)))) as executor:
+        parciais = list(executor.map(analisar_arquivo, caminhos, repeat(classes_acumuladores), repeat(filtro),
+                                     repeat(remontar), caminhos_tabela))
+
+    resultados_por_arquivo = {}
+    for caminho, caminho_tabela, (acumuladores, linhas) in zip(caminhos, caminhos_tabela, parciais):
+        resultados = {}
+        if linhas is not None:
+            resultados[AcumuladorHeadersIp.nome] = {'linhas': TabelaHeadersIpEmDisco(caminho_tabela, linhas, diretorio)}
+        resultados.update((acumulador.nome, acumulador.finalizar()) for acumulador in acumuladores)
+        resultados_por_arquivo[caminho] = resultados
+
+    # O consolidado não repete a tabela de cabeçalhos IP, já exibida em cada arquivo
+    consolidado = {}
+    if parciais:
+        consolidado = {
+            acumulador.nome: acumulador.finalizar()
+            for acumulador in mesclar_parciais([acumuladores for acumuladores, _ in parciais])
+        }
+    return resultados_por_arquivo, consolidado
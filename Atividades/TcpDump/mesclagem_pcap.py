@@ -0,0 +1,178 @@
+# Mesclagem de várias capturas (ex.: de vários pontos de espelhamento) numa única linha do tempo.
+# Cada captura é lida sob demanda e passa por um buffer de reordenação limitado (um heap de no máximo
+# 'tamanho_buffer' registros), que corrige registros levemente fora de ordem dentro do arquivo; as
+# capturas são então intercaladas por timestamp numa mesclagem k-way (heapq.merge). A memória é constante
+# por captura: o buffer de reordenação e um registro na mesclagem.
+# A fonte mesclada alimenta o motor de análise como qualquer fonte de pacotes, ou é gravada num novo pcap.
+import heapq
+import struct
+from itertools import count
+
+# Execução direta (python mesclagem_pcap.py): o script entra no pacote antes dos imports relativos (ver execucao_pcap)
+if not __package__:
+    from execucao_pcap import entrar_no_pacote
+    __package__ = entrar_no_pacote(__file__)
+
+from .leitura_pcap import FontePacotesPcap
+from .decodificacao_pcap import LINKTYPE_POR_INTERFACE
+
+# Registros guardados por captura no buffer de reordenação
+TAMANHO_BUFFER_REORDENACAO = 1024
+
+# Nome dos contadores da mesclagem no dicionário de resultados da análise
+NOME_MESCLAGEM = "mesclagem"
+
+# Cabeçalho global e de registro do pcap gravado (little endian, versão 2.4; ver gravar_pcap)
+MAGIC_MICROSSEGUNDOS = 0xA1B2C3D4
+MAGIC_NANOSSEGUNDOS = 0xA1B23C4D
+CABECALHO_GLOBAL_SAIDA = struct.Struct('<IHHiIII')
+CABECALHO_REGISTRO_SAIDA = struct.Struct('<IIII')
+
+# Função para listar os tipos de enlace de uma captura (no pcapng, os das interfaces declaradas)
+def tipos_link_captura(cabecalho):
+    if cabecalho['linktype'] == LINKTYPE_POR_INTERFACE:
+        return {interface['linktype'] for interface in cabecalho['interfaces']}
+    return {cabecalho['linktype']}
+
+# Classe de uma fonte de pacotes formada por várias capturas mescladas por timestamp
+# Como FontePacotesPcap, cada iteração relê as capturas; os contadores se referem à última iteração
+class FonteMesclada:
+    def __init__(self, caminhos, tamanho_buffer=TAMANHO_BUFFER_REORDENACAO, usar_mmap=True):
+        if tamanho_buffer < 0:
+            raise ValueError("o buffer de reordenação não pode ser negativo")
+        self.caminhos = list(caminhos)
+        self.tamanho_buffer = tamanho_buffer
+        self.fontes = [FontePacotesPcap(caminho, usar_mmap) for caminho in self.caminhos]
+        self.tipos_link = set()
+        for fonte in self.fontes:
+            self.tipos_link |= tipos_link_captura(fonte.cabecalho)
+        # Um único tipo de enlace (e nenhum pcapng) mantém o decodificador fixo; senão, cada pacote leva o seu
+        self.por_interface = len(self.tipos_link) > 1 or any(
+            fonte.cabecalho['linktype'] == LINKTYPE_POR_INTERFACE for fonte in self.fontes)
+        self.cabecalho = {
+            'formato': "mesclado",
+            'linktype': LINKTYPE_POR_INTERFACE if self.por_interface else next(iter(self.tipos_link), 0),
+            'snaplen': max((fonte.cabecalho['snaplen'] for fonte in self.fontes), default=0)
+        }
+        self.pacotes = 0
+        self.fora_de_ordem = 0
+        self.atrasados = 0
+
+    # Gerador que lê uma captura passando pelo buffer de reordenação
+    # 'fora_de_ordem' conta os registros mais antigos que algum anterior do mesmo arquivo; 'atrasados', os que
+    # continuam fora de ordem na saída porque chegaram além do alcance do buffer
+    def reordenar(self, fonte):
+        buffer = []
+        sequencia = count()  # Desempata timestamps iguais pela ordem no arquivo (os dicionários não se comparam)
+        maior_lido = None
+        ultimo_entregue = None
+        linktype = fonte.cabecalho['linktype']
+        marcar_linktype = self.por_interface and linktype != LINKTYPE_POR_INTERFACE
+        for pacote in fonte:
+            timestamp = pacote['timestamp']
+            if marcar_linktype:
+                pacote['linktype'] = linktype
+            if maior_lido is not None and timestamp < maior_lido:
+                self.fora_de_ordem += 1
+            else:
+                maior_lido = timestamp
+            if len(buffer) < self.tamanho_buffer:
+                heapq.heappush(buffer, (timestamp, next(sequencia), pacote))
+                continue
+            if buffer and buffer[0][0] <= timestamp:
+                timestamp, _, pacote = heapq.heapreplace(buffer, (timestamp, next(sequencia), pacote))
+            if ultimo_entregue is not None and timestamp < ultimo_entregue:
+                self.atrasados += 1
+            ultimo_entregue = timestamp
+            yield pacote
+        while buffer:
+            timestamp, _, pacote = heapq.heappop(buffer)
+            if ultimo_entregue is not None and timestamp < ultimo_entregue:
+                self.atrasados += 1
+            ultimo_entregue = timestamp
+            yield pacote
+
+    def __iter__(self):
+        self.pacotes = 0
+        self.fora_de_ordem = 0
+        self.atrasados = 0
+        for pacote in heapq.merge(*map(self.reordenar, self.fontes), key=lambda pacote: pacote['timestamp']):
+            self.pacotes += 1
+            yield pacote
+
+    # Contadores da última leitura, no formato dos resultados da análise
+    def estatisticas(self):
+        return {
+            'capturas': len(self.caminhos),
+            'pacotes': self.pacotes,
+            'tamanho_buffer': self.tamanho_buffer,
+            'fora_de_ordem': self.fora_de_ordem,
+            'atrasados': self.atrasados
+        }
+
+# Função para gravar pacotes num arquivo pcap clássico (little endian, versão 2.4) com um único tipo de enlace
+# ('divisor' 1_000_000_000 grava em nanossegundos). Retorna a quantidade de registros gravados
+def gravar_pcap(pacotes, caminho_saida, linktype, snaplen=0, divisor=1_000_000):
+    magic = MAGIC_NANOSSEGUNDOS if divisor == 1_000_000_000 else MAGIC_MICROSSEGUNDOS
+    empacotar_registro = CABECALHO_REGISTRO_SAIDA.pack
+    total = 0
+    with open(caminho_saida, "wb") as saida:
+        saida.write(CABECALHO_GLOBAL_SAIDA.pack(magic, 2, 4, 0, 0, snaplen or 65535, linktype))
+        for pacote in pacotes:
+            if pacote.get('linktype', linktype) != linktype:
+                raise ValueError(f"pacote com tipo de enlace {pacote['linktype']} numa captura do tipo {linktype}")
+            unidades = round(pacote['timestamp'] * divisor)
+            saida.write(empacotar_registro(unidades // divisor, unidades % divisor, pacote['caplen'],
+                                           pacote['origlen']))
+            saida.write(pacote['dados'])
+            total += 1
+    return total
+
+# Função para gravar a fonte mesclada num arquivo pcap (em nanossegundos se alguma captura de entrada estiver
+# em nanossegundos). O pcap tem um único tipo de enlace: capturas com tipos diferentes não podem ser gravadas
+# juntas. Retorna a quantidade de registros gravados
+def gravar_pcap_mesclado(fonte_mesclada, caminho_saida):
+    if len(fonte_mesclada.tipos_link) > 1:
+        tipos = ", ".join(str(tipo) for tipo in sorted(fonte_mesclada.tipos_link))
+        raise ValueError(f"as capturas têm tipos de enlace diferentes ({tipos}); o pcap mesclado exige um único tipo")
+    divisor = max(fonte.cabecalho.get('divisor', 1_000_000) for fonte in fonte_mesclada.fontes)
+    return gravar_pcap(fonte_mesclada, caminho_saida, next(iter(fonte_mesclada.tipos_link), 0),
+                       fonte_mesclada.cabecalho['snaplen'], divisor)
+
+# Função para montar as linhas (descrição, valor) do relatório da mesclagem
+def linhas_mesclagem(resultado):
+    return [
+        ["Capturas mescladas", resultado['capturas']],
+        ["Pacotes na linha do tempo", resultado['pacotes']],
+        ["Buffer de reordenação (registros por captura)", resultado['tamanho_buffer']],
+        ["Registros fora de ordem nas capturas", resultado['fora_de_ordem']],
+        ["Registros ainda fora de ordem (além do buffer)", resultado['atrasados']]
+    ]
+
+# Execução direta: grava a mesclagem de várias capturas num único pcap
+# (ex.: python mesclagem_pcap.py mesclado.pcap tap1.pcap tap2.pcap --buffer 4096)
+if __name__ == "__main__":
+    import argparse
+    from .lote_pcap import expandir_entradas
+
+    parser = argparse.ArgumentParser(
+        description="Mescla capturas PCAP numa única linha do tempo ordenada por timestamp.")
+    parser.add_argument("saida", help="arquivo pcap gravado")
+    parser.add_argument("entradas", nargs="+", help="arquivos, padrões glob ou diretórios com capturas")
+    parser.add_argument("--buffer", type=int, default=TAMANHO_BUFFER_REORDENACAO,
+                        help=f"registros por captura no buffer de reordenação; 0 não reordena "
+                             f"(padrão: {TAMANHO_BUFFER_REORDENACAO})")
+    argumentos = parser.parse_args()
+    if argumentos.buffer < 0:
+        parser.error("o buffer de reordenação não pode ser negativo")
+
+    fonte = FonteMesclada(expandir_entradas(argumentos.entradas), argumentos.buffer)
+    try:
+        total = gravar_pcap_mesclado(fonte, argumentos.saida)
+    except ValueError as erro:
+        parser.error(str(erro))
+    print(f"[OK] {total} pacotes de {len(fonte.caminhos)} capturas gravados em {argumentos.saida}")
+    estatisticas = fonte.estatisticas()
+    if estatisticas['fora_de_ordem']:
+        print(f"[INFO] {estatisticas['fora_de_ordem']} registros fora de ordem nas capturas; "
+              f"{estatisticas['atrasados']} continuam fora de ordem (aumente --buffer)")
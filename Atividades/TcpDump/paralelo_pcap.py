@@ -0,0 +1,61 @@
+# Análise paralela de capturas grandes.
+# O arquivo é dividido em faixas de bytes alinhadas aos registros; cada faixa é analisada por um
+# processo do ProcessPoolExecutor e os acumuladores parciais são mesclados na ordem do arquivo.
+# Todos os relatórios são reduções mescláveis (min/max, somas e contagens, dicionários por chave).
+# O concurrent.futures.process (e o multiprocessing) só é importado quando há mais de uma fatia.
+import os
+
+from .leitura_pcap import iterar_pacotes_pcap_mmap, dividir_em_fatias, ler_tipo_link
+from .analise_pcap import ACUMULADORES_PADRAO, alimentar_acumuladores
+
+# Capturas a partir deste tamanho (256 MiB) compensam o custo de iniciar os processos
+LIMIAR_ANALISE_PARALELA = 256 * 1024 * 1024
+
+# Função executada em cada processo: analisa uma faixa do arquivo e devolve os acumuladores parciais
+# (o filtro chega ao processo como texto e é compilado de novo lá; com 'remontar', cada faixa remonta os
+# seus fragmentos, e os datagramas divididos entre duas faixas ficam contados como incompletos)
+def analisar_fatia(caminho_arquivo, inicio, fim, classes_acumuladores, filtro=None, remontar=False):
+    acumuladores = [classe() for classe in classes_acumuladores]
+    return alimentar_acumuladores(
+        iterar_pacotes_pcap_mmap(caminho_arquivo, inicio, fim), acumuladores, ler_tipo_link(caminho_arquivo), filtro,
+        remontar
+    )
+
+# Função para mesclar, na ordem das fatias, os acumuladores parciais de cada processo
+def mesclar_parciais(parciais):
+    acumuladores = parciais[0]
+    for parcial in parciais[1:]:
+        for acumulador, outro in zip(acumuladores, parcial):
+            acumulador.mesclar(outro)
+    return acumuladores
+
+# Função que analisa o arquivo em paralelo e devolve os acumuladores já mesclados (sem finalizá-los)
+def analisar_acumuladores_paralelo(caminho_arquivo, processos=None, classes_acumuladores=None, filtro=None,
+                                   remontar=False):
+    if processos is None:
+        processos = os.cpu_count() or 1
+    if classes_acumuladores is None:
+        classes_acumuladores = ACUMULADORES_PADRAO
+
+    fatias = dividir_em_fatias(caminho_arquivo, processos)
+    if len(fatias) <= 1:
+        inicio, fim = fatias[0] if fatias else (None, None)
+        return analisar_fatia(caminho_arquivo, inicio, fim, classes_acumuladores, filtro, remontar)
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [
+            executor.submit(analisar_fatia, caminho_arquivo, inicio, fim, classes_acumuladores, filtro, remontar)
+            for inicio, fim in fatias
+        ]
+        return mesclar_parciais([futuro.result() for futuro in futuros])
+
+# Função que analisa o arquivo em paralelo e retorna {nome do acumulador: resultado}
+def executar_analise_paralela(caminho_arquivo, processos=None, classes_acumuladores=None, filtro=None,
+                              remontar=False):
+    acumuladores = analisar_acumuladores_paralelo(caminho_arquivo, processos, classes_acumuladores, filtro, remontar)
+    return {acumulador.nome: acumulador.finalizar() for acumulador in acumuladores}
+
+# Função para decidir se um arquivo é grande o suficiente para a análise paralela
+def deve_analisar_em_paralelo(caminho_arquivo):
+    return (os.cpu_count() or 1) > 1 and os.path.getsize(caminho_arquivo) >= LIMIAR_ANALISE_PARALELA
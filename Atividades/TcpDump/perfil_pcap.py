@@ -0,0 +1,181 @@
+# Perfil de execução do analisador (opção --perfil dos programas principais).
+# Mede cada etapa (leitura do cabeçalho global, laço de leitura dos registros, cada relatório e cada
+# exportação): tempo, memória alocada (tracemalloc) e, nas etapas que leem pacotes neste processo,
+# a vazão em pacotes/s e MB/s. As etapas podem ser aninhadas (um relatório dentro da análise do arquivo).
+# O relatório é gravado em JSON; opcionalmente, o cProfile da execução inteira é gravado para o pstats.
+# Sem perfil ativo, as funções marcadas com @medir só fazem uma comparação com None por chamada.
+import cProfile
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Versão do formato do relatório de perfil
+VERSAO_PERFIL = 1
+
+# Perfil ativo no processo (None: execução normal, sem medição)
+PERFIL_ATIVO = None
+
+# Classe de uma fonte de pacotes que conta os pacotes e os bytes capturados lidos (para a vazão)
+# Os demais atributos (cabecalho, caminho_arquivo...) são os da fonte original
+class FonteContada:
+    def __init__(self, fonte, perfil):
+        self.fonte = fonte
+        self.perfil = perfil
+
+    def __getattr__(self, nome):
+        return getattr(self.fonte, nome)
+
+    def __iter__(self):
+        perfil = self.perfil
+        for pacote in self.fonte:
+            perfil.pacotes += 1
+            perfil.bytes += pacote['caplen']
+            yield pacote
+
+# Classe que acumula as medições de uma execução
+class PerfilExecucao:
+    def __init__(self, medir_alocacoes=True, caminho_pstats=None):
+        self.medir_alocacoes = medir_alocacoes
+        self.caminho_pstats = caminho_pstats
+        self.perfilador = cProfile.Profile() if caminho_pstats else None
+        self.etapas = []
+        self.pilha = []
+        self.pacotes = 0
+        self.bytes = 0
+        self.inicio = None
+        self.total_segundos = None
+
+    def iniciar(self):
+        if self.medir_alocacoes:
+            tracemalloc.start()
+        if self.perfilador is not None:
+            self.perfilador.enable()
+        self.inicio = time.perf_counter()
+
+    def encerrar(self):
+        self.total_segundos = time.perf_counter() - self.inicio
+        if self.perfilador is not None:
+            self.perfilador.disable()
+            self.perfilador.dump_stats(self.caminho_pstats)
+        if self.medir_alocacoes:
+            tracemalloc.stop()
+
+    # Mede o bloco como uma etapa. O pico do tracemalloc é zerado a cada etapa, então o pico já visto pela
+    # etapa de fora é guardado antes e combinado com o das etapas de dentro ao final
+    @contextmanager
+    def etapa(self, nome):
+        if self.pilha and self.medir_alocacoes:
+            pai = self.pilha[-1]
+            pai['pico'] = max(pai['pico'], tracemalloc.get_traced_memory()[1])
+        memoria = tracemalloc.get_traced_memory()[0] if self.medir_alocacoes else 0
+        if self.medir_alocacoes:
+            tracemalloc.reset_peak()
+        medicao = {'nome': nome, 'nivel': len(self.pilha), 'memoria_inicial': memoria, 'pico': memoria,
+                   'pacotes': self.pacotes, 'bytes': self.bytes}
+        self.etapas.append(medicao)
+        self.pilha.append(medicao)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            medicao['segundos'] = time.perf_counter() - inicio
+            self.pilha.pop()
+            medicao['pacotes'] = self.pacotes - medicao['pacotes']
+            medicao['bytes'] = self.bytes - medicao['bytes']
+            if self.medir_alocacoes:
+                atual, pico = tracemalloc.get_traced_memory()
+                medicao['pico'] = max(medicao['pico'], pico)
+                medicao['memoria_final'] = atual
+                if self.pilha:
+                    self.pilha[-1]['pico'] = max(self.pilha[-1]['pico'], medicao['pico'])
+
+    # Função para montar o relatório de uma etapa medida
+    def resumo_etapa(self, medicao):
+        segundos = medicao['segundos']
+        resumo = {'nome': medicao['nome'], 'nivel': medicao['nivel'], 'segundos': round(segundos, 6)}
+        if self.medir_alocacoes:
+            resumo['memoria_retida_kib'] = (medicao['memoria_final'] - medicao['memoria_inicial']) // 1024
+            resumo['pico_memoria_kib'] = (medicao['pico'] - medicao['memoria_inicial']) // 1024
+        if medicao['pacotes']:
+            resumo['pacotes'] = medicao['pacotes']
+            resumo['bytes'] = medicao['bytes']
+            resumo['pacotes_por_segundo'] = round(medicao['pacotes'] / segundos, 1) if segundos else None
+            resumo['mb_por_segundo'] = round(medicao['bytes'] / segundos / 1e6, 3) if segundos else None
+        return resumo
+
+    def relatorio(self):
+        return {
+            'versao': VERSAO_PERFIL,
+            'comando': sys.argv,
+            'python': platform.python_version(),
+            'total_segundos': round(self.total_segundos, 6),
+            'alocacoes_medidas': self.medir_alocacoes,
+            'pstats': self.caminho_pstats,
+            'etapas': [self.resumo_etapa(medicao) for medicao in self.etapas]
+        }
+
+    # Linhas da tabela de resumo exibida ao final: etapa (marcada pelo nível), tempo, pico e vazão
+    def linhas_resumo(self):
+        linhas = []
+        for resumo in map(self.resumo_etapa, self.etapas):
+            linhas.append([
+                "· " * resumo['nivel'] + resumo['nome'],
+                f"{resumo['segundos']:.3f}",
+                f"{resumo['pico_memoria_kib'] / 1024:.1f}" if 'pico_memoria_kib' in resumo else "-",
+                f"{resumo['pacotes_por_segundo']:,.0f}" if resumo.get('pacotes_por_segundo') else "-",
+                f"{resumo['mb_por_segundo']:.1f}" if resumo.get('mb_por_segundo') else "-"
+            ])
+        return linhas
+
+    def gravar(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.relatorio(), arquivo, ensure_ascii=False, indent=2)
+
+# Cabeçalho da tabela de resumo do perfil
+CABECALHO_RESUMO_PERFIL = ["Etapa", "Tempo (s)", "Pico alocado (MiB)", "Pacotes/s", "MB/s"]
+
+# Função para iniciar o perfil da execução e torná-lo o perfil ativo
+def iniciar_perfil(medir_alocacoes=True, caminho_pstats=None):
+    global PERFIL_ATIVO
+    PERFIL_ATIVO = PerfilExecucao(medir_alocacoes, caminho_pstats)
+    PERFIL_ATIVO.iniciar()
+    return PERFIL_ATIVO
+
+# Função para encerrar o perfil ativo e gravar o relatório JSON
+def encerrar_perfil(caminho_json):
+    global PERFIL_ATIVO
+    perfil, PERFIL_ATIVO = PERFIL_ATIVO, None
+    perfil.encerrar()
+    perfil.gravar(caminho_json)
+    return perfil
+
+# Função que devolve o contexto de medição de uma etapa (sem perfil ativo, um contexto vazio)
+def etapa(nome):
+    return nullcontext() if PERFIL_ATIVO is None else PERFIL_ATIVO.etapa(nome)
+
+# Decorador: mede cada chamada da função como uma etapa com o nome da função
+def medir(funcao):
+    @wraps(funcao)
+    def medida(*args, **kwargs):
+        if PERFIL_ATIVO is None:
+            return funcao(*args, **kwargs)
+        with PERFIL_ATIVO.etapa(funcao.__name__):
+            return funcao(*args, **kwargs)
+    return medida
+
+# Função para contar os pacotes lidos de uma fonte (só com perfil ativo; senão, a própria fonte)
+def contar_pacotes(fonte):
+    return fonte if PERFIL_ATIVO is None else FonteContada(fonte, PERFIL_ATIVO)
+
+# Função para medir o laço de leitura dos registros isoladamente: com perfil ativo, percorre a fonte uma vez
+# sem analisar (a leitura normal é feita sob demanda, misturada aos relatórios)
+def medir_leitura(fonte):
+    if PERFIL_ATIVO is None:
+        return
+    with PERFIL_ATIVO.etapa("leitura_registros"):
+        for _ in fonte:
+            pass
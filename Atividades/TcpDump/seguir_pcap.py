@@ -0,0 +1,122 @@
+# Modo de acompanhamento (follow) para capturas que ainda estão sendo gravadas.
+# O arquivo fica aberto; quando não há registro completo disponível, a leitura volta ao início do
+# registro e espera com backoff exponencial (polling). Os acumuladores são atualizados de forma
+# incremental e os resultados são entregues a cada 'intervalo' segundos, sem reler dados antigos.
+import time
+
+from .analise_pcap import ACUMULADORES_RESUMO
+from .decodificacao_pcap import criar_decodificador_pacotes
+from .leitura_pcap import (
+    CABECALHOS_REGISTRO, TAMANHO_CABECALHO_GLOBAL, SecaoPcapng, decodificar_cabecalho_global
+)
+
+# Espera mínima e máxima entre duas verificações de dados novos (segundos)
+ESPERA_MINIMA = 0.05
+ESPERA_MAXIMA = 2.0
+
+# No acompanhamento a tabela de cabeçalhos IP não é gerada: ela cresceria sem limite
+ACUMULADORES_ACOMPANHAMENTO = ACUMULADORES_RESUMO
+
+# Função para ler exatamente 'tamanho' bytes; se ainda não estiverem gravados, volta à posição
+# original e retorna None (o registro será lido por inteiro numa próxima tentativa)
+def ler_completo(arquivo, tamanho):
+    posicao = arquivo.tell()
+    dados = arquivo.read(tamanho)
+    if len(dados) < tamanho:
+        arquivo.seek(posicao)
+        return None
+    return dados
+
+# Gerador que acompanha um arquivo de captura (pcap ou pcapng) em crescimento. Entrega cada pacote novo e, quando
+# não há dados novos, espera (com backoff) e entrega None para que o chamador possa agir.
+# ao_ler_cabecalho(cabecalho) é chamado assim que o cabeçalho global estiver gravado
+def seguir_pacotes_pcap(caminho_arquivo, deve_parar=None, espera_minima=ESPERA_MINIMA, espera_maxima=ESPERA_MAXIMA,
+                        ao_ler_cabecalho=None):
+    espera = espera_minima
+
+    with open(caminho_arquivo, 'rb') as arquivo:
+        cabecalho = None
+        while True:
+            if cabecalho is None:
+                cabecalho_global = ler_completo(arquivo, TAMANHO_CABECALHO_GLOBAL)
+                if cabecalho_global is not None:
+                    # O formato é detectado uma única vez; o laço usa os unpackers escolhidos aqui
+                    cabecalho = decodificar_cabecalho_global(cabecalho_global)
+                    if cabecalho['formato'] == "pcapng":
+                        arquivo.seek(0)  # O bloco de seção é relido por inteiro, como os demais blocos
+                        secao = SecaoPcapng()
+                    else:
+                        desempacotar = CABECALHOS_REGISTRO[cabecalho['ordem']].unpack
+                        divisor = cabecalho['divisor']
+                    if ao_ler_cabecalho is not None:
+                        ao_ler_cabecalho(cabecalho)
+                    continue
+            elif cabecalho['formato'] == "pcapng":
+                inicio_bloco = ler_completo(arquivo, 12)
+                if inicio_bloco is not None:
+                    tipo, tamanho = secao.ler_cabecalho_bloco(inicio_bloco, 0)
+                    restante = ler_completo(arquivo, tamanho - 12)
+                    if restante is not None:
+                        espera = espera_minima
+                        pacote = secao.interpretar_bloco(inicio_bloco + restante, 0, tipo, tamanho)
+                        if pacote is not None:
+                            yield pacote
+                        continue
+                    arquivo.seek(-12, 1)  # Bloco incompleto: relê o bloco inteiro depois
+            else:
+                cabecalho_pacote = ler_completo(arquivo, 16)
+                if cabecalho_pacote is not None:
+                    segundos, fracao, caplen, origlen = desempacotar(cabecalho_pacote)
+                    conteudo_pacote = ler_completo(arquivo, caplen)
+                    if conteudo_pacote is not None:
+                        espera = espera_minima
+                        yield {
+                            'timestamp': segundos + fracao / divisor,
+                            'caplen': caplen,
+                            'origlen': origlen,
+                            'dados': conteudo_pacote
+                        }
+                        continue
+                    arquivo.seek(-16, 1)  # Payload incompleto: relê o registro inteiro depois
+
+            # Nenhum dado novo: espera com backoff exponencial
+            if deve_parar is not None and deve_parar():
+                return
+            time.sleep(espera)
+            espera = min(espera * 2, espera_maxima)
+            yield None
+
+# Função que acompanha a captura e chama ao_atualizar(resultados) a cada 'intervalo' segundos
+# e uma última vez ao terminar (deve_parar() verdadeiro ou Ctrl+C); com 'filtro', só os pacotes aceitos contam
+def acompanhar_analise(caminho_arquivo, ao_atualizar, intervalo=5.0, classes_acumuladores=None, deve_parar=None,
+                       filtro=None):
+    if classes_acumuladores is None:
+        classes_acumuladores = ACUMULADORES_ACOMPANHAMENTO
+
+    acumuladores = [classe() for classe in classes_acumuladores]
+    atualizacoes = [acumulador.atualizar for acumulador in acumuladores]
+    aceitar = filtro.predicado if filtro is not None else None
+    proxima_atualizacao = time.monotonic() + intervalo
+
+    # O decodificador depende do tipo de enlace, conhecido só quando o cabeçalho global é gravado
+    decodificador = {}
+    def escolher_decodificador(cabecalho):
+        decodificador['decodificar'] = criar_decodificador_pacotes(cabecalho['linktype'])
+
+    try:
+        for pacote in seguir_pacotes_pcap(caminho_arquivo, deve_parar, ao_ler_cabecalho=escolher_decodificador):
+            if pacote is not None:
+                ip = decodificador['decodificar'](pacote)
+                if aceitar is None or aceitar(pacote, ip):
+                    for atualizar in atualizacoes:
+                        atualizar(pacote, ip)
+
+            if time.monotonic() >= proxima_atualizacao:
+                ao_atualizar({acumulador.nome: acumulador.finalizar() for acumulador in acumuladores})
+                proxima_atualizacao = time.monotonic() + intervalo
+    except KeyboardInterrupt:
+        pass
+
+    resultados = {acumulador.nome: acumulador.finalizar() for acumulador in acumuladores}
+    ao_atualizar(resultados)
+    return resultados
@@ -0,0 +1,165 @@
+# Seleção de uma faixa de pacotes ("pacotes 1.000.000 a 1.010.000") ou de um intervalo de tempo de uma captura.
+# O índice esparso em disco (indice_pcap) localiza por busca binária o bloco de registros onde a faixa começa,
+# e a leitura parte do offset desse bloco em vez do início do arquivo: só os blocos da faixa são lidos. No
+# intervalo de tempo, a leitura também para no último bloco que pode ter registros até o fim do intervalo, e
+# cada registro é conferido, de modo que registros fora de ordem não se perdem.
+# A seleção alimenta o motor de análise como qualquer fonte de pacotes, ou é gravada num pcap menor.
+import math
+import mmap
+
+# Execução direta (python selecao_pcap.py): o script entra no pacote antes dos imports relativos (ver execucao_pcap)
+if not __package__:
+    from execucao_pcap import entrar_no_pacote
+    __package__ = entrar_no_pacote(__file__)
+
+from .leitura_pcap import FontePacotesPcap, TAMANHO_CABECALHO_GLOBAL, iterar_pacotes_pcap_mmap
+from .indice_pcap import DESCRICAO_SITUACAO_INDICE, obter_indice
+from .mesclagem_pcap import gravar_pcap, tipos_link_captura
+
+# Nome dos contadores da seleção no dicionário de resultados da análise
+NOME_SELECAO = "selecao"
+
+# Classe de uma fonte de pacotes com os registros de uma faixa de pacotes (numerados a partir de 1, com os
+# extremos incluídos, como a coluna "Pacote" da tabela de cabeçalhos IP) ou de um intervalo de tempo (em
+# segundos desde a época, com os extremos incluídos). Um extremo None deixa a faixa aberta daquele lado.
+# Sem índice ('usar_indice' falso), a captura é lida desde o início, como numa análise comum
+class FonteSelecao:
+    def __init__(self, caminho_arquivo, primeiro=None, ultimo=None, inicio=None, fim=None, usar_indice=True):
+        por_pacotes = primeiro is not None or ultimo is not None
+        por_tempo = inicio is not None or fim is not None
+        if por_pacotes and por_tempo:
+            raise ValueError("escolha uma faixa de pacotes ou um intervalo de tempo, não os dois")
+        if primeiro is not None and primeiro < 1:
+            raise ValueError("os pacotes são numerados a partir de 1")
+        if (primeiro is not None and ultimo is not None and primeiro > ultimo) or \
+                (inicio is not None and fim is not None and inicio > fim):
+            raise ValueError("o início da faixa não pode ser maior que o fim")
+        self.caminho_arquivo = caminho_arquivo
+        self.primeiro = primeiro or 1
+        self.ultimo = math.inf if ultimo is None else ultimo
+        self.inicio = -math.inf if inicio is None else inicio
+        self.fim = math.inf if fim is None else fim
+        self.por_tempo = por_tempo
+        self.cabecalho = FontePacotesPcap(caminho_arquivo).cabecalho
+
+        self.indice, self.situacao_indice = obter_indice(caminho_arquivo) if usar_indice else (None, None)
+        self.posicao = self.localizar()
+        self.lidos = 0
+        self.selecionados = 0
+
+    # Posição de leitura da seleção: (offset inicial, número do registro anterior, offset final), ou None se
+    # nenhum registro pode ser selecionado. Os offsets None leem desde o primeiro registro e até o fim do arquivo
+    def localizar(self):
+        if self.indice is None:
+            return None, 0, None
+        if self.por_tempo:
+            return self.indice.localizar_intervalo(self.inicio, self.fim)
+        bloco = self.indice.localizar_pacote(self.primeiro - 1)
+        if bloco is None:
+            return None
+        offset, numero = bloco
+        return offset, numero, None
+
+    def __iter__(self):
+        self.lidos = 0
+        self.selecionados = 0
+        if self.posicao is None:
+            return
+        offset, numero, offset_final = self.posicao
+        primeiro, ultimo, inicio, fim = self.primeiro, self.ultimo, self.inicio, self.fim
+        for pacote in iterar_pacotes_pcap_mmap(self.caminho_arquivo, offset, offset_final):
+            numero += 1
+            self.lidos += 1
+            if numero < primeiro:
+                continue
+            if numero > ultimo:
+                break
+            if inicio <= pacote['timestamp'] <= fim:
+                self.selecionados += 1
+                yield pacote
+
+    # Descrição da seleção, para as mensagens e os relatórios
+    def descrever(self):
+        if self.por_tempo:
+            return f"intervalo de tempo {formatar_extremo(self.inicio)} a {formatar_extremo(self.fim)} s"
+        return f"pacotes {self.primeiro} a {formatar_extremo(self.ultimo)}"
+
+    # Contadores da última leitura, no formato dos resultados da análise
+    def estatisticas(self):
+        return {
+            'selecao': self.descrever(),
+            'pacotes_captura': self.indice.pacotes if self.indice is not None else None,
+            'blocos_indice': len(self.indice.offsets) if self.indice is not None else None,
+            'lidos': self.lidos,
+            'selecionados': self.selecionados
+        }
+
+# Função para formatar um extremo da faixa (infinito = faixa aberta)
+def formatar_extremo(valor):
+    return "o fim" if valor == math.inf else "o início" if valor == -math.inf else valor
+
+# Função para gravar a seleção num arquivo pcap. Do pcap clássico, o cabeçalho global e os registros
+# selecionados são copiados byte a byte; o pcapng é convertido em pcap clássico (um único tipo de enlace).
+# Retorna a quantidade de registros gravados
+def gravar_selecao(fonte_selecao, caminho_saida):
+    cabecalho = fonte_selecao.cabecalho
+    if cabecalho['formato'] == "pcapng":
+        tipos_link = tipos_link_captura(cabecalho)
+        if len(tipos_link) > 1:
+            tipos = ", ".join(str(tipo) for tipo in sorted(tipos_link))
+            raise ValueError(f"a captura tem interfaces com tipos de enlace diferentes ({tipos}); "
+                             f"o pcap gravado exige um único tipo")
+        divisor = max((interface['divisor'] for interface in cabecalho['interfaces']), default=1_000_000)
+        divisor = 1_000_000_000 if divisor > 1_000_000 else 1_000_000
+        return gravar_pcap(fonte_selecao, caminho_saida, next(iter(tipos_link), 0), cabecalho['snaplen'], divisor)
+
+    total = 0
+    with open(fonte_selecao.caminho_arquivo, 'rb') as arquivo, open(caminho_saida, 'wb') as saida:
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            saida.write(mapa[:TAMANHO_CABECALHO_GLOBAL])
+            for pacote in fonte_selecao:
+                offset = pacote['offset']
+                saida.write(mapa[offset:offset + 16 + pacote['caplen']])
+                total += 1
+    return total
+
+# Função para montar as linhas (descrição, valor) do relatório da seleção
+def linhas_selecao(resultado):
+    return [
+        ["Seleção", resultado['selecao']],
+        ["Pacotes na captura (índice)", "-" if resultado['pacotes_captura'] is None else resultado['pacotes_captura']],
+        ["Blocos do índice esparso", "-" if resultado['blocos_indice'] is None else resultado['blocos_indice']],
+        ["Registros lidos", resultado['lidos']],
+        ["Pacotes selecionados", resultado['selecionados']]
+    ]
+
+# Execução direta: grava a seleção de uma captura num pcap menor
+# (ex.: python selecao_pcap.py captura.pcap trecho.pcap --pacotes 1000000 1010000)
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Extrai de uma captura PCAP uma faixa de pacotes ou um intervalo de tempo, "
+                    "usando o índice em disco.")
+    parser.add_argument("entrada", help="captura lida")
+    parser.add_argument("saida", help="arquivo pcap gravado")
+    faixa = parser.add_mutually_exclusive_group(required=True)
+    faixa.add_argument("--pacotes", type=int, nargs=2, metavar=("PRIMEIRO", "ULTIMO"),
+                       help="faixa de pacotes, numerados a partir de 1 (extremos incluídos)")
+    faixa.add_argument("--tempo", type=float, nargs=2, metavar=("INICIO", "FIM"),
+                       help="intervalo de timestamps, em segundos desde a época (extremos incluídos)")
+    parser.add_argument("--sem-indice", action="store_true",
+                        help="não usa nem grava o índice em disco; a captura é lida desde o início")
+    argumentos = parser.parse_args()
+
+    primeiro, ultimo = argumentos.pacotes or (None, None)
+    inicio, fim = argumentos.tempo or (None, None)
+    try:
+        fonte = FonteSelecao(argumentos.entrada, primeiro, ultimo, inicio, fim, not argumentos.sem_indice)
+        total = gravar_selecao(fonte, argumentos.saida)
+    except ValueError as erro:
+        parser.error(str(erro))
+    if fonte.situacao_indice is not None:
+        print(f"[INFO] Índice: {DESCRICAO_SITUACAO_INDICE[fonte.situacao_indice]}")
+    print(f"[OK] {total} pacotes ({fonte.descrever()}) gravados em {argumentos.saida}; "
+          f"{fonte.lidos} registros lidos")
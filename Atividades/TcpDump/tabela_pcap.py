@@ -0,0 +1,73 @@
+# Escrita de tabelas em fluxo, com larguras de coluna fixas.
+# O tabulate mede cada coluna em todas as linhas antes de imprimir a primeira, o que exige a tabela
+# inteira em memória. Aqui cada linha é formatada e escrita assim que chega: a saída começa de
+# imediato e a memória não depende do número de linhas. As bordas seguem o estilo "fancy_outline"
+# (o "fancy_grid" dos demais relatórios, sem a linha separadora entre cada par de linhas).
+import sys
+from itertools import islice
+
+# Linhas por página no terminal: a cada página o cabeçalho é repetido e a saída é descarregada
+LINHAS_POR_PAGINA = 50
+
+# Classe que escreve uma tabela linha a linha num arquivo (ou na saída padrão)
+# Valores mais largos que a coluna não são cortados: a linha apenas sai desalinhada
+class EscritorTabela:
+    def __init__(self, cabecalho, larguras, saida=None, linhas_por_pagina=LINHAS_POR_PAGINA):
+        self.cabecalho = cabecalho
+        self.larguras = larguras
+        self.saida = saida if saida is not None else sys.stdout
+        self.linhas_por_pagina = linhas_por_pagina  # 0: uma única página
+        self.linhas_na_pagina = 0
+        self.pagina_aberta = False
+        self.total = 0
+
+    def borda(self, esquerda, meio, direita, traco):
+        return esquerda + meio.join(traco * (largura + 2) for largura in self.larguras) + direita + "\n"
+
+    def formatar(self, valores, alinhar_numeros=True):
+        celulas = []
+        for valor, largura in zip(valores, self.larguras):
+            if alinhar_numeros and isinstance(valor, (int, float)):
+                celulas.append(f" {valor:>{largura}} ")
+            else:
+                celulas.append(f" {valor!s:<{largura}} ")
+        return "│" + "│".join(celulas) + "│\n"
+
+    def abrir_pagina(self):
+        self.saida.write(self.borda("╒", "╤", "╕", "═") + self.formatar(self.cabecalho, False)
+                         + self.borda("╞", "╪", "╡", "═"))
+        self.pagina_aberta = True
+        self.linhas_na_pagina = 0
+
+    def fechar_pagina(self):
+        self.saida.write(self.borda("╘", "╧", "╛", "═"))
+        self.saida.flush()
+        self.pagina_aberta = False
+
+    def escrever(self, linha):
+        if not self.pagina_aberta:
+            self.abrir_pagina()
+        self.saida.write(self.formatar(linha))
+        self.total += 1
+        self.linhas_na_pagina += 1
+        if self.linhas_na_pagina == self.linhas_por_pagina:
+            self.fechar_pagina()
+
+    # Fecha a última página (uma tabela sem linhas ainda exibe o cabeçalho)
+    def fechar(self):
+        if self.pagina_aberta or self.total == 0:
+            if not self.pagina_aberta:
+                self.abrir_pagina()
+            self.fechar_pagina()
+
+# Função para escrever as linhas de 'inicio' em diante (no máximo 'limite' delas) numa tabela em fluxo
+# As linhas são consumidas sob demanda: com um limite, o restante nem chega a ser gerado
+# Retorna a quantidade de linhas escritas
+def escrever_tabela(linhas, cabecalho, larguras, saida=None, inicio=0, limite=None,
+                    linhas_por_pagina=LINHAS_POR_PAGINA):
+    escritor = EscritorTabela(cabecalho, larguras, saida, linhas_por_pagina)
+    fim = None if limite is None else inicio + limite
+    for linha in islice(linhas, inicio, fim):
+        escritor.escrever(linha)
+    escritor.fechar()
+    return escritor.total
@@ -1,14 +1,56 @@
 # Importando bibliotecas necessárias
-import tkinter as tk
-from tkinter import filedialog
+# (o tkinter só é importado quando a janela de seleção de arquivo é de fato usada)
+import argparse
+import signal
+import sys
+import time
 from tabulate import tabulate
 from colorama import Fore, Style, init
 
+# Execução direta (python tcpdump.py): o script entra no pacote antes dos imports relativos (ver execucao_pcap)
+if not __package__:
+    from execucao_pcap import entrar_no_pacote
+    __package__ = entrar_no_pacote(__file__)
+
+from .leitura_pcap import FontePacotesPcap, descrever_formato, descrever_tipo_link
+from .lote_pcap import expandir_entradas
+from .seguir_pcap import acompanhar_analise
+from .janelas_pcap import AcumuladorJanelas, CABECALHO_TABELA_JANELAS, linhas_janelas
+from .fluxos_pcap import AcumuladorFluxos, CABECALHO_TABELA_FLUXOS, linhas_fluxos, linhas_resumo_fluxos
+from .indice_pcap import DESCRICAO_SITUACAO_INDICE
+from .tabela_pcap import escrever_tabela, LINHAS_POR_PAGINA
+from .filtro_pcap import compilar_filtro
+from .fragmentos_pcap import RemontadorFragmentos, linhas_remontagem
+from .mesclagem_pcap import FonteMesclada, NOME_MESCLAGEM, TAMANHO_BUFFER_REORDENACAO, linhas_mesclagem
+from .selecao_pcap import FonteSelecao, NOME_SELECAO, gravar_selecao, linhas_selecao
+from .perfil_pcap import (
+    CABECALHO_RESUMO_PERFIL, contar_pacotes, encerrar_perfil, etapa, iniciar_perfil, medir, medir_leitura
+)
+from .api_pcap import (
+    abrir_passada_com_linhas, analisar_captura, analisar_capturas, analisar_colunar, analisar_com, analisar_completa,
+    analisar_extras, classes_acompanhamento, usa_modo_rapido
+)
+from .analise_pcap import (
+    AcumuladorHeadersIp, AcumuladorIntervaloCaptura, AcumuladorMaiorPacoteTcp,
+    AcumuladorPacotesTruncados, AcumuladorTamanhoMedioUdp, AcumuladorTrafegoPorPar,
+    AcumuladorInteracoesInterface, CABECALHO_TABELA_HEADERS_IP, gerar_linhas_headers_ip
+)
+
 # Inicializando o colorama para suportar cores no terminal e configurando o estilo de reset automático
 init(autoreset=True)
 
+# Num pipe fechado antes do fim (ex.: "| head") o programa encerra em silêncio, como os utilitários de linha de comando
+if hasattr(signal, "SIGPIPE"):
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+# Larguras fixas das colunas da tabela de cabeçalhos IP (um IPv4 tem no máximo 15 caracteres)
+LARGURAS_HEADERS_IP = (10, 6, 3, 10, 5, 5, 6, 3, 9, 15, 15)
+
 # abrindo uma janela para o usuário selecionar um arquivo .cap
 def abrir_janela_selecao_arquivo():
+    import tkinter as tk
+    from tkinter import filedialog
+
     janela = tk.Tk()
     janela.withdraw()
     caminho_arquivo = filedialog.askopenfilename(
@@ -17,126 +59,59 @@ def abrir_janela_selecao_arquivo():
     )
     return caminho_arquivo
 
-# Função para ler um inteiro de 4 bytes em ordem little endian
-def ler_inteiro_32bits_little_endian(blocos_bytes):
-    return int.from_bytes(blocos_bytes, byteorder='little')
-
-# Função para ler o cabeçalho de um arquivo PCAP e retornar uma lista de pacotes
-def carregar_pacotes_pcap(caminho_arquivo):
-    lista_pacotes = []
-
-    with open(caminho_arquivo, 'rb') as arquivo:
-        cabecalho_global = arquivo.read(24)
-        if len(cabecalho_global) < 24:
-            raise Exception("Cabeçalho global incompleto.")
-
-        numero_magico = ler_inteiro_32bits_little_endian(cabecalho_global[0:4])
-        versao_maior = int.from_bytes(cabecalho_global[4:6], 'little')
-        versao_menor = int.from_bytes(cabecalho_global[6:8], 'little')
-        snaplen = ler_inteiro_32bits_little_endian(cabecalho_global[16:20])
-        tipo_link = ler_inteiro_32bits_little_endian(cabecalho_global[20:24])
-
-        print(Fore.GREEN + "[INFO] Cabeçalho Global Lido:")
-        dados_cabecalho = [
-            ["Magic Number", hex(numero_magico)],
-            ["Versão", f"{versao_maior}.{versao_menor}"],
-            ["SnapLen", snaplen],
-            ["LinkType", tipo_link]
-        ]
-        print(tabulate(dados_cabecalho, headers=["Campo", "Valor"], tablefmt="fancy_grid"))
-
-        while True:
-            cabecalho_pacote = arquivo.read(16)
-            if len(cabecalho_pacote) < 16:
-                break  # Fim do arquivo
-
-            timestamp_segundos = ler_inteiro_32bits_little_endian(cabecalho_pacote[0:4])
-            timestamp_micros = ler_inteiro_32bits_little_endian(cabecalho_pacote[4:8])
-            comprimento_capturado = ler_inteiro_32bits_little_endian(cabecalho_pacote[8:12])
-            comprimento_original = ler_inteiro_32bits_little_endian(cabecalho_pacote[12:16])
-
-            conteudo_pacote = arquivo.read(comprimento_capturado)
-            if len(conteudo_pacote) < comprimento_capturado:
-                break  # Arquivo truncado
-
-            pacote = {
-                'timestamp': timestamp_segundos + timestamp_micros / 1_000_000,
-                'caplen': comprimento_capturado,
-                'origlen': comprimento_original,
-                'dados': conteudo_pacote
-            }
-            lista_pacotes.append(pacote)
-
-    print(Fore.BLUE + f"\n[INFO] {len(lista_pacotes)} pacotes foram carregados com sucesso.")
-    return lista_pacotes
-
-# Função para exibir os cabeçalhos IP dos pacotes
-def exibir_headers_ip(lista_pacotes):
+# Função para exibir as informações do cabeçalho global
+def exibir_cabecalho_global(cabecalho):
+    print(Fore.GREEN + "[INFO] Cabeçalho Global Lido:")
+    dados_cabecalho = [
+        ["Formato", descrever_formato(cabecalho)],
+        ["Magic Number", hex(cabecalho['magic'])],
+        ["Versão", f"{cabecalho['versao_maior']}.{cabecalho['versao_menor']}"],
+        ["SnapLen", cabecalho['snaplen']],
+        ["LinkType", descrever_tipo_link(cabecalho)]
+    ]
+    print(tabulate(dados_cabecalho, headers=["Campo", "Valor"], tablefmt="fancy_grid"))
+
+# Função para ler o cabeçalho de um arquivo PCAP e retornar a fonte de pacotes (lidos sob demanda)
+# Com --perfil, a fonte conta os pacotes lidos e o laço de leitura dos registros é medido à parte
+def carregar_pacotes_pcap(caminho_arquivo, usar_mmap=False):
+    with etapa("cabecalho_global"):
+        fonte = FontePacotesPcap(caminho_arquivo, usar_mmap)
+    exibir_cabecalho_global(fonte.cabecalho)
+    modo = "mmap" if usar_mmap else "fluxo"
+    print(Fore.BLUE + f"\n[INFO] Arquivo {caminho_arquivo} pronto para leitura ({modo}).")
+    fonte = contar_pacotes(fonte)
+    medir_leitura(fonte)
+    return fonte
+
+# Função para escrever a tabela de cabeçalhos IP em fluxo, com larguras fixas, a partir de um iterável de linhas
+# Sem 'caminho_saida' a tabela vai para a saída padrão (paginada no terminal, contínua num pipe)
+def imprimir_linhas_headers_ip(linhas, caminho_saida=None, inicio=0, limite=None, linhas_por_pagina=None):
     print(Fore.YELLOW + "\n[INFO] Analisando cabeçalhos IP dos pacotes...")
-
-    tabelas = []
-    contador = 0
-
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue  # pacote muito pequeno para conter cabeçalho IP
-
-        # Ignorar cabeçalho Ethernet (primeiros 14 bytes)
-        cabecalho_ip = dados[14:34]
-
-        # Extrair versão e IHL
-        byte_0 = cabecalho_ip[0]
-        versao_ip = byte_0 >> 4
-        tamanho_cabecalho = (byte_0 & 0x0F) * 4
-
-        # Tamanho total do datagrama
-        tamanho_total = int.from_bytes(cabecalho_ip[2:4], byteorder='big')
-
-        identificacao = int.from_bytes(cabecalho_ip[4:6], byteorder='big')
-
-        flags_fragmento = int.from_bytes(cabecalho_ip[6:8], byteorder='big')
-        flags = flags_fragmento >> 13
-        fragment_offset = flags_fragmento & 0x1FFF
-
-        ttl = cabecalho_ip[8]
-        protocolo = cabecalho_ip[9]
-
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
-
-        contador += 1
-        tabelas.append([
-            contador,
-            versao_ip,
-            tamanho_cabecalho,
-            tamanho_total,
-            identificacao,
-            flags,
-            fragment_offset,
-            ttl,
-            protocolo,
-            ip_origem,
-            ip_destino
-        ])
-
-    print(tabulate(tabelas, headers=[
-        "Pacote", "Versão", "IHL", "Tam. Total", "ID",
-        "Flags", "Offset", "TTL", "Protocolo", "Origem", "Destino"
-    ], tablefmt="fancy_grid"))
-
-# Função para exibir o intervalo de captura de pacotes
-def exibir_intervalo_captura(lista_pacotes):
-    if not lista_pacotes:
+    saida = sys.stdout if caminho_saida is None else open(caminho_saida, "w", encoding="utf-8")
+    try:
+        if linhas_por_pagina is None:
+            linhas_por_pagina = LINHAS_POR_PAGINA if saida.isatty() else 0
+        total = escrever_tabela(linhas, CABECALHO_TABELA_HEADERS_IP, LARGURAS_HEADERS_IP, saida,
+                                inicio, limite, linhas_por_pagina)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    if caminho_saida is not None:
+        print(Fore.GREEN + f"[OK] {total} linhas de cabeçalhos IP gravadas em {caminho_saida}")
+
+# Função para imprimir a tabela de cabeçalhos IP já acumulada (colunas compactas)
+def imprimir_headers_ip(resultado, inicio=0, limite=None, **opcoes):
+    fim = None if limite is None else inicio + limite
+    imprimir_linhas_headers_ip(resultado['linhas'].iterar(inicio, fim), **opcoes)
+
+# Função para imprimir o intervalo de captura de pacotes
+def imprimir_intervalo_captura(resultado):
+    if resultado['inicio'] is None:
         print(Fore.RED + "[ERRO] Nenhum pacote disponível para análise de tempo.")
         return
 
-    lista_timestamps = []
-    for pacote in lista_pacotes:
-        lista_timestamps.append(pacote['timestamp'])
-
-    tempo_inicio = min(lista_timestamps)
-    tempo_fim = max(lista_timestamps)
+    tempo_inicio = resultado['inicio']
+    tempo_fim = resultado['fim']
     duracao = tempo_fim - tempo_inicio
 
     print(Fore.MAGENTA + "\n[INFO] Intervalo de captura de pacotes:")
@@ -146,181 +121,422 @@ def exibir_intervalo_captura(lista_pacotes):
         ["Duração total (segundos)", f"{duracao:.6f}"]
     ], headers=["Descrição", "Valor"], tablefmt="fancy_grid"))
 
-# Função para exibir o maior pacote TCP capturado
-def exibir_maior_pacote_tcp(lista_pacotes):
-    maior_tamanho_tcp = 0
-    ip_origem_maior = ""
-    ip_destino_maior = ""
-
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
-
-        # Ignora cabeçalho Ethernet
-        cabecalho_ip = dados[14:34]
-
-        # O byte 9 do cabeçalho IP contém o número do protocolo da camada de transporte
-        # Segundo a IANA (Internet Assigned Numbers Authority):
-        # - TCP = 6
-        # - UDP = 17
-        # - ICMP = 1
-        # Veja a tabela completa: https://www.iana.org/assignments/protocol-numbers/protocol-numbers.xhtml
-        protocolo = cabecalho_ip[9]
-        if protocolo != 6:
-            continue  # não é TCP
-
-        tamanho_original = pacote['origlen']
-
-        if tamanho_original > maior_tamanho_tcp:
-            maior_tamanho_tcp = tamanho_original
-            ip_origem_maior = ".".join(str(b) for b in cabecalho_ip[12:16])
-            ip_destino_maior = ".".join(str(b) for b in cabecalho_ip[16:20])
-
+# Função para imprimir o maior pacote TCP capturado
+def imprimir_maior_pacote_tcp(resultado):
     print(Fore.CYAN + "\n[INFO] Maior pacote TCP capturado:")
     print(tabulate([
-        ["Tamanho (bytes)", maior_tamanho_tcp],
-        ["IP de Origem", ip_origem_maior],
-        ["IP de Destino", ip_destino_maior]
+        ["Tamanho (bytes)", resultado['tamanho']],
+        ["IP de Origem", resultado['ip_origem']],
+        ["IP de Destino", resultado['ip_destino']]
     ], headers=["Campo", "Valor"], tablefmt="fancy_grid"))
 
-# Função para exibir pacotes truncados (caplen < origlen)
-def exibir_pacotes_truncados(lista_pacotes):
-    truncados = 0
-    for pacote in lista_pacotes:
-        if pacote['caplen'] < pacote['origlen']:
-            truncados += 1
-
+# Função para imprimir a contagem de pacotes truncados (caplen < origlen)
+def imprimir_pacotes_truncados(resultado):
     print(Fore.LIGHTRED_EX + "\n[INFO] Verificação de pacotes truncados:")
     print(tabulate([
-        ["Total de pacotes analisados", len(lista_pacotes)],
-        ["Pacotes truncados (caplen < origlen)", truncados]
+        ["Total de pacotes analisados", resultado['total']],
+        ["Pacotes truncados (caplen < origlen)", resultado['truncados']]
     ], headers=["Descrição", "Valor"], tablefmt="fancy_grid"))
 
-# Função para exibir o tamanho médio dos pacotes UDP capturados
-def exibir_tamanho_medio_udp(lista_pacotes):
-    soma_tamanhos_udp = 0
-    quantidade_udp = 0
-
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue  
-
-        # Ignorar cabeçalho Ethernet (14 bytes)
-        cabecalho_ip = dados[14:34]
-        protocolo = cabecalho_ip[9]
-
-        # Protocolo UDP é identificado pelo número 17 no campo "Protocol" do cabeçalho IP
-        if protocolo == 17:
-            soma_tamanhos_udp += pacote['origlen']
-            quantidade_udp += 1
-
-    if quantidade_udp == 0:
+# Função para imprimir o tamanho médio dos pacotes UDP capturados
+def imprimir_tamanho_medio_udp(resultado):
+    if resultado['quantidade'] == 0:
         print(Fore.YELLOW + "\n[INFO] Nenhum pacote UDP foi encontrado.")
         return
 
-    media = soma_tamanhos_udp / quantidade_udp
-
     print(Fore.YELLOW + "\n[INFO] Tamanho médio dos pacotes UDP capturados:")
     print(tabulate([
-        ["Total de pacotes UDP", quantidade_udp],
-        ["Tamanho médio (bytes)", f"{media:.2f}"]
+        ["Total de pacotes UDP", resultado['quantidade']],
+        ["Tamanho médio (bytes)", f"{resultado['media']:.2f}"]
     ], headers=["Descrição", "Valor"], tablefmt="fancy_grid"))
 
-# Função para exibir o par de IPs com maior tráfego
-def exibir_maior_trafego_por_par(lista_pacotes):
-    trafego_por_par = {}
-
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue 
-
-        cabecalho_ip = dados[14:34]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
-
-        par = (ip_origem, ip_destino)
-
-        if par not in trafego_por_par:
-            trafego_por_par[par] = 0
-
-        trafego_por_par[par] += pacote['origlen']  # Acumula o tamanho original
-
-    if not trafego_por_par:
+# Função para montar as linhas extras de um resultado do modo aproximado (limites de erro)
+def linhas_aproximacao(resultado):
+    if not resultado.get('aproximado'):
+        return []
+    if 'erro_maximo' in resultado:
+        return [["Modo aproximado: erro máximo (bytes)", resultado['erro_maximo']]]
+    return [["Modo aproximado: erro padrão relativo", f"{resultado['erro_relativo']:.2%}"]]
+
+# Função para imprimir o par de IPs com maior tráfego
+def imprimir_maior_trafego_por_par(resultado):
+    if resultado['par'] is None:
         print(Fore.YELLOW + "\n[INFO] Nenhum par de IPs encontrado.")
         return
 
-    par_mais_trafego = max(trafego_por_par, key=trafego_por_par.get)
-    total_bytes = trafego_por_par[par_mais_trafego]
-
     print(Fore.LIGHTGREEN_EX + "\n[INFO] Par de IPs com maior tráfego:")
     print(tabulate([
-        ["IP de Origem", par_mais_trafego[0]],
-        ["IP de Destino", par_mais_trafego[1]],
-        ["Total de Dados (bytes)", total_bytes]
-    ], headers=["Campo", "Valor"], tablefmt="fancy_grid"))
-
-# Função para exibir interações da interface local com outros IPs (considerando o IP mais frequente como origem)
-def exibir_interacoes_da_interface(lista_pacotes):
-    contagem_origem = {}
-    interacoes = set()
-
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
+        ["IP de Origem", resultado['par'][0]],
+        ["IP de Destino", resultado['par'][1]],
+        ["Total de Dados (bytes)", resultado['bytes']]
+    ] + linhas_aproximacao(resultado), headers=["Campo", "Valor"], tablefmt="fancy_grid"))
+
+# Função para imprimir as interações da interface local com outros IPs
+def imprimir_interacoes_da_interface(resultado):
+    if resultado['ip_interface'] is None:
+        print(Fore.RED + "[ERRO] Nenhum IP encontrado para análise.")
+        return
 
-        cabecalho_ip = dados[14:34]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
+    print(Fore.LIGHTBLUE_EX + "\n[INFO] Interações do IP da interface local:")
+    print(tabulate([
+        ["IP da Interface", resultado['ip_interface']],
+        ["Total de IPs diferentes que interagiram com ele", resultado['total_interacoes']]
+    ] + linhas_aproximacao(resultado), headers=["Campo", "Valor"], tablefmt="fancy_grid"))
+
+# Função para imprimir as estatísticas por janela de tempo (pacotes/s, bytes/s, top talkers, média UDP)
+def imprimir_janelas(resultado):
+    print(Fore.LIGHTMAGENTA_EX + "\n[INFO] Estatísticas por janela de tempo:")
+    print(tabulate(linhas_janelas(resultado), headers=CABECALHO_TABELA_JANELAS, tablefmt="fancy_grid"))
+
+# Função para imprimir o resumo e os rankings dos fluxos TCP/UDP (5-tupla)
+def imprimir_fluxos(resultado):
+    print(Fore.LIGHTCYAN_EX + "\n[INFO] Fluxos TCP/UDP:")
+    print(tabulate(linhas_resumo_fluxos(resultado), headers=["Campo", "Valor"], tablefmt="fancy_grid"))
+    print(tabulate(linhas_fluxos(resultado), headers=CABECALHO_TABELA_FLUXOS, tablefmt="fancy_grid"))
+
+# Função para imprimir os contadores da remontagem de fragmentos IPv4
+def imprimir_remontagem(resultado):
+    print(Fore.LIGHTBLUE_EX + "\n[INFO] Remontagem de fragmentos IPv4:")
+    print(tabulate(linhas_remontagem(resultado), headers=["Descrição", "Valor"], tablefmt="fancy_grid"))
+
+# Função para imprimir os contadores da mesclagem de capturas
+def imprimir_mesclagem(resultado):
+    print(Fore.LIGHTGREEN_EX + "\n[INFO] Mesclagem das capturas por timestamp:")
+    print(tabulate(linhas_mesclagem(resultado), headers=["Descrição", "Valor"], tablefmt="fancy_grid"))
+
+# Função para imprimir os contadores da seleção por faixa de pacotes ou intervalo de tempo
+def imprimir_selecao(resultado):
+    print(Fore.LIGHTGREEN_EX + "\n[INFO] Seleção pelo índice esparso:")
+    print(tabulate(linhas_selecao(resultado), headers=["Descrição", "Valor"], tablefmt="fancy_grid",
+                   disable_numparse=True))
 
-        # Contagem para identificar o IP mais frequente como origem (provavelmente da interface local)
-        if ip_origem not in contagem_origem:
-            contagem_origem[ip_origem] = 0
-        contagem_origem[ip_origem] += 1
+# Função para exibir os cabeçalhos IP dos pacotes
+# As linhas são escritas à medida que os pacotes são decodificados, sem acumular a tabela
+@medir
+def exibir_headers_ip(lista_pacotes, filtro=None, **opcoes):
+    imprimir_linhas_headers_ip(gerar_linhas_headers_ip(lista_pacotes, filtro=filtro), **opcoes)
 
-    if not contagem_origem:
-        print(Fore.RED + "[ERRO] Nenhum IP encontrado para análise.")
-        return
+# Função para exibir o intervalo de captura de pacotes
+@medir
+def exibir_intervalo_captura(lista_pacotes, filtro=None):
+    imprimir_intervalo_captura(analisar_com(lista_pacotes, AcumuladorIntervaloCaptura, filtro))
 
-    # IP da interface local (o que mais apareceu como origem)
-    ip_interface = max(contagem_origem, key=contagem_origem.get)
+# Função para exibir o maior pacote TCP capturado
+@medir
+def exibir_maior_pacote_tcp(lista_pacotes, filtro=None):
+    imprimir_maior_pacote_tcp(analisar_com(lista_pacotes, AcumuladorMaiorPacoteTcp, filtro))
 
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
+# Função para exibir pacotes truncados (caplen < origlen)
+@medir
+def exibir_pacotes_truncados(lista_pacotes, filtro=None):
+    imprimir_pacotes_truncados(analisar_com(lista_pacotes, AcumuladorPacotesTruncados, filtro))
 
-        cabecalho_ip = dados[14:34]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
+# Função para exibir o tamanho médio dos pacotes UDP capturados
+@medir
+def exibir_tamanho_medio_udp(lista_pacotes, filtro=None):
+    imprimir_tamanho_medio_udp(analisar_com(lista_pacotes, AcumuladorTamanhoMedioUdp, filtro))
 
-        if ip_origem == ip_interface:
-            interacoes.add(ip_destino)
-        elif ip_destino == ip_interface:
-            interacoes.add(ip_origem)
+# Função para exibir o par de IPs com maior tráfego
+@medir
+def exibir_maior_trafego_por_par(lista_pacotes, filtro=None):
+    imprimir_maior_trafego_por_par(analisar_com(lista_pacotes, AcumuladorTrafegoPorPar, filtro))
 
-    print(Fore.LIGHTBLUE_EX + "\n[INFO] Interações do IP da interface local:")
-    print(tabulate([
-        ["IP da Interface", ip_interface],
-        ["Total de IPs diferentes que interagiram com ele", len(interacoes)]
-    ], headers=["Campo", "Valor"], tablefmt="fancy_grid"))
+# Função para exibir interações da interface local com outros IPs (considerando o IP mais frequente como origem)
+@medir
+def exibir_interacoes_da_interface(lista_pacotes, filtro=None):
+    imprimir_interacoes_da_interface(analisar_com(lista_pacotes, AcumuladorInteracoesInterface, filtro))
+
+# Relatórios exibidos pela análise completa: nome do acumulador -> função de impressão
+IMPRESSORES = {
+    AcumuladorHeadersIp.nome: imprimir_headers_ip,
+    AcumuladorIntervaloCaptura.nome: imprimir_intervalo_captura,
+    AcumuladorMaiorPacoteTcp.nome: imprimir_maior_pacote_tcp,
+    AcumuladorPacotesTruncados.nome: imprimir_pacotes_truncados,
+    AcumuladorTamanhoMedioUdp.nome: imprimir_tamanho_medio_udp,
+    AcumuladorTrafegoPorPar.nome: imprimir_maior_trafego_por_par,
+    AcumuladorInteracoesInterface.nome: imprimir_interacoes_da_interface,
+    AcumuladorJanelas.nome: imprimir_janelas,
+    AcumuladorFluxos.nome: imprimir_fluxos,
+    RemontadorFragmentos.nome: imprimir_remontagem,
+    NOME_MESCLAGEM: imprimir_mesclagem,
+    NOME_SELECAO: imprimir_selecao
+}
+
+# Função para imprimir todos os resultados de uma análise completa
+def imprimir_resultados(resultados):
+    for nome, resultado in resultados.items():
+        IMPRESSORES[nome](resultado)
+
+# Função para executar todos os relatórios numa única passada pelo arquivo e exibi-los
+def exibir_analise_completa(lista_pacotes, incluir_headers_ip=True, filtro=None, remontar=False):
+    imprimir_resultados(analisar_completa(lista_pacotes, incluir_headers_ip, filtro, remontar))
+
+# Função para executar todos os relatórios de forma vetorizada (NumPy) e exibi-los
+def exibir_analise_colunar(caminho_arquivo, incluir_headers_ip=True, filtro=None):
+    imprimir_resultados(analisar_colunar(caminho_arquivo, incluir_headers_ip, filtro))
+
+# Função para analisar um único arquivo, com os relatórios opcionais de 'classes_extras'
+# ('opcoes_tabela': caminho_saida, inicio, limite, linhas_por_pagina). Quando a captura tem um modo mais rápido
+# que o motor de uma passada (índice em disco, em paralelo ou colunar; ver api_pcap.usa_modo_rapido), a tabela
+# de cabeçalhos IP sai das colunas devolvidas por ele e a captura só é relida pelos relatórios opcionais; nos
+# demais casos, uma única passada escreve a tabela em fluxo, à medida que os pacotes são decodificados, e
+# calcula os resumos e os relatórios opcionais na mesma leitura (ver api_pcap.abrir_passada_com_linhas)
+@medir
+def analisar_arquivo_unico(caminho_arquivo, usar_indice=True, aproximado=False, opcoes_tabela=None, filtro=None,
+                           remontar=False, classes_extras=()):
+    pacotes_lidos = carregar_pacotes_pcap(caminho_arquivo, usar_mmap=True)
+    if filtro is not None:
+        print(Fore.BLUE + f"[INFO] Filtro: {filtro.expressao}")
+    if usa_modo_rapido(caminho_arquivo, pacotes_lidos.cabecalho, usar_indice, aproximado, filtro, remontar):
+        resultados, situacao = analisar_captura(caminho_arquivo, usar_indice, aproximado, filtro, remontar,
+                                                lista_pacotes=pacotes_lidos)
+        imprimir_headers_ip(resultados.pop(AcumuladorHeadersIp.nome), **(opcoes_tabela or {}))
+        if situacao is not None:
+            print(Fore.BLUE + f"[INFO] Análise: {DESCRICAO_SITUACAO_INDICE[situacao]}")
+        if classes_extras:
+            resultados.update(analisar_extras(pacotes_lidos, classes_extras, filtro, remontar))
+    else:
+        passada = abrir_passada_com_linhas(pacotes_lidos, aproximado, filtro, remontar, classes_extras)
+        imprimir_linhas_headers_ip(passada.linhas(), **(opcoes_tabela or {}))
+        resultados = passada.resultados()
+    imprimir_resultados(resultados)
+
+# Função para analisar vários arquivos em paralelo e exibir cada relatório e o consolidado
+# (de cada arquivo, a tabela de cabeçalhos IP respeita 'inicio' e 'limite'; ver analisar_arquivo_unico)
+@medir
+def exibir_analise_lote(caminhos, processos=None, aproximado=False, opcoes_tabela=None, filtro=None, remontar=False,
+                        classes_extras=()):
+    resultados_por_arquivo, consolidado = analisar_capturas(caminhos, processos, aproximado, filtro, remontar,
+                                                            classes_extras)
+    for caminho, resultados in resultados_por_arquivo.items():
+        print(Fore.GREEN + f"\n[INFO] ===== Arquivo: {caminho} =====")
+        imprimir_headers_ip(resultados.pop(AcumuladorHeadersIp.nome), **(opcoes_tabela or {}))
+        imprimir_resultados(resultados)
+    print(Fore.GREEN + f"\n[INFO] ===== Consolidado de {len(caminhos)} arquivos =====")
+    imprimir_resultados(consolidado)
+
+# Função para analisar várias capturas mescladas numa única linha do tempo (--mesclar) e exibir os relatórios,
+# com os opcionais de 'classes_extras'. As capturas são lidas uma única vez: a tabela de cabeçalhos IP sai em
+# fluxo, já na ordem mesclada, e os resumos e os contadores da mesclagem vêm da mesma passada
+@medir
+def exibir_analise_mesclada(caminhos, tamanho_buffer=TAMANHO_BUFFER_REORDENACAO, aproximado=False, opcoes_tabela=None,
+                            filtro=None, remontar=False, classes_extras=()):
+    fonte_mesclada = FonteMesclada(caminhos, tamanho_buffer)
+    print(Fore.BLUE + f"[INFO] Mesclando {len(caminhos)} captura(s) por timestamp "
+                      f"(buffer de reordenação: {tamanho_buffer} registros por captura).")
+    if filtro is not None:
+        print(Fore.BLUE + f"[INFO] Filtro: {filtro.expressao}")
+    passada = abrir_passada_com_linhas(contar_pacotes(fonte_mesclada), aproximado, filtro, remontar, classes_extras)
+    imprimir_linhas_headers_ip(passada.linhas(), **(opcoes_tabela or {}))
+    resultados = passada.resultados()
+    resultados[NOME_MESCLAGEM] = fonte_mesclada.estatisticas()
+    imprimir_resultados(resultados)
+
+# Função para abrir a seleção de uma captura (--pacotes ou --tempo), localizando-a no índice esparso
+# (sem índice válido, a captura é lida uma vez para criá-lo, como numa análise indexada)
+@medir
+def abrir_selecao(caminho_arquivo, selecao, usar_indice=True):
+    fonte = FonteSelecao(caminho_arquivo, usar_indice=usar_indice, **selecao)
+    print(Fore.BLUE + f"[INFO] Seleção: {fonte.descrever()} de {caminho_arquivo}")
+    if fonte.situacao_indice is not None:
+        print(Fore.BLUE + f"[INFO] Índice: {DESCRICAO_SITUACAO_INDICE[fonte.situacao_indice]}")
+    return fonte
+
+# Função para analisar a seleção de uma captura e exibir os relatórios, com os opcionais de 'classes_extras'
+# Os blocos selecionados são lidos uma única vez: a tabela de cabeçalhos IP sai em fluxo (o primeiro pacote
+# selecionado é a linha 1) e os resumos e os contadores da seleção vêm da mesma passada
+@medir
+def exibir_analise_selecao(fonte_selecao, aproximado=False, opcoes_tabela=None, filtro=None, remontar=False,
+                           classes_extras=()):
+    if filtro is not None:
+        print(Fore.BLUE + f"[INFO] Filtro: {filtro.expressao}")
+    passada = abrir_passada_com_linhas(contar_pacotes(fonte_selecao), aproximado, filtro, remontar, classes_extras)
+    imprimir_linhas_headers_ip(passada.linhas(), **(opcoes_tabela or {}))
+    resultados = passada.resultados()
+    resultados[NOME_SELECAO] = fonte_selecao.estatisticas()
+    imprimir_resultados(resultados)
+
+# Função para gravar a seleção de uma captura num pcap menor (--extrair)
+@medir
+def extrair_selecao(fonte_selecao, caminho_saida):
+    try:
+        total = gravar_selecao(contar_pacotes(fonte_selecao), caminho_saida)
+    except ValueError as erro:
+        print(Fore.RED + f"[ERRO] {erro}")
+        return False
+    print(Fore.GREEN + f"[OK] {total} pacotes gravados em {caminho_saida} ({fonte_selecao.lidos} registros lidos)")
+    return True
+
+# Função para acompanhar uma captura em crescimento, reimprimindo os relatórios a cada 'intervalo' segundos
+def exibir_acompanhamento(caminho_arquivo, intervalo, com_janelas=False, aproximado=False, com_fluxos=False,
+                          filtro=None):
+    def ao_atualizar(resultados):
+        print(Fore.GREEN + f"\n[INFO] ===== Atualização: {time.strftime('%H:%M:%S')} =====")
+        imprimir_resultados(resultados)
+
+    print(Fore.BLUE + f"[INFO] Acompanhando {caminho_arquivo} (Ctrl+C para encerrar)...")
+    classes = classes_acompanhamento(com_janelas, aproximado, com_fluxos)
+    acompanhar_analise(caminho_arquivo, ao_atualizar, intervalo, classes, filtro=filtro)
+
+# Função para exibir o resumo do perfil da execução (--perfil)
+def exibir_perfil(perfil, caminho_json):
+    print(Fore.MAGENTA + f"\n[PERFIL] Tempo total: {perfil.total_segundos:.3f} s")
+    print(tabulate(perfil.linhas_resumo(), headers=CABECALHO_RESUMO_PERFIL, tablefmt="fancy_grid",
+                   disable_numparse=True))
+    print(Fore.MAGENTA + f"[PERFIL] Relatório gravado em {caminho_json}")
+    if perfil.caminho_pstats:
+        print(Fore.MAGENTA + f"[PERFIL] Estatísticas do cProfile gravadas em {perfil.caminho_pstats} "
+                             f"(python -m pstats {perfil.caminho_pstats})")
+
+# Função para validar --pacotes, --tempo e --extrair; retorna os argumentos de FonteSelecao (ou None)
+def validar_selecao(parser, argumentos):
+    if argumentos.pacotes is None and argumentos.tempo is None:
+        if argumentos.extrair:
+            parser.error("--extrair exige --pacotes ou --tempo")
+        return None
+    if argumentos.pacotes is not None and argumentos.tempo is not None:
+        parser.error("escolha --pacotes ou --tempo, não os dois")
+    if argumentos.seguir or argumentos.mesclar:
+        parser.error("--pacotes e --tempo não estão disponíveis nos modos --seguir e --mesclar")
+    if argumentos.pacotes is not None:
+        primeiro, ultimo = argumentos.pacotes
+        if primeiro < 1 or primeiro > ultimo:
+            parser.error("--pacotes exige 1 <= PRIMEIRO <= ULTIMO")
+        return {'primeiro': primeiro, 'ultimo': ultimo}
+    inicio, fim = argumentos.tempo
+    if inicio > fim:
+        parser.error("--tempo exige INICIO <= FIM")
+    return {'inicio': inicio, 'fim': fim}
+
+# Função para ler os argumentos da linha de comando
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Analisador de arquivos PCAP.")
+    parser.add_argument("entradas", nargs="*",
+                        help="arquivos, padrões glob ou diretórios com capturas (sem entradas, abre a janela de seleção)")
+    parser.add_argument("--gui", action="store_true", help="abre a janela de seleção de arquivo")
+    parser.add_argument("--sem-indice", action="store_true",
+                        help="não usa nem grava o índice em disco (<captura>.idx) ao lado da captura")
+    parser.add_argument("--seguir", action="store_true",
+                        help="acompanha a captura enquanto ela é gravada, atualizando os relatórios")
+    parser.add_argument("--intervalo", type=float, default=5.0,
+                        help="segundos entre as atualizações no modo --seguir (padrão: 5)")
+    parser.add_argument("--janelas", action="store_true",
+                        help="inclui estatísticas por janela de tempo de 1s, 10s e 60s")
+    parser.add_argument("--fluxos", action="store_true",
+                        help="inclui a tabela de fluxos TCP/UDP (5-tupla) com rankings por bytes e duração")
+    parser.add_argument("--aproximado", action="store_true",
+                        help="usa Space-Saving e HyperLogLog (memória fixa) para pares de IPs e interações")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="número de processos usados no modo em lote (padrão: número de CPUs)")
+    parser.add_argument("--mesclar", action="store_true",
+                        help="analisa as capturas mescladas numa única linha do tempo, ordenada por timestamp, "
+                             "em vez de uma a uma")
+    parser.add_argument("--reordenar", type=int, default=None, metavar="REGISTROS",
+                        help=f"registros por captura no buffer que corrige registros levemente fora de ordem; "
+                             f"implica --mesclar (padrão: {TAMANHO_BUFFER_REORDENACAO})")
+    parser.add_argument("--pacotes", type=int, nargs=2, default=None, metavar=("PRIMEIRO", "ULTIMO"),
+                        help="analisa só os pacotes dessa faixa (numerados a partir de 1, extremos incluídos), "
+                             "localizados pelo índice em disco")
+    parser.add_argument("--tempo", type=float, nargs=2, default=None, metavar=("INICIO", "FIM"),
+                        help="analisa só os pacotes com timestamp nesse intervalo (segundos desde a época, "
+                             "extremos incluídos), localizados pelo índice em disco")
+    parser.add_argument("--extrair", default=None, metavar="ARQUIVO",
+                        help="com --pacotes ou --tempo, grava a seleção num pcap em vez de analisá-la")
+    parser.add_argument("--filtro", default=None, metavar="EXPRESSÃO",
+                        help="só analisa os pacotes aceitos pela expressão, no estilo do tcpdump "
+                             "(ex.: \"tcp and host 10.0.0.5 and len > 1000\")")
+    parser.add_argument("--remontar", action="store_true",
+                        help="remonta os datagramas IPv4 fragmentados antes dos relatórios por datagrama "
+                             "(UDP, pares de IPs, interações, maior TCP, fluxos)")
+    parser.add_argument("--offset", type=int, default=0,
+                        help="linhas da tabela de cabeçalhos IP puladas antes da primeira exibida (padrão: 0)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="máximo de linhas exibidas na tabela de cabeçalhos IP (padrão: todas)")
+    parser.add_argument("--linhas-por-pagina", type=int, default=None,
+                        help=f"linhas por página da tabela de cabeçalhos IP; 0 desliga a paginação "
+                             f"(padrão: {LINHAS_POR_PAGINA} no terminal, 0 num arquivo ou pipe)")
+    parser.add_argument("--saida-headers", default=None, metavar="ARQUIVO",
+                        help="grava a tabela de cabeçalhos IP num arquivo em vez de exibi-la "
+                             "(um único arquivo ou --mesclar)")
+    parser.add_argument("--perfil", "--profile", nargs="?", const="perfil_pcap.json", default=None, metavar="ARQUIVO",
+                        help="mede o tempo, as alocações e a vazão de cada etapa e grava o relatório em JSON "
+                             "(padrão: perfil_pcap.json)")
+    parser.add_argument("--perfil-pstats", "--profile-pstats", default=None, metavar="ARQUIVO",
+                        help="com --perfil, grava também as estatísticas do cProfile (para o módulo pstats)")
+    parser.add_argument("--perfil-sem-alocacoes", action="store_true",
+                        help="com --perfil, não mede as alocações (o tracemalloc deixa a execução mais lenta)")
+    argumentos = parser.parse_args()
+    if argumentos.perfil is None and argumentos.perfil_pstats:
+        argumentos.perfil = "perfil_pcap.json"
+    if argumentos.remontar and argumentos.seguir:
+        parser.error("a remontagem de fragmentos não está disponível no modo --seguir")
+    if argumentos.reordenar is not None:
+        if argumentos.reordenar < 0:
+            parser.error("o buffer de reordenação não pode ser negativo")
+        argumentos.mesclar = True
+    elif argumentos.mesclar:
+        argumentos.reordenar = TAMANHO_BUFFER_REORDENACAO
+    if argumentos.mesclar and argumentos.seguir:
+        parser.error("a mesclagem de capturas não está disponível no modo --seguir")
+    argumentos.selecao = validar_selecao(parser, argumentos)
+    if argumentos.filtro is not None:
+        try:
+            argumentos.filtro = compilar_filtro(argumentos.filtro)
+        except ValueError as erro:
+            parser.error(str(erro))
+    return argumentos
 
 # Função principal para executar o código
 if __name__ == "__main__":
-    caminho_selecionado = abrir_janela_selecao_arquivo()
-    
-    if caminho_selecionado:
-        pacotes_lidos = carregar_pacotes_pcap(caminho_selecionado)
-        exibir_headers_ip(pacotes_lidos)
-        exibir_intervalo_captura(pacotes_lidos)
-        exibir_maior_pacote_tcp(pacotes_lidos)
-        exibir_pacotes_truncados(pacotes_lidos)
-        exibir_tamanho_medio_udp(pacotes_lidos)
-        exibir_maior_trafego_por_par(pacotes_lidos)
-        exibir_interacoes_da_interface(pacotes_lidos)
-        print(Fore.GREEN + "\n[INFO] Análise concluída com sucesso.")
+    argumentos = ler_argumentos()
+
+    if argumentos.gui or not argumentos.entradas:
+        caminho_selecionado = abrir_janela_selecao_arquivo()
+        caminhos = [caminho_selecionado] if caminho_selecionado else []
     else:
-        print(Fore.RED + "[ERRO] Nenhum arquivo foi selecionado.")
+        caminhos = expandir_entradas(argumentos.entradas)
+    opcoes_tabela = {
+        'inicio': argumentos.offset,
+        'limite': argumentos.limit,
+        'linhas_por_pagina': argumentos.linhas_por_pagina
+    }
+    extras = [AcumuladorJanelas] if argumentos.janelas else []
+    extras += [AcumuladorFluxos] if argumentos.fluxos else []
+    if argumentos.perfil:
+        iniciar_perfil(not argumentos.perfil_sem_alocacoes, argumentos.perfil_pstats)
+
+    try:
+        if caminhos and argumentos.seguir:
+            exibir_acompanhamento(caminhos[0], argumentos.intervalo, argumentos.janelas, argumentos.aproximado,
+                                  argumentos.fluxos, argumentos.filtro)
+        elif caminhos and argumentos.mesclar:
+            exibir_analise_mesclada(caminhos, argumentos.reordenar, argumentos.aproximado,
+                                    dict(opcoes_tabela, caminho_saida=argumentos.saida_headers), argumentos.filtro,
+                                    argumentos.remontar, extras)
+            print(Fore.GREEN + "\n[INFO] Análise concluída com sucesso.")
+        elif caminhos and argumentos.selecao is not None:
+            if len(caminhos) > 1:
+                print(Fore.RED + "[ERRO] --pacotes e --tempo aceitam uma única captura.")
+            else:
+                fonte = abrir_selecao(caminhos[0], argumentos.selecao, not argumentos.sem_indice)
+                if argumentos.extrair:
+                    extrair_selecao(fonte, argumentos.extrair)
+                else:
+                    exibir_analise_selecao(fonte, argumentos.aproximado,
+                                           dict(opcoes_tabela, caminho_saida=argumentos.saida_headers),
+                                           argumentos.filtro, argumentos.remontar, extras)
+                    print(Fore.GREEN + "\n[INFO] Análise concluída com sucesso.")
+        elif len(caminhos) == 1:
+            analisar_arquivo_unico(caminhos[0], usar_indice=not argumentos.sem_indice, aproximado=argumentos.aproximado,
+                                   opcoes_tabela=dict(opcoes_tabela, caminho_saida=argumentos.saida_headers),
+                                   filtro=argumentos.filtro, remontar=argumentos.remontar, classes_extras=extras)
+            print(Fore.GREEN + "\n[INFO] Análise concluída com sucesso.")
+        elif caminhos:
+            exibir_analise_lote(caminhos, argumentos.processos, argumentos.aproximado, opcoes_tabela,
+                                argumentos.filtro, argumentos.remontar, extras)
+            print(Fore.GREEN + "\n[INFO] Análise concluída com sucesso.")
+        else:
+            print(Fore.RED + "[ERRO] Nenhum arquivo foi selecionado.")
+    finally:
+        if argumentos.perfil:
+            exibir_perfil(encerrar_perfil(argumentos.perfil), argumentos.perfil)
@@ -1,11 +1,44 @@
-import tkinter as tk
-from tkinter import filedialog
-import json
-import csv
-from fpdf import FPDF
+# O tkinter, o tabulate e os módulos de cada formato (json, csv) só são importados quando de fato usados
+import argparse
+from itertools import chain, islice
+
+# Execução direta (python tcpdump2.py): o script entra no pacote antes dos imports relativos (ver execucao_pcap)
+if not __package__:
+    from execucao_pcap import entrar_no_pacote
+    __package__ = entrar_no_pacote(__file__)
+
+from .exportacao_pcap import (
+    EscritorPdf, EXTENSOES_COMPRESSAO, EXTENSOES_COLUNARES, TAMANHO_BLOCO_CSV, TAMANHO_GRUPO_LINHAS,
+    abrir_saida_binaria, abrir_saida_texto, colunar_disponivel, compressao_disponivel, exportar_headers_colunar
+)
+from .leitura_pcap import FontePacotesPcap, descrever_formato, descrever_tipo_link
+from .lote_pcap import expandir_entradas
+from .seguir_pcap import acompanhar_analise
+from .janelas_pcap import AcumuladorJanelas, CABECALHO_TABELA_JANELAS, linhas_janelas
+from .fluxos_pcap import AcumuladorFluxos, CABECALHO_TABELA_FLUXOS, linhas_fluxos, linhas_resumo_fluxos
+from .indice_pcap import DESCRICAO_SITUACAO_INDICE
+from .filtro_pcap import compilar_filtro
+from .fragmentos_pcap import RemontadorFragmentos, linhas_remontagem
+from .mesclagem_pcap import FonteMesclada, NOME_MESCLAGEM, TAMANHO_BUFFER_REORDENACAO, linhas_mesclagem
+from .selecao_pcap import FonteSelecao, NOME_SELECAO, gravar_selecao, linhas_selecao
+from .perfil_pcap import (
+    CABECALHO_RESUMO_PERFIL, contar_pacotes, encerrar_perfil, etapa, iniciar_perfil, medir, medir_leitura
+)
+from .api_pcap import (
+    abrir_passada_com_linhas, analisar_captura, analisar_capturas, analisar_com, analisar_completa, analisar_extras,
+    classes_acompanhamento, usa_modo_rapido
+)
+from .analise_pcap import (
+    AcumuladorHeadersIp, AcumuladorIntervaloCaptura, AcumuladorMaiorPacoteTcp,
+    AcumuladorPacotesTruncados, AcumuladorTamanhoMedioUdp, AcumuladorTrafegoPorPar,
+    AcumuladorInteracoesInterface, CABECALHO_TABELA_HEADERS_IP, gerar_blocos_headers_ip, gerar_linhas_headers_ip
+)
 
 # Função para abrir a janela de seleção de arquivo PCAP
 def abrir_janela_selecao_arquivo():
+    import tkinter as tk
+    from tkinter import filedialog
+
     janela = tk.Tk()
     janela.withdraw()  # Esconde a janela principal do Tkinter
     caminho_arquivo = filedialog.askopenfilename(
@@ -14,108 +47,38 @@ def abrir_janela_selecao_arquivo():
     )
     return caminho_arquivo
 
-# Função para ler um inteiro de 4 bytes em ordem little endian
-def ler_inteiro_32bits_little_endian(blocos_bytes):
-    return int.from_bytes(blocos_bytes, byteorder='little')
-
-# Função para carregar os pacotes de um arquivo PCAP
-def carregar_pacotes_pcap(caminho_arquivo):
-    lista_pacotes = []
-
-    with open(caminho_arquivo, 'rb') as arquivo:
-        # Lê o cabeçalho global do arquivo PCAP (24 bytes)
-        cabecalho_global = arquivo.read(24)
-        if len(cabecalho_global) < 24:
-            raise Exception("Cabeçalho global incompleto.")
-
-        # Extrai informações do cabeçalho global
-        numero_magico = ler_inteiro_32bits_little_endian(cabecalho_global[0:4])
-        versao_maior = int.from_bytes(cabecalho_global[4:6], 'little')
-        versao_menor = int.from_bytes(cabecalho_global[6:8], 'little')
-        snaplen = ler_inteiro_32bits_little_endian(cabecalho_global[16:20])
-        tipo_link = ler_inteiro_32bits_little_endian(cabecalho_global[20:24])
-
-        # Exibe informações básicas do cabeçalho global
-        print("[INFO] Cabeçalho Global Lido:")
-        print(f"Magic Number: {hex(numero_magico)}")
-        print(f"Versão: {versao_maior}.{versao_menor}")
-        print(f"SnapLen: {snaplen}")
-        print(f"LinkType: {tipo_link}")
-
-        # Loop para ler cada pacote no arquivo
-        while True:
-            cabecalho_pacote = arquivo.read(16)  # Cabeçalho de cada pacote (16 bytes)
-            if len(cabecalho_pacote) < 16:
-                break  # Fim do arquivo
-
-            # Extrai timestamps e comprimentos do pacote
-            timestamp_segundos = ler_inteiro_32bits_little_endian(cabecalho_pacote[0:4])
-            timestamp_micros = ler_inteiro_32bits_little_endian(cabecalho_pacote[4:8])
-            comprimento_capturado = ler_inteiro_32bits_little_endian(cabecalho_pacote[8:12])
-            comprimento_original = ler_inteiro_32bits_little_endian(cabecalho_pacote[12:16])
-
-            # Lê os dados do pacote (payload)
-            conteudo_pacote = arquivo.read(comprimento_capturado)
-            if len(conteudo_pacote) < comprimento_capturado:
-                break  # Arquivo truncado, pacote incompleto
-
-            # Armazena os dados do pacote numa estrutura dicionário
-            pacote = {
-                'timestamp': timestamp_segundos + timestamp_micros / 1_000_000,
-                'caplen': comprimento_capturado,
-                'origlen': comprimento_original,
-                'dados': conteudo_pacote
-            }
-            lista_pacotes.append(pacote)
-
-    print(f"\n[INFO] {len(lista_pacotes)} pacotes foram carregados com sucesso.")
-    return lista_pacotes
+# Função para abrir um arquivo PCAP e retornar a fonte de pacotes (lidos sob demanda)
+# Com --perfil, a fonte conta os pacotes lidos e o laço de leitura dos registros é medido à parte
+def carregar_pacotes_pcap(caminho_arquivo, usar_mmap=False):
+    with etapa("cabecalho_global"):
+        fonte = FontePacotesPcap(caminho_arquivo, usar_mmap)
+    cabecalho = fonte.cabecalho
 
-# Função para extrair e organizar os cabeçalhos IP dos pacotes em uma tabela
-def obter_headers_ip(lista_pacotes):
-    tabelas = []
-    contador = 0
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue  # Pacote muito pequeno para conter cabeçalho IP
-        cabecalho_ip = dados[14:34]  # Ignora cabeçalho Ethernet (14 bytes)
-        byte_0 = cabecalho_ip[0]
-        versao_ip = byte_0 >> 4  # Versão IP (4 bits mais significativos)
-        tamanho_cabecalho = (byte_0 & 0x0F) * 4  # IHL (número de palavras de 32 bits * 4 = bytes)
-        tamanho_total = int.from_bytes(cabecalho_ip[2:4], byteorder='big')
-        identificacao = int.from_bytes(cabecalho_ip[4:6], byteorder='big')
-        flags_fragmento = int.from_bytes(cabecalho_ip[6:8], byteorder='big')
-        flags = flags_fragmento >> 13  # 3 bits de flags
-        fragment_offset = flags_fragmento & 0x1FFF  # 13 bits de offset
-        ttl = cabecalho_ip[8]
-        protocolo = cabecalho_ip[9]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
-        contador += 1
-        tabelas.append([
-            contador,
-            versao_ip,
-            tamanho_cabecalho,
-            tamanho_total,
-            identificacao,
-            flags,
-            fragment_offset,
-            ttl,
-            protocolo,
-            ip_origem,
-            ip_destino
-        ])
-    return ("Cabeçalhos IP dos pacotes", [["Pacote", "Versão", "IHL", "Tam. Total", "ID",
-                                          "Flags", "Offset", "TTL", "Protocolo", "Origem", "Destino"]] + tabelas)
+    # Exibe informações básicas do cabeçalho global
+    print("[INFO] Cabeçalho Global Lido:")
+    print(f"Formato: {descrever_formato(cabecalho)}")
+    print(f"Magic Number: {hex(cabecalho['magic'])}")
+    print(f"Versão: {cabecalho['versao_maior']}.{cabecalho['versao_menor']}")
+    print(f"SnapLen: {cabecalho['snaplen']}")
+    print(f"LinkType: {descrever_tipo_link(cabecalho)}")
 
-# Função para calcular o intervalo de captura dos pacotes
-def obter_intervalo_captura(lista_pacotes):
-    if not lista_pacotes:
+    modo = "mmap" if usar_mmap else "fluxo"
+    print(f"\n[INFO] Arquivo {caminho_arquivo} pronto para leitura ({modo}).")
+    fonte = contar_pacotes(fonte)
+    medir_leitura(fonte)
+    return fonte
+
+# Função para montar a tabela de cabeçalhos IP a partir do resultado acumulado
+# As linhas são um iterador: cada uma é montada das colunas compactas só quando o exportador a grava
+def tabela_headers_ip(resultado):
+    return ("Cabeçalhos IP dos pacotes", chain([CABECALHO_TABELA_HEADERS_IP], resultado['linhas']))
+
+# Função para montar a tabela do intervalo de captura
+def tabela_intervalo_captura(resultado):
+    if resultado['inicio'] is None:
         return ("Intervalo de captura de pacotes", [["Erro"], ["Nenhum pacote disponível para análise"]])
-    lista_timestamps = [p['timestamp'] for p in lista_pacotes]
-    tempo_inicio = min(lista_timestamps)
-    tempo_fim = max(lista_timestamps)
+    tempo_inicio = resultado['inicio']
+    tempo_fim = resultado['fim']
     duracao = tempo_fim - tempo_inicio
     tabela = [
         ["Descrição", "Valor"],
@@ -125,210 +88,537 @@ def obter_intervalo_captura(lista_pacotes):
     ]
     return ("Intervalo de captura de pacotes", tabela)
 
-# Função para identificar o maior pacote TCP capturado
-def obter_maior_pacote_tcp(lista_pacotes):
-    maior_tamanho_tcp = 0
-    ip_origem_maior = ""
-    ip_destino_maior = ""
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
-        cabecalho_ip = dados[14:34]
-        protocolo = cabecalho_ip[9]
-        if protocolo != 6:  # Apenas TCP
-            continue
-        tamanho_original = pacote['origlen']
-        if tamanho_original > maior_tamanho_tcp:
-            maior_tamanho_tcp = tamanho_original
-            ip_origem_maior = ".".join(str(b) for b in cabecalho_ip[12:16])
-            ip_destino_maior = ".".join(str(b) for b in cabecalho_ip[16:20])
+# Função para montar a tabela do maior pacote TCP
+def tabela_maior_pacote_tcp(resultado):
     tabela = [
         ["Campo", "Valor"],
-        ["Tamanho (bytes)", maior_tamanho_tcp],
-        ["IP de Origem", ip_origem_maior],
-        ["IP de Destino", ip_destino_maior]
+        ["Tamanho (bytes)", resultado['tamanho']],
+        ["IP de Origem", resultado['ip_origem']],
+        ["IP de Destino", resultado['ip_destino']]
     ]
     return ("Maior pacote TCP capturado", tabela)
 
-# Função para contar pacotes truncados
-def obter_pacotes_truncados(lista_pacotes):
-    truncados = 0
-    for pacote in lista_pacotes:
-        if pacote['caplen'] < pacote['origlen']:
-            truncados += 1
+# Função para montar a tabela de pacotes truncados
+def tabela_pacotes_truncados(resultado):
     tabela = [
         ["Descrição", "Valor"],
-        ["Total de pacotes analisados", len(lista_pacotes)],
-        ["Pacotes truncados (caplen < origlen)", truncados]
+        ["Total de pacotes analisados", resultado['total']],
+        ["Pacotes truncados (caplen < origlen)", resultado['truncados']]
     ]
     return ("Verificação de pacotes truncados", tabela)
 
-# Função para calcular o tamanho médio dos pacotes UDP
-def obter_tamanho_medio_udp(lista_pacotes):
-    soma_tamanhos_udp = 0
-    quantidade_udp = 0
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
-        cabecalho_ip = dados[14:34]
-        protocolo = cabecalho_ip[9]
-        if protocolo == 17:  # UDP
-            soma_tamanhos_udp += pacote['origlen']
-            quantidade_udp += 1
-    if quantidade_udp == 0:
+# Função para montar a tabela do tamanho médio dos pacotes UDP
+def tabela_tamanho_medio_udp(resultado):
+    if resultado['quantidade'] == 0:
         return ("Tamanho médio dos pacotes UDP capturados", [["Info"], ["Nenhum pacote UDP foi encontrado."]])
-    media = soma_tamanhos_udp / quantidade_udp
     tabela = [
         ["Descrição", "Valor"],
-        ["Total de pacotes UDP", quantidade_udp],
-        ["Tamanho médio (bytes)", f"{media:.2f}"]
+        ["Total de pacotes UDP", resultado['quantidade']],
+        ["Tamanho médio (bytes)", f"{resultado['media']:.2f}"]
     ]
     return ("Tamanho médio dos pacotes UDP capturados", tabela)
 
-# Função para identificar o par de IPs com maior tráfego
-def obter_maior_trafego_por_par(lista_pacotes):
-    trafego_por_par = {}
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
-        cabecalho_ip = dados[14:34]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
-        par = (ip_origem, ip_destino)
-        if par not in trafego_por_par:
-            trafego_por_par[par] = 0
-        trafego_por_par[par] += pacote['origlen']
-    if not trafego_por_par:
+# Função para montar as linhas extras de um resultado do modo aproximado (limites de erro)
+def linhas_aproximacao(resultado):
+    if not resultado.get('aproximado'):
+        return []
+    if 'erro_maximo' in resultado:
+        return [["Modo aproximado: erro máximo (bytes)", resultado['erro_maximo']]]
+    return [["Modo aproximado: erro padrão relativo", f"{resultado['erro_relativo']:.2%}"]]
+
+# Função para montar a tabela do par de IPs com maior tráfego
+def tabela_maior_trafego_por_par(resultado):
+    if resultado['par'] is None:
         return ("Par de IPs com maior tráfego", [["Info"], ["Nenhum par de IPs encontrado."]])
-    par_mais_trafego = max(trafego_por_par, key=trafego_por_par.get)
-    total_bytes = trafego_por_par[par_mais_trafego]
     tabela = [
         ["Campo", "Valor"],
-        ["IP de Origem", par_mais_trafego[0]],
-        ["IP de Destino", par_mais_trafego[1]],
-        ["Total de Dados (bytes)", total_bytes]
-    ]
+        ["IP de Origem", resultado['par'][0]],
+        ["IP de Destino", resultado['par'][1]],
+        ["Total de Dados (bytes)", resultado['bytes']]
+    ] + linhas_aproximacao(resultado)
     return ("Par de IPs com maior tráfego", tabela)
 
-# Função para identificar interações da interface local (IP mais frequente)
-def obter_interacoes_da_interface(lista_pacotes):
-    contagem_origem = {}
-    interacoes = set()
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
-        cabecalho_ip = dados[14:34]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
-        if ip_origem not in contagem_origem:
-            contagem_origem[ip_origem] = 0
-        contagem_origem[ip_origem] += 1
-    if not contagem_origem:
+# Função para montar a tabela das interações da interface local
+def tabela_interacoes_da_interface(resultado):
+    if resultado['ip_interface'] is None:
         return ("Interações da interface local", [["Erro"], ["Nenhum IP encontrado para análise."]])
-    ip_interface = max(contagem_origem, key=contagem_origem.get)
-    for pacote in lista_pacotes:
-        dados = pacote['dados']
-        if len(dados) < 34:
-            continue
-        cabecalho_ip = dados[14:34]
-        ip_origem = ".".join(str(b) for b in cabecalho_ip[12:16])
-        ip_destino = ".".join(str(b) for b in cabecalho_ip[16:20])
-        if ip_origem == ip_interface:
-            interacoes.add(ip_destino)
-        elif ip_destino == ip_interface:
-            interacoes.add(ip_origem)
     tabela = [
         ["Campo", "Valor"],
-        ["IP da Interface", ip_interface],
-        ["Total de IPs diferentes que interagiram com ele", len(interacoes)]
-    ]
+        ["IP da Interface", resultado['ip_interface']],
+        ["Total de IPs diferentes que interagiram com ele", resultado['total_interacoes']]
+    ] + linhas_aproximacao(resultado)
     return ("Interações da interface local", tabela)
 
-# Função para gerar nome fixo de arquivo de saída
-def gerar_nome_arquivo(extensao):
-    return f"relatorio_pcap.{extensao}"
-
-# Exporta os dados para JSON
-def exportar_para_json(tabelas):
-    nome_arquivo = gerar_nome_arquivo("json")
-    dados_json = {}
-    for titulo, tabela in tabelas:
-        dados_json[titulo] = [tabela[0]] + tabela[1:]
-    with open(nome_arquivo, "w", encoding="utf-8") as f:  # Adicionado encoding utf-8
-        json.dump(dados_json, f, indent=4, ensure_ascii=False)  # ensure_ascii=False para acentuação legível
+# Função para montar a tabela de estatísticas por janela de tempo
+def tabela_janelas(resultado):
+    return ("Estatísticas por janela de tempo", [CABECALHO_TABELA_JANELAS] + linhas_janelas(resultado))
+
+# Função para montar as tabelas de fluxos TCP/UDP: o resumo e os rankings por bytes e duração
+def tabela_fluxos(resultado):
+    return [
+        ("Fluxos TCP/UDP - resumo", [["Campo", "Valor"]] + linhas_resumo_fluxos(resultado)),
+        ("Fluxos TCP/UDP - rankings", [CABECALHO_TABELA_FLUXOS] + linhas_fluxos(resultado))
+    ]
+
+# Função para montar a tabela dos contadores da remontagem de fragmentos IPv4
+def tabela_remontagem(resultado):
+    return ("Remontagem de fragmentos IPv4", [["Descrição", "Valor"]] + linhas_remontagem(resultado))
+
+# Função para montar a tabela dos contadores da mesclagem de capturas
+def tabela_mesclagem(resultado):
+    return ("Mesclagem das capturas por timestamp", [["Descrição", "Valor"]] + linhas_mesclagem(resultado))
+
+# Função para montar a tabela dos contadores da seleção por faixa de pacotes ou intervalo de tempo
+def tabela_selecao(resultado):
+    return ("Seleção pelo índice esparso", [["Descrição", "Valor"]] + linhas_selecao(resultado))
+
+# Função para extrair e organizar os cabeçalhos IP dos pacotes em uma tabela
+# Nada é acumulado: os pacotes são decodificados enquanto o exportador consome as linhas
+# (no --perfil, esse tempo aparece na etapa do exportador)
+def obter_headers_ip(lista_pacotes, filtro=None):
+    return ("Cabeçalhos IP dos pacotes",
+            chain([CABECALHO_TABELA_HEADERS_IP], gerar_linhas_headers_ip(lista_pacotes, filtro=filtro)))
+
+# Função para calcular o intervalo de captura dos pacotes
+@medir
+def obter_intervalo_captura(lista_pacotes, filtro=None):
+    return tabela_intervalo_captura(analisar_com(lista_pacotes, AcumuladorIntervaloCaptura, filtro))
+
+# Função para identificar o maior pacote TCP capturado
+@medir
+def obter_maior_pacote_tcp(lista_pacotes, filtro=None):
+    return tabela_maior_pacote_tcp(analisar_com(lista_pacotes, AcumuladorMaiorPacoteTcp, filtro))
+
+# Função para contar pacotes truncados
+@medir
+def obter_pacotes_truncados(lista_pacotes, filtro=None):
+    return tabela_pacotes_truncados(analisar_com(lista_pacotes, AcumuladorPacotesTruncados, filtro))
+
+# Função para calcular o tamanho médio dos pacotes UDP
+@medir
+def obter_tamanho_medio_udp(lista_pacotes, filtro=None):
+    return tabela_tamanho_medio_udp(analisar_com(lista_pacotes, AcumuladorTamanhoMedioUdp, filtro))
+
+# Função para identificar o par de IPs com maior tráfego
+@medir
+def obter_maior_trafego_por_par(lista_pacotes, filtro=None):
+    return tabela_maior_trafego_por_par(analisar_com(lista_pacotes, AcumuladorTrafegoPorPar, filtro))
+
+# Função para identificar interações da interface local (IP mais frequente)
+@medir
+def obter_interacoes_da_interface(lista_pacotes, filtro=None):
+    return tabela_interacoes_da_interface(analisar_com(lista_pacotes, AcumuladorInteracoesInterface, filtro))
+
+# Função para obter a tabela de cabeçalhos IP de cada captura em blocos de colunas (exportação colunar)
+# Os pacotes são decodificados à medida que os blocos são gravados
+def obter_blocos_headers_ip(caminhos, filtro=None):
+    for caminho in caminhos:
+        fonte = contar_pacotes(FontePacotesPcap(caminho, usar_mmap=True))
+        for bloco in gerar_blocos_headers_ip(fonte, TAMANHO_GRUPO_LINHAS, filtro=filtro):
+            yield caminho, bloco
+
+# Tabelas geradas pela análise completa: nome do acumulador -> função que monta a tabela
+MONTADORES_TABELA = {
+    AcumuladorHeadersIp.nome: tabela_headers_ip,
+    AcumuladorIntervaloCaptura.nome: tabela_intervalo_captura,
+    AcumuladorMaiorPacoteTcp.nome: tabela_maior_pacote_tcp,
+    AcumuladorPacotesTruncados.nome: tabela_pacotes_truncados,
+    AcumuladorTamanhoMedioUdp.nome: tabela_tamanho_medio_udp,
+    AcumuladorTrafegoPorPar.nome: tabela_maior_trafego_por_par,
+    AcumuladorInteracoesInterface.nome: tabela_interacoes_da_interface,
+    AcumuladorJanelas.nome: tabela_janelas,
+    AcumuladorFluxos.nome: tabela_fluxos,
+    RemontadorFragmentos.nome: tabela_remontagem,
+    NOME_MESCLAGEM: tabela_mesclagem,
+    NOME_SELECAO: tabela_selecao
+}
+
+# Função para montar as tabelas de todos os resultados de uma análise completa
+# (um montador pode devolver uma tabela ou uma lista de tabelas)
+def montar_tabelas(resultados):
+    tabelas = []
+    for nome, resultado in resultados.items():
+        tabela = MONTADORES_TABELA[nome](resultado)
+        if isinstance(tabela, list):
+            tabelas.extend(tabela)
+        else:
+            tabelas.append(tabela)
+    return tabelas
+
+# Função para obter todas as tabelas numa única passada pelo arquivo
+def obter_analise_completa(lista_pacotes, incluir_headers_ip=True, filtro=None, remontar=False):
+    return montar_tabelas(analisar_completa(lista_pacotes, incluir_headers_ip, filtro, remontar))
+
+# Função para gerar nome fixo de arquivo de saída (com a extensão da compressão, se houver)
+def gerar_nome_arquivo(extensao, compressao=None):
+    return f"relatorio_pcap.{extensao}{EXTENSOES_COMPRESSAO[compressao]}"
+
+# Exporta os dados para JSON delimitado por linhas (NDJSON): um objeto por linha de tabela,
+# com o título da tabela e os valores por coluna, gravado assim que a linha é lida
+@medir
+def exportar_para_json(tabelas, compressao=None):
+    import json
+
+    nome_arquivo = gerar_nome_arquivo("ndjson", compressao)
+    with abrir_saida_texto(nome_arquivo, compressao) as f:
+        for titulo, tabela in tabelas:
+            linhas = iter(tabela)
+            cabecalho = next(linhas)
+            f.writelines(json.dumps({"tabela": titulo, **dict(zip(cabecalho, linha))}, ensure_ascii=False) + "\n"
+                         for linha in linhas)
     print(f"[OK] Dados exportados para {nome_arquivo}")
 
-# Exporta os dados para CSV
-def exportar_para_csv(tabelas):
-    nome_arquivo = gerar_nome_arquivo("csv")
-    with open(nome_arquivo, "w", newline="", encoding="utf-8") as csvfile:  # Adicionado encoding utf-8
+# Exporta os dados para CSV, gravando as linhas em blocos de TAMANHO_BLOCO_CSV
+@medir
+def exportar_para_csv(tabelas, compressao=None):
+    import csv
+
+    nome_arquivo = gerar_nome_arquivo("csv", compressao)
+    with abrir_saida_texto(nome_arquivo, compressao, newline="") as csvfile:
         writer = csv.writer(csvfile)
         for titulo, tabela in tabelas:
+            linhas = iter(tabela)
             writer.writerow([titulo])
-            writer.writerow(tabela[0])
-            for linha in tabela[1:]:
-                writer.writerow(linha)
+            writer.writerow(next(linhas))
+            while bloco := list(islice(linhas, TAMANHO_BLOCO_CSV)):
+                writer.writerows(bloco)
             writer.writerow([])
     print(f"[OK] Dados exportados para {nome_arquivo}")
 
-# Exporta os dados para PDF
-def exportar_para_pdf(tabelas):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    for titulo, tabela in tabelas:
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(0, 10, txt=titulo, ln=True)
-        pdf.set_font("Arial", 'B', 11)
-        pdf.cell(0, 10, txt=" | ".join(tabela[0]), ln=True)
-        pdf.set_font("Arial", size=10)
-        for linha in tabela[1:]:
-            pdf.cell(0, 10, txt=" | ".join(str(item) for item in linha), ln=True)
-        pdf.ln(5)
-    nome_arquivo = gerar_nome_arquivo("pdf")
-    pdf.output(nome_arquivo)
+# Exporta os dados para PDF, gravando cada página assim que ela fica cheia
+@medir
+def exportar_para_pdf(tabelas, compressao=None):
+    nome_arquivo = gerar_nome_arquivo("pdf", compressao)
+    with abrir_saida_binaria(nome_arquivo, compressao) as saida:
+        pdf = EscritorPdf(saida)
+        for titulo, tabela in tabelas:
+            linhas = iter(tabela)
+            pdf.celula(titulo, negrito=True, tamanho=12)
+            pdf.celula(" | ".join(next(linhas)), negrito=True, tamanho=11)
+            for linha in linhas:
+                pdf.celula(" | ".join(str(item) for item in linha))
+            pdf.espaco(5)
+        pdf.fechar()
     print(f"[OK] Dados exportados para {nome_arquivo}")
 
+# Exporta a tabela de cabeçalhos IP em formato colunar ("4" = Parquet, "5" = Arrow IPC)
+# Os relatórios de resumo não são exportados neste formato: só os campos IPv4 por pacote
+@medir
+def exportar_para_colunar(caminhos, formato, compressao=None, filtro=None):
+    formato_colunar = "parquet" if formato == "4" else "arrow"
+    nome_arquivo = gerar_nome_arquivo(EXTENSOES_COLUNARES[formato_colunar])
+    try:
+        total = exportar_headers_colunar(obter_blocos_headers_ip(caminhos, filtro), nome_arquivo, formato_colunar, compressao)
+    except (RuntimeError, ValueError) as erro:
+        print(f"[ERRO] {erro}")
+        return
+    print(f"[OK] {total} cabeçalhos IP exportados para {nome_arquivo}")
+
+# Códigos dos formatos de exportação (as opções do menu) e os formatos colunares
+CODIGOS_FORMATO = {"pdf": "1", "json": "2", "csv": "3", "parquet": "4", "arrow": "5"}
+FORMATOS_COLUNARES = ("4", "5")
+
 # Função para solicitar o formato de saída ao usuário
-def solicitar_formato_saida():
+# (os formatos colunares só aparecem com o pyarrow instalado e fora dos modos de acompanhamento, de mesclagem
+# e de seleção)
+def solicitar_formato_saida(incluir_colunares=True):
     print("\nEscolha o formato de exportação dos resultados:")
     print("1 - PDF")
     print("2 - JSON")
     print("3 - CSV")
+    opcoes = ["1", "2", "3"]
+    if incluir_colunares and colunar_disponivel():
+        print("4 - Parquet (cabeçalhos IP)")
+        print("5 - Arrow IPC (cabeçalhos IP)")
+        opcoes += FORMATOS_COLUNARES
     while True:
-        escolha = input("Digite 1, 2 ou 3: ").strip()
-        if escolha in ["1", "2", "3"]:
+        escolha = input(f"Digite {', '.join(opcoes[:-1])} ou {opcoes[-1]}: ").strip()
+        if escolha in opcoes:
             return escolha
         print("Opção inválida. Tente novamente.")
 
+# Função para montar as tabelas dos resumos da passada única só depois que o exportador consumiu a tabela de
+# cabeçalhos IP (os resumos ficam prontos ao fim da leitura); 'contadores' ({nome: função}) acrescenta os
+# contadores da fonte (mesclagem, seleção), que também só fecham ao fim da leitura
+def tabelas_da_passada(passada, contadores=None):
+    resultados = passada.resultados()
+    for nome, estatisticas in (contadores or {}).items():
+        resultados[nome] = estatisticas()
+    yield from montar_tabelas(resultados)
+
+# Função para montar todas as tabelas da passada única: a de cabeçalhos IP, em fluxo, e depois as dos resumos
+def tabelas_com_linhas(passada, contadores=None):
+    return chain([("Cabeçalhos IP dos pacotes", chain([CABECALHO_TABELA_HEADERS_IP], passada.linhas()))],
+                 tabelas_da_passada(passada, contadores))
+
+# Função para analisar um único arquivo, com os relatórios opcionais de 'classes_extras'. Quando a captura tem
+# um modo mais rápido que o motor de uma passada (índice em disco, em paralelo ou colunar; ver
+# api_pcap.usa_modo_rapido), a tabela de cabeçalhos IP vem das colunas devolvidas por ele e a captura só é relida
+# pelos relatórios opcionais; nos demais casos, os pacotes são decodificados numa única passada durante a
+# exportação: as linhas da tabela saem em fluxo e os resumos, calculados na mesma leitura, vêm em seguida
+# (no --perfil, o tempo dessa passada aparece na etapa do exportador)
+@medir
+def obter_analise_arquivo_unico(caminho_arquivo, usar_indice=True, aproximado=False, filtro=None, remontar=False,
+                                classes_extras=()):
+    pacotes_lidos = carregar_pacotes_pcap(caminho_arquivo, usar_mmap=True)
+    if filtro is not None:
+        print(f"[INFO] Filtro: {filtro.expressao}")
+    if usa_modo_rapido(caminho_arquivo, pacotes_lidos.cabecalho, usar_indice, aproximado, filtro, remontar):
+        resultados, situacao = analisar_captura(caminho_arquivo, usar_indice, aproximado, filtro, remontar,
+                                                lista_pacotes=pacotes_lidos)
+        if situacao is not None:
+            print(f"[INFO] Análise: {DESCRICAO_SITUACAO_INDICE[situacao]}")
+        if classes_extras:
+            resultados.update(analisar_extras(pacotes_lidos, classes_extras, filtro, remontar))
+        return montar_tabelas(resultados)
+    return tabelas_com_linhas(abrir_passada_com_linhas(pacotes_lidos, aproximado, filtro, remontar, classes_extras))
+
+# Função para analisar vários arquivos em paralelo; as tabelas de cada arquivo recebem o nome
+# do arquivo no título e o consolidado de todos os arquivos vem no final
+@medir
+def obter_analise_lote(caminhos, processos=None, aproximado=False, filtro=None, remontar=False, classes_extras=()):
+    resultados_por_arquivo, consolidado = analisar_capturas(caminhos, processos, aproximado, filtro, remontar,
+                                                            classes_extras)
+    tabelas = []
+    for caminho, resultados in resultados_por_arquivo.items():
+        for titulo, tabela in montar_tabelas(resultados):
+            tabelas.append((f"{caminho} - {titulo}", tabela))
+    for titulo, tabela in montar_tabelas(consolidado):
+        tabelas.append((f"Consolidado ({len(caminhos)} arquivos) - {titulo}", tabela))
+    return tabelas
+
+# Função para analisar várias capturas mescladas numa única linha do tempo (--mesclar), com os relatórios
+# opcionais de 'classes_extras'. As capturas são lidas uma única vez, durante a exportação: a tabela de
+# cabeçalhos IP sai em fluxo, já na ordem mesclada, e os resumos e os contadores da mesclagem vêm da mesma passada
+@medir
+def obter_analise_mesclada(caminhos, tamanho_buffer=TAMANHO_BUFFER_REORDENACAO, aproximado=False, filtro=None,
+                           remontar=False, classes_extras=()):
+    fonte_mesclada = FonteMesclada(caminhos, tamanho_buffer)
+    print(f"[INFO] Mesclando {len(caminhos)} captura(s) por timestamp "
+          f"(buffer de reordenação: {tamanho_buffer} registros por captura).")
+    if filtro is not None:
+        print(f"[INFO] Filtro: {filtro.expressao}")
+    passada = abrir_passada_com_linhas(contar_pacotes(fonte_mesclada), aproximado, filtro, remontar, classes_extras)
+    return tabelas_com_linhas(passada, {NOME_MESCLAGEM: fonte_mesclada.estatisticas})
+
+# Função para abrir a seleção de uma captura (--pacotes ou --tempo), localizando-a no índice esparso
+# (sem índice válido, a captura é lida uma vez para criá-lo, como numa análise indexada)
+@medir
+def abrir_selecao(caminho_arquivo, selecao, usar_indice=True):
+    fonte = FonteSelecao(caminho_arquivo, usar_indice=usar_indice, **selecao)
+    print(f"[INFO] Seleção: {fonte.descrever()} de {caminho_arquivo}")
+    if fonte.situacao_indice is not None:
+        print(f"[INFO] Índice: {DESCRICAO_SITUACAO_INDICE[fonte.situacao_indice]}")
+    return fonte
+
+# Função para analisar a seleção de uma captura, com os relatórios opcionais de 'classes_extras'
+# Os blocos selecionados são lidos uma única vez, durante a exportação: a tabela de cabeçalhos IP sai em fluxo
+# e os resumos e os contadores da seleção vêm da mesma passada
+@medir
+def obter_analise_selecao(fonte_selecao, aproximado=False, filtro=None, remontar=False, classes_extras=()):
+    if filtro is not None:
+        print(f"[INFO] Filtro: {filtro.expressao}")
+    passada = abrir_passada_com_linhas(contar_pacotes(fonte_selecao), aproximado, filtro, remontar, classes_extras)
+    return tabelas_com_linhas(passada, {NOME_SELECAO: fonte_selecao.estatisticas})
+
+# Função para gravar a seleção de uma captura num pcap menor (--extrair)
+@medir
+def extrair_selecao(fonte_selecao, caminho_saida):
+    try:
+        total = gravar_selecao(contar_pacotes(fonte_selecao), caminho_saida)
+    except ValueError as erro:
+        print(f"[ERRO] {erro}")
+        return False
+    print(f"[OK] {total} pacotes gravados em {caminho_saida} ({fonte_selecao.lidos} registros lidos)")
+    return True
+
+# Função para exportar os resultados no formato escolhido ("1" = PDF, "2" = JSON, "3" = CSV)
+def exportar_resultados(resultados, formato, compressao=None):
+    if formato == "1":
+        exportar_para_pdf(resultados, compressao)
+    elif formato == "2":
+        exportar_para_json(resultados, compressao)
+    else:
+        exportar_para_csv(resultados, compressao)
+
+# Função para acompanhar uma captura em crescimento, reexportando o relatório a cada 'intervalo' segundos
+def exportar_acompanhamento(caminho_arquivo, formato, intervalo, com_janelas=False, aproximado=False, com_fluxos=False,
+                            compressao=None, filtro=None):
+    print(f"[INFO] Acompanhando {caminho_arquivo} (Ctrl+C para encerrar)...")
+    classes = classes_acompanhamento(com_janelas, aproximado, com_fluxos)
+    acompanhar_analise(caminho_arquivo,
+                       lambda resultados: exportar_resultados(montar_tabelas(resultados), formato, compressao),
+                       intervalo, classes, filtro=filtro)
+
+# Função para exibir o resumo do perfil da execução (--perfil)
+def exibir_perfil(perfil, caminho_json):
+    from tabulate import tabulate
+
+    print(f"\n[PERFIL] Tempo total: {perfil.total_segundos:.3f} s")
+    print(tabulate(perfil.linhas_resumo(), headers=CABECALHO_RESUMO_PERFIL, tablefmt="fancy_grid",
+                   disable_numparse=True))
+    print(f"[PERFIL] Relatório gravado em {caminho_json}")
+    if perfil.caminho_pstats:
+        print(f"[PERFIL] Estatísticas do cProfile gravadas em {perfil.caminho_pstats} "
+              f"(python -m pstats {perfil.caminho_pstats})")
+
+# Função para validar --pacotes, --tempo e --extrair; retorna os argumentos de FonteSelecao (ou None)
+def validar_selecao(parser, argumentos):
+    if argumentos.pacotes is None and argumentos.tempo is None:
+        if argumentos.extrair:
+            parser.error("--extrair exige --pacotes ou --tempo")
+        return None
+    if argumentos.pacotes is not None and argumentos.tempo is not None:
+        parser.error("escolha --pacotes ou --tempo, não os dois")
+    if argumentos.seguir or argumentos.mesclar:
+        parser.error("--pacotes e --tempo não estão disponíveis nos modos --seguir e --mesclar")
+    if argumentos.pacotes is not None:
+        primeiro, ultimo = argumentos.pacotes
+        if primeiro < 1 or primeiro > ultimo:
+            parser.error("--pacotes exige 1 <= PRIMEIRO <= ULTIMO")
+        return {'primeiro': primeiro, 'ultimo': ultimo}
+    inicio, fim = argumentos.tempo
+    if inicio > fim:
+        parser.error("--tempo exige INICIO <= FIM")
+    return {'inicio': inicio, 'fim': fim}
+
+# Função para ler os argumentos da linha de comando
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Analisador de arquivos PCAP com exportação de relatório.")
+    parser.add_argument("entradas", nargs="*",
+                        help="arquivos, padrões glob ou diretórios com capturas (sem entradas, abre a janela de seleção)")
+    parser.add_argument("--gui", action="store_true", help="abre a janela de seleção de arquivo")
+    parser.add_argument("--formato", choices=list(CODIGOS_FORMATO),
+                        help="formato de exportação (sem esta opção, o formato é perguntado); json grava NDJSON; "
+                             "parquet e arrow exportam só os cabeçalhos IP e requerem o pacote pyarrow")
+    parser.add_argument("--compressao", choices=["gzip", "zstd"], default=None,
+                        help="comprime o arquivo exportado (zstd requer o pacote zstandard; no Parquet e no Arrow, "
+                             "é o codec interno do arquivo, e o Arrow aceita apenas zstd)")
+    parser.add_argument("--sem-indice", action="store_true",
+                        help="não usa nem grava o índice em disco (<captura>.idx) ao lado da captura")
+    parser.add_argument("--seguir", action="store_true",
+                        help="acompanha a captura enquanto ela é gravada, reexportando o relatório")
+    parser.add_argument("--intervalo", type=float, default=5.0,
+                        help="segundos entre as exportações no modo --seguir (padrão: 5)")
+    parser.add_argument("--janelas", action="store_true",
+                        help="inclui estatísticas por janela de tempo de 1s, 10s e 60s")
+    parser.add_argument("--fluxos", action="store_true",
+                        help="inclui a tabela de fluxos TCP/UDP (5-tupla) com rankings por bytes e duração")
+    parser.add_argument("--aproximado", action="store_true",
+                        help="usa Space-Saving e HyperLogLog (memória fixa) para pares de IPs e interações")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="número de processos usados no modo em lote (padrão: número de CPUs)")
+    parser.add_argument("--mesclar", action="store_true",
+                        help="analisa as capturas mescladas numa única linha do tempo, ordenada por timestamp, "
+                             "em vez de uma a uma")
+    parser.add_argument("--reordenar", type=int, default=None, metavar="REGISTROS",
+                        help=f"registros por captura no buffer que corrige registros levemente fora de ordem; "
+                             f"implica --mesclar (padrão: {TAMANHO_BUFFER_REORDENACAO})")
+    parser.add_argument("--pacotes", type=int, nargs=2, default=None, metavar=("PRIMEIRO", "ULTIMO"),
+                        help="analisa só os pacotes dessa faixa (numerados a partir de 1, extremos incluídos), "
+                             "localizados pelo índice em disco")
+    parser.add_argument("--tempo", type=float, nargs=2, default=None, metavar=("INICIO", "FIM"),
+                        help="analisa só os pacotes com timestamp nesse intervalo (segundos desde a época, "
+                             "extremos incluídos), localizados pelo índice em disco")
+    parser.add_argument("--extrair", default=None, metavar="ARQUIVO",
+                        help="com --pacotes ou --tempo, grava a seleção num pcap em vez de exportar os relatórios")
+    parser.add_argument("--filtro", default=None, metavar="EXPRESSÃO",
+                        help="só analisa os pacotes aceitos pela expressão, no estilo do tcpdump "
+                             "(ex.: \"tcp and host 10.0.0.5 and len > 1000\")")
+    parser.add_argument("--remontar", action="store_true",
+                        help="remonta os datagramas IPv4 fragmentados antes dos relatórios por datagrama "
+                             "(UDP, pares de IPs, interações, maior TCP, fluxos)")
+    parser.add_argument("--perfil", "--profile", nargs="?", const="perfil_pcap.json", default=None, metavar="ARQUIVO",
+                        help="mede o tempo, as alocações e a vazão de cada etapa e grava o relatório em JSON "
+                             "(padrão: perfil_pcap.json)")
+    parser.add_argument("--perfil-pstats", "--profile-pstats", default=None, metavar="ARQUIVO",
+                        help="com --perfil, grava também as estatísticas do cProfile (para o módulo pstats)")
+    parser.add_argument("--perfil-sem-alocacoes", action="store_true",
+                        help="com --perfil, não mede as alocações (o tracemalloc deixa a execução mais lenta)")
+    argumentos = parser.parse_args()
+    if argumentos.perfil is None and argumentos.perfil_pstats:
+        argumentos.perfil = "perfil_pcap.json"
+    if argumentos.remontar and argumentos.seguir:
+        parser.error("a remontagem de fragmentos não está disponível no modo --seguir")
+    if argumentos.reordenar is not None:
+        if argumentos.reordenar < 0:
+            parser.error("o buffer de reordenação não pode ser negativo")
+        argumentos.mesclar = True
+    elif argumentos.mesclar:
+        argumentos.reordenar = TAMANHO_BUFFER_REORDENACAO
+    if argumentos.mesclar and argumentos.seguir:
+        parser.error("a mesclagem de capturas não está disponível no modo --seguir")
+    argumentos.selecao = validar_selecao(parser, argumentos)
+    if argumentos.filtro is not None:
+        try:
+            argumentos.filtro = compilar_filtro(argumentos.filtro)
+        except ValueError as erro:
+            parser.error(str(erro))
+    if CODIGOS_FORMATO.get(argumentos.formato) in FORMATOS_COLUNARES:
+        if not colunar_disponivel():
+            parser.error("a exportação em Parquet ou Arrow requer o pacote pyarrow (pip install pyarrow)")
+        if argumentos.seguir or argumentos.mesclar or argumentos.selecao is not None:
+            parser.error("a exportação em Parquet ou Arrow não está disponível com --seguir, --mesclar, "
+                         "--pacotes e --tempo")
+        if argumentos.formato == "arrow" and argumentos.compressao == "gzip":
+            parser.error("o Arrow IPC aceita apenas --compressao zstd")
+    elif not compressao_disponivel(argumentos.compressao):
+        parser.error("a compressão zstd requer o pacote zstandard (pip install zstandard)")
+    return argumentos
+
 # Bloco principal da execução do programa
 if __name__ == "__main__":
-    caminho_selecionado = abrir_janela_selecao_arquivo()
-
-    if caminho_selecionado:
-        pacotes_lidos = carregar_pacotes_pcap(caminho_selecionado)
-
-        # Coleta os resultados das análises
-        resultados = []
-        resultados.append(obter_headers_ip(pacotes_lidos))
-        resultados.append(obter_intervalo_captura(pacotes_lidos))
-        resultados.append(obter_maior_pacote_tcp(pacotes_lidos))
-        resultados.append(obter_pacotes_truncados(pacotes_lidos))
-        resultados.append(obter_tamanho_medio_udp(pacotes_lidos))
-        resultados.append(obter_maior_trafego_por_par(pacotes_lidos))
-        resultados.append(obter_interacoes_da_interface(pacotes_lidos))
-
-        # Solicita formato de saída e exporta
-        formato = solicitar_formato_saida()
-        if formato == "1":
-            exportar_para_pdf(resultados)
-        elif formato == "2":
-            exportar_para_json(resultados)
-        else:
-            exportar_para_csv(resultados)
+    argumentos = ler_argumentos()
+
+    if argumentos.gui or not argumentos.entradas:
+        caminho_selecionado = abrir_janela_selecao_arquivo()
+        caminhos = [caminho_selecionado] if caminho_selecionado else []
     else:
-        print("[ERRO] Nenhum arquivo foi selecionado.")
+        caminhos = expandir_entradas(argumentos.entradas)
+
+    # Solicita formato de saída (se não veio pela linha de comando) antes de iniciar a análise
+    formato = None
+    if caminhos and not argumentos.extrair:
+        formato = CODIGOS_FORMATO.get(argumentos.formato) or solicitar_formato_saida(
+            incluir_colunares=not (argumentos.seguir or argumentos.mesclar or argumentos.selecao is not None))
+    extras = [AcumuladorJanelas] if argumentos.janelas else []
+    extras += [AcumuladorFluxos] if argumentos.fluxos else []
+    if argumentos.perfil:
+        iniciar_perfil(not argumentos.perfil_sem_alocacoes, argumentos.perfil_pstats)
+
+    try:
+        if caminhos and argumentos.seguir:
+            exportar_acompanhamento(caminhos[0], formato, argumentos.intervalo, argumentos.janelas,
+                                    argumentos.aproximado, argumentos.fluxos, argumentos.compressao, argumentos.filtro)
+        elif formato in FORMATOS_COLUNARES:
+            exportar_para_colunar(caminhos, formato, argumentos.compressao, argumentos.filtro)
+        # Coleta os resultados de todas as análises e exporta
+        elif caminhos and argumentos.mesclar:
+            resultados = obter_analise_mesclada(caminhos, argumentos.reordenar, argumentos.aproximado,
+                                                argumentos.filtro, argumentos.remontar, extras)
+            exportar_resultados(resultados, formato, argumentos.compressao)
+        elif caminhos and argumentos.selecao is not None:
+            if len(caminhos) > 1:
+                print("[ERRO] --pacotes e --tempo aceitam uma única captura.")
+            else:
+                fonte = abrir_selecao(caminhos[0], argumentos.selecao, not argumentos.sem_indice)
+                if argumentos.extrair:
+                    extrair_selecao(fonte, argumentos.extrair)
+                else:
+                    resultados = obter_analise_selecao(fonte, argumentos.aproximado, argumentos.filtro,
+                                                       argumentos.remontar, extras)
+                    exportar_resultados(resultados, formato, argumentos.compressao)
+        elif len(caminhos) == 1:
+            resultados = obter_analise_arquivo_unico(caminhos[0], usar_indice=not argumentos.sem_indice,
+                                                     aproximado=argumentos.aproximado, filtro=argumentos.filtro,
+                                                     remontar=argumentos.remontar, classes_extras=extras)
+            exportar_resultados(resultados, formato, argumentos.compressao)
+        elif caminhos:
+            resultados = obter_analise_lote(caminhos, argumentos.processos, argumentos.aproximado, argumentos.filtro,
+                                            argumentos.remontar, extras)
+            exportar_resultados(resultados, formato, argumentos.compressao)
+        else:
+            print("[ERRO] Nenhum arquivo foi selecionado.")
+    finally:
+        if argumentos.perfil:
+            exibir_perfil(encerrar_perfil(argumentos.perfil), argumentos.perfil)
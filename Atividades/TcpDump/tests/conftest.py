@@ -0,0 +1,32 @@
+# Configuração dos testes do analisador: o diretório Atividades entra no sys.path (os testes importam o pacote
+# TcpDump como um programa externo) e uma captura sintética (benchmark_pcap) é gerada uma vez por sessão
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from TcpDump.benchmark_pcap import gerar_captura_sintetica  # noqa: E402
+
+# Pacotes da captura sintética: o bastante para várias fatias da análise paralela e vários blocos do índice
+PACOTES_CAPTURA = 20_000
+
+# Hosts da captura sintética: poucos pares de IPs, para que os resumos aproximados caibam nos seus contadores
+# e também sejam exatos
+HOSTS_CAPTURA = 20
+
+# Captura sintética compartilhada pelos testes que só a leem
+@pytest.fixture(scope="session")
+def captura(tmp_path_factory):
+    caminho = str(tmp_path_factory.mktemp("capturas") / "sintetica.pcap")
+    gerar_captura_sintetica(caminho, PACOTES_CAPTURA, hosts=HOSTS_CAPTURA)
+    return caminho
+
+# Cópia própria da captura sintética, para os testes que gravam o índice ou alteram o arquivo
+@pytest.fixture
+def copia_captura(captura, tmp_path):
+    caminho = tmp_path / "copia.pcap"
+    with open(captura, 'rb') as origem:
+        caminho.write_bytes(origem.read())
+    return str(caminho)
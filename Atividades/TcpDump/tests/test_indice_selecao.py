@@ -0,0 +1,78 @@
+# Testes do índice em disco (criação, reaproveitamento e atualização incremental quando a captura cresce) e da
+# seleção de pacotes pelo índice esparso (faixa de pacotes e intervalo de tempo), comparada à leitura completa
+import pytest
+
+from TcpDump.api_pcap import analisar_completa
+from TcpDump.benchmark_pcap import gerar_captura_sintetica
+from TcpDump.indice_pcap import INTERVALO_INDICE, executar_analise_indexada, obter_indice
+from TcpDump.leitura_pcap import TAMANHO_CABECALHO_GLOBAL, FontePacotesPcap
+from TcpDump.selecao_pcap import FonteSelecao
+
+# Pacotes anexados à captura no teste da atualização incremental
+PACOTES_ANEXADOS = 3_000
+
+# Função para descrever um pacote por valor (os dados lidos com mmap são fatias do arquivo mapeado)
+def descrever_pacote(pacote):
+    return pacote['timestamp'], pacote['caplen'], pacote['origlen'], bytes(pacote['dados'])
+
+# Função para ler todos os pacotes da captura, descritos por valor
+def ler_pacotes(caminho):
+    return [descrever_pacote(pacote) for pacote in FontePacotesPcap(caminho)]
+
+# Função para anexar ao fim da captura os registros de outra captura sintética (sem o cabeçalho global)
+# Os timestamps da outra captura recomeçam do início: os blocos anexados ficam fora de ordem no tempo
+def anexar_registros(caminho, tmp_path):
+    outra = tmp_path / "anexo.pcap"
+    gerar_captura_sintetica(str(outra), PACOTES_ANEXADOS, semente=2)
+    with open(caminho, 'ab') as destino:
+        destino.write(outra.read_bytes()[TAMANHO_CABECALHO_GLOBAL:])
+
+def test_indice_atualizado_apos_anexar(copia_captura, tmp_path):
+    _, situacao = executar_analise_indexada(copia_captura)
+    assert situacao == "completa"
+    anexar_registros(copia_captura, tmp_path)
+
+    resultados, situacao = executar_analise_indexada(copia_captura)
+    assert situacao == "incremental"
+    assert resultados == analisar_completa(FontePacotesPcap(copia_captura, usar_mmap=True))
+
+    resultados_gravados, situacao = executar_analise_indexada(copia_captura)
+    assert situacao == "indice"
+    assert resultados_gravados == resultados
+
+    indice, _ = obter_indice(copia_captura)
+    pacotes = len(ler_pacotes(copia_captura))
+    assert indice.pacotes == pacotes
+    assert len(indice.offsets) >= pacotes // INTERVALO_INDICE
+
+@pytest.mark.parametrize("primeiro, ultimo", [(1, 1), (1, 1500), (1024, 1025), (5000, 12345), (19990, None),
+                                              (None, 10), (25000, None)])
+def test_selecao_por_pacotes(copia_captura, primeiro, ultimo):
+    pacotes = ler_pacotes(copia_captura)
+    esperado = pacotes[(primeiro or 1) - 1:ultimo]
+    sem_indice = FonteSelecao(copia_captura, primeiro=primeiro, ultimo=ultimo, usar_indice=False)
+    assert [descrever_pacote(pacote) for pacote in sem_indice] == esperado
+    fonte = FonteSelecao(copia_captura, primeiro=primeiro, ultimo=ultimo)
+    assert [descrever_pacote(pacote) for pacote in fonte] == esperado
+    assert fonte.selecionados == len(esperado)
+    # Com o índice, a leitura começa no bloco da faixa, não no primeiro registro da captura
+    assert fonte.lidos <= len(esperado) + INTERVALO_INDICE
+
+@pytest.mark.parametrize("inicio, fim", [(1000, 1500), (0, 10), (19000, 19999), (7000, 7000)])
+def test_selecao_por_tempo(copia_captura, tmp_path, inicio, fim):
+    anexar_registros(copia_captura, tmp_path)
+    pacotes = ler_pacotes(copia_captura)
+    # Os extremos são timestamps de pacotes da captura original; os anexados (fora de ordem) também podem cair
+    # no intervalo e precisam ser encontrados
+    inicio, fim = pacotes[inicio][0], pacotes[fim][0]
+    esperado = [pacote for pacote in pacotes if inicio <= pacote[0] <= fim]
+    fonte = FonteSelecao(copia_captura, inicio=inicio, fim=fim)
+    assert [descrever_pacote(pacote) for pacote in fonte] == esperado
+    assert fonte.estatisticas()['selecionados'] == len(esperado)
+    assert fonte.lidos < len(pacotes)
+
+def test_selecao_por_tempo_fora_da_captura(copia_captura):
+    ultimo_instante = ler_pacotes(copia_captura)[-1][0]
+    fonte = FonteSelecao(copia_captura, inicio=ultimo_instante + 1, fim=ultimo_instante + 2)
+    assert list(fonte) == []
+    assert fonte.lidos == 0
@@ -0,0 +1,48 @@
+# Testes da mesclagem dos acumuladores: a captura é dividida em fatias (como na análise paralela), cada fatia é
+# analisada à parte e os parciais mesclados na ordem do arquivo devem dar o mesmo resultado da análise sequencial.
+# Cobre todo acumulador exportado pelo pacote, os aproximados e o remontador de fragmentos (com 'remontar')
+import pytest
+
+import TcpDump
+from TcpDump.leitura_pcap import dividir_em_fatias
+from TcpDump.paralelo_pcap import analisar_acumuladores_paralelo, analisar_fatia, mesclar_parciais
+
+# Acumuladores exportados pelo pacote (os exatos, os opcionais e os aproximados, sem repetições)
+CLASSES_EXPORTADAS = list(dict.fromkeys(
+    [getattr(TcpDump, nome) for nome in TcpDump.__all__ if nome.startswith("Acumulador")] +
+    TcpDump.ACUMULADORES_PADRAO + TcpDump.ACUMULADORES_APROXIMADOS
+))
+
+# Função para finalizar os acumuladores; retorna [(nome do acumulador, resultado)] (um exato e o seu aproximado
+# têm o mesmo nome)
+def finalizar(acumuladores):
+    return [(acumulador.nome, acumulador.finalizar()) for acumulador in acumuladores]
+
+# Função para analisar a captura em 'fatias' faixas, no próprio processo, e mesclar os parciais
+def analisar_em_fatias(caminho, classes, fatias, filtro=None):
+    parciais = [analisar_fatia(caminho, inicio, fim, classes, filtro, remontar=True)
+                for inicio, fim in dividir_em_fatias(caminho, fatias)]
+    assert len(parciais) == fatias
+    return finalizar(mesclar_parciais(parciais))
+
+def test_classes_exportadas():
+    nomes = {classe.__name__ for classe in CLASSES_EXPORTADAS}
+    assert {"AcumuladorJanelas", "AcumuladorFluxos", "AcumuladorTrafegoPorParAproximado",
+            "AcumuladorInteracoesInterfaceAproximado"} <= nomes
+
+@pytest.mark.parametrize("classe", CLASSES_EXPORTADAS, ids=lambda classe: classe.__name__)
+@pytest.mark.parametrize("fatias", [2, 3, 7])
+def test_mesclagem_igual_a_sequencial(captura, classe, fatias):
+    esperado = finalizar(analisar_fatia(captura, None, None, [classe], remontar=True))
+    assert [nome for nome, _ in esperado] == [classe.nome, TcpDump.RemontadorFragmentos.nome]
+    assert analisar_em_fatias(captura, [classe], fatias) == esperado
+
+def test_mesclagem_com_filtro(captura):
+    filtro = TcpDump.compilar_filtro("tcp or udp port 53")
+    esperado = finalizar(analisar_fatia(captura, None, None, CLASSES_EXPORTADAS, filtro, remontar=True))
+    assert analisar_em_fatias(captura, CLASSES_EXPORTADAS, 5, filtro) == esperado
+
+# Nos processos, os acumuladores parciais (e o remontador) voltam serializados ao processo principal
+def test_mesclagem_entre_processos(captura):
+    esperado = finalizar(analisar_fatia(captura, None, None, CLASSES_EXPORTADAS, remontar=True))
+    assert finalizar(analisar_acumuladores_paralelo(captura, 4, CLASSES_EXPORTADAS, remontar=True)) == esperado
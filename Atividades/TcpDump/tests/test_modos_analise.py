@@ -0,0 +1,65 @@
+# Testes de equivalência dos modos de análise: em fluxo, com mmap, colunar (NumPy), em paralelo e pelo índice
+# em disco, todos devem devolver os mesmos resultados para a mesma captura, com e sem filtro
+import pytest
+
+from TcpDump import compilar_filtro
+from TcpDump.analise_pcap import ACUMULADORES_PADRAO
+from TcpDump.api_pcap import NUMPY_DISPONIVEL, analisar_captura, analisar_colunar, analisar_completa
+from TcpDump.indice_pcap import executar_analise_indexada
+from TcpDump.leitura_pcap import FontePacotesPcap
+from TcpDump.paralelo_pcap import executar_analise_paralela
+
+# Processos da análise paralela (forçada: a captura sintética fica abaixo do limiar de LIMIAR_ANALISE_PARALELA)
+PROCESSOS_TESTE = 4
+
+# Expressões de filtro usadas nos testes (protocolo, host, rede, porta, tamanho e TTL)
+EXPRESSOES_FILTRO = [
+    "udp",
+    "tcp and host 10.0.0.5",
+    "not icmp",
+    "src net 10.0.0.0/30 or dst port 53",
+    "len > 1000",
+    "ttl <= 64 and udp"
+]
+
+# Função para analisar a captura em cada modo que aceita filtro; retorna {modo: resultados}
+def analisar_em_cada_modo(caminho, filtro=None):
+    resultados = {
+        'fluxo': analisar_completa(FontePacotesPcap(caminho), filtro=filtro),
+        'mmap': analisar_completa(FontePacotesPcap(caminho, usar_mmap=True), filtro=filtro),
+        'paralela': executar_analise_paralela(caminho, PROCESSOS_TESTE, ACUMULADORES_PADRAO, filtro)
+    }
+    if NUMPY_DISPONIVEL:
+        resultados['colunar'] = analisar_colunar(caminho, filtro=filtro)
+    return resultados
+
+# Função para conferir que todos os modos devolveram os mesmos resultados que a análise em fluxo
+def conferir_iguais(resultados_por_modo):
+    esperado = resultados_por_modo['fluxo']
+    for modo, resultados in resultados_por_modo.items():
+        assert resultados == esperado, f"modo {modo} diverge da análise em fluxo"
+
+def test_modos_iguais_sem_filtro(copia_captura):
+    resultados = analisar_em_cada_modo(copia_captura)
+    resultados['indice_novo'], situacao = executar_analise_indexada(copia_captura)
+    assert situacao == "completa"
+    resultados['indice_gravado'], situacao = executar_analise_indexada(copia_captura)
+    assert situacao == "indice"
+    conferir_iguais(resultados)
+    assert resultados['fluxo']['headers_ip']
+
+@pytest.mark.parametrize("expressao", EXPRESSOES_FILTRO)
+def test_modos_iguais_com_filtro(captura, copia_captura, expressao):
+    filtro = compilar_filtro(expressao)
+    resultados = analisar_em_cada_modo(captura, filtro)
+    # Com filtro, o índice em disco (da captura inteira) não pode responder: a análise cai num dos outros modos
+    executar_analise_indexada(copia_captura)
+    resultados['captura_indexada'], situacao = analisar_captura(copia_captura, usar_indice=True, filtro=filtro)
+    assert situacao is None
+    conferir_iguais(resultados)
+    assert resultados['fluxo'] != analisar_completa(FontePacotesPcap(captura))
+
+@pytest.mark.skipif(not NUMPY_DISPONIVEL, reason="o modo colunar precisa do NumPy")
+def test_filtro_vazio_no_modo_colunar(captura):
+    filtro = compilar_filtro("ttl > 255")
+    assert analisar_colunar(captura, filtro=filtro) == analisar_completa(FontePacotesPcap(captura), filtro=filtro)